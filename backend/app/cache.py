@@ -0,0 +1,80 @@
+"""
+In-process TTL cache for the stats endpoints that every manager tablet polls.
+
+Entries are grouped by namespace ("analytics", "inventory", "expenses") so that
+writes can drop everything they affect, e.g. an order write calls
+`stats_cache.invalidate("analytics", "inventory")` after committing. Concurrent
+misses for the same key share one computation, and a result computed across an
+invalidation is not stored. The computation runs as a task of its own, so a
+request that is cancelled (client gone) while computing doesn't cancel it for
+the others waiting on it; it must therefore not use the request's session
+(see database.with_session). Each uvicorn worker has its own cache, so other
+workers can serve a value up to STATS_CACHE_TTL seconds old.
+"""
+import asyncio
+import os
+import time
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from .metrics import record_cache_lookup
+
+
+class TTLCache:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[Tuple, Tuple[float, Any]] = {}
+        self._pending: Dict[Tuple, asyncio.Future] = {}
+        self._generations: Dict[str, int] = defaultdict(int)
+        self.hits = 0
+        self.misses = 0
+
+    async def get_or_set(self, namespace: str, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        full_key = (namespace, key)
+        entry = self._entries.get(full_key)
+        if entry and entry[0] > time.monotonic():
+            self.hits += 1
+            record_cache_lookup(namespace, True)
+            return entry[1]
+
+        pending = self._pending.get(full_key)
+        if pending:
+            # Someone is already computing this key; count it as a hit for them
+            self.hits += 1
+            record_cache_lookup(namespace, True)
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        record_cache_lookup(namespace, False)
+        generation = self._generations[namespace]
+        task = asyncio.ensure_future(self._compute(full_key, generation, compute))
+        self._pending[full_key] = task
+        return await asyncio.shield(task)
+
+    async def _compute(self, full_key: Tuple, generation: int, compute: Callable[[], Awaitable[Any]]) -> Any:
+        namespace = full_key[0]
+        try:
+            value = await compute()
+        finally:
+            self._pending.pop(full_key, None)
+        if self.ttl > 0 and self._generations[namespace] == generation:
+            self._entries[full_key] = (time.monotonic() + self.ttl, value)
+        return value
+
+    def invalidate(self, *namespaces: str) -> None:
+        for namespace in namespaces:
+            self._generations[namespace] += 1
+        self._entries = {k: v for k, v in self._entries.items() if k[0] not in namespaces}
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "ttlSeconds": self.ttl,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRatio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+stats_cache = TTLCache(ttl=float(os.getenv("STATS_CACHE_TTL", "15")))
@@ -0,0 +1,87 @@
+"""
+Catalog version, change log and conditional GETs for the POS menu endpoints.
+
+Every POS terminal polls GET /products and GET /inventory, and most of the day
+nothing has changed. `catalog_version` (009_catalog_version.sql) is a counter
+that every write changing those lists bumps in its own transaction, last (after
+stock, customer and rollups, so the row is held only until commit): product and
+inventory writes, order create/edit/void (stock), and checkout() in SQL. The
+bump also records the products it was for in `catalog_changes`
+(010_catalog_changes.sql), one row per product at its latest version, which is
+what GET /sync/catalog serves deltas from.
+
+The list endpoints read the version first and use it as a strong ETag (with the
+filter and base URL, which also shape the body). A matching If-None-Match gets
+a 304 after that one-row read, without touching the product tables. Reading the
+version before the data means a write committing in between only pairs an old
+ETag with new data, which costs the client one extra full fetch, never a stale
+menu.
+"""
+import hashlib
+from datetime import datetime
+from typing import Iterable, Optional
+from uuid import UUID
+
+from fastapi import Request, Response
+from sqlalchemy import bindparam, select, text
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PGUUID
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import CatalogVersion
+
+# Clients must revalidate every time, but may keep the body to revalidate against
+CACHE_CONTROL = "no-cache"
+
+_BUMP = text("SELECT bump_catalog(:product_ids)").bindparams(
+    bindparam("product_ids", type_=ARRAY(PGUUID(as_uuid=True)))
+)
+
+# Tombstones of deleted products older than the cutoff go; cursors from before them get a full snapshot
+_PRUNE = text("""
+    WITH pruned AS (
+        DELETE FROM catalog_changes c
+        WHERE c.changed_at < :cutoff AND NOT EXISTS (SELECT 1 FROM products p WHERE p.id = c.product_id)
+        RETURNING c.version
+    )
+    UPDATE catalog_version
+    SET pruned_through = GREATEST(pruned_through, (SELECT max(version) FROM pruned))
+    RETURNING (SELECT count(*) FROM pruned)
+""")
+
+
+async def catalog_version(db: AsyncSession) -> int:
+    result = await db.execute(select(CatalogVersion.version))
+    return result.scalar_one()
+
+
+async def bump_catalog_version(db: AsyncSession, product_ids: Iterable[UUID]) -> None:
+    """
+    Bump the version and log `product_ids` as changed at it, in the caller's
+    transaction; call after the catalog writes, before commit.
+    """
+    await db.flush()  # pending ORM writes first, so the version row is still the last lock taken
+    await db.execute(_BUMP, {"product_ids": sorted(set(product_ids))})
+
+
+async def prune_catalog_changes(db: AsyncSession, cutoff: datetime) -> int:
+    """Drop deleted products' change rows from before `cutoff`; returns how many. The caller commits."""
+    result = await db.execute(_PRUNE, {"cutoff": cutoff})
+    return result.scalar_one()
+
+
+def catalog_etag(version: int, *variant: Optional[str]) -> str:
+    """Strong ETag for one list at `version`; `variant` is whatever else shapes the body"""
+    digest = hashlib.sha1("|".join(str(part) for part in variant).encode()).hexdigest()[:12]
+    return f'"{version}-{digest}"'
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """A 304 if the request's If-None-Match already has `etag`, else None"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return None
+    # If-None-Match compares weakly: W/"x" matches "x" (proxies may weaken an ETag)
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    if etag in candidates or "*" in candidates:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+    return None
@@ -0,0 +1,55 @@
+"""
+POS checkout through the `checkout(jsonb)` Postgres function
+(supabase/migrations/006_checkout_function.sql).
+
+The function upserts the customer, allocates the order number, inserts the
+order and its items, deducts stock and updates the dashboard rollups, so a
+checkout is a single autocommitted statement instead of a transaction with a
+round trip per step. The create-order edge function calls the same function.
+Requests with an Idempotency-Key go through checkout_once(), which wraps it
+(013_idempotency_keys.sql, app/idempotency.py).
+"""
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# SQLSTATE the function raises for stock problems (nothing has been written)
+CHECKOUT_REJECTED = "BB400"
+
+_CHECKOUT = text("SELECT checkout(CAST(:order AS jsonb))")
+_CHECKOUT_ONCE = text(
+    "SELECT checkout_once(:key, :request_hash, make_interval(secs => :ttl), CAST(:order AS jsonb))"
+)
+
+
+class CheckoutRejected(Exception):
+    """The order can't be placed as requested, e.g. insufficient stock"""
+
+
+async def checkout(db: AsyncSession, order_json: str) -> dict:
+    """
+    Place an order given as a CreateOrderRequest JSON body and return
+    {"orderId", "orderNumber"}. Must be the first thing the session does.
+    """
+    conn = await db.connection(execution_options={"isolation_level": "AUTOCOMMIT"})
+    try:
+        result = await conn.execute(_CHECKOUT, {"order": order_json})
+    except DBAPIError as e:
+        if getattr(e.orig, "sqlstate", None) == CHECKOUT_REJECTED:
+            raise CheckoutRejected(getattr(e.orig.__cause__, "message", str(e.orig))) from e
+        raise
+    return result.scalar_one()
+
+
+
+async def checkout_once(db: AsyncSession, key: str, request_hash: str, order_json: str, ttl: float) -> dict:
+    """
+    checkout() at most once per `key`: {"replayed", "requestHash", "status", "body",
+    "expiresIn"}, where status is 200 or 400 (stock) and body the response. Blocks while
+    another transaction is placing the same key. Must be the first thing the session does.
+    """
+    conn = await db.connection(execution_options={"isolation_level": "AUTOCOMMIT"})
+    result = await conn.execute(
+        _CHECKOUT_ONCE, {"key": key, "request_hash": request_hash, "ttl": ttl, "order": order_json}
+    )
+    return result.scalar_one()
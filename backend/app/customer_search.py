@@ -0,0 +1,96 @@
+"""
+Indexed customer search.
+
+- Queries that are only digits (and phone punctuation) match `phone_digits` by
+  prefix, so "98765" finds "98765 43210" as well as "9876543210".
+- Anything else matches names, ranked in two tiers: names that start with the
+  query, then names where every query word prefixes some word of the name
+  ("sharma" finds "Priya Sharma"; `search_vector` tsvector, GIN index).
+
+Each tier is ordered alphabetically by an index on (key COLLATE "C", id), so a
+page never ranks or sorts every match: short prefixes like "a" on a large table
+cost the same as long ones. Pages continue from a (tier, key, id) keyset.
+
+Columns and indexes: supabase/migrations/005_customer_search.sql.
+"""
+import re
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import Customer
+
+TIER_PHONE = 0
+TIER_NAME_PREFIX = 1
+TIER_NAME_WORDS = 2
+
+_PHONE_QUERY = re.compile(r"^[\d\s+()\-.]+$")
+_WORD = re.compile(r"\w+")
+
+# Sort keys; COLLATE "C" matches the indexes so LIKE 'q%' and ORDER BY both use them
+_NAME_KEY = func.lower(Customer.full_name).collate("C")
+_PHONE_KEY = Customer.phone_digits.collate("C")
+
+# (tier, sort key, customer id) of the last result on a page
+SearchAfter = Tuple[int, str, UUID]
+
+
+def phone_prefix(q: str) -> Optional[str]:
+    """Digits to prefix-match against phone_digits, or None if q isn't a phone query"""
+    digits = re.sub(r"\D", "", q)
+    return digits if digits and _PHONE_QUERY.match(q) else None
+
+
+def prefix_tsquery(q: str) -> Optional[str]:
+    """to_tsquery input requiring each word of q as a prefix: "an ku" -> "an:* & ku:*" """
+    words = _WORD.findall(q.lower())
+    return " & ".join(f"{word}:*" for word in words) or None
+
+
+def _like_prefix(value: str) -> str:
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "%"
+
+
+def _tiers(q: str):
+    """(tier, sort key, condition) for each result tier of q, best first"""
+    digits = phone_prefix(q)
+    if digits:
+        return [(TIER_PHONE, _PHONE_KEY, _PHONE_KEY.like(_like_prefix(digits), escape="\\"))]
+
+    tsquery = prefix_tsquery(q)
+    if not tsquery:
+        return []
+    starts_with = _NAME_KEY.like(_like_prefix(q.lower()), escape="\\")
+    return [
+        (TIER_NAME_PREFIX, _NAME_KEY, starts_with),
+        (TIER_NAME_WORDS, _NAME_KEY, Customer.search_vector.op("@@")(func.to_tsquery("simple", tsquery)) & ~starts_with),
+    ]
+
+
+async def search_customers(
+    db: AsyncSession, q: str, limit: int, after: Optional[SearchAfter] = None
+) -> Tuple[List[Customer], Optional[SearchAfter]]:
+    """One page of matches for q, and the keyset to pass as `after` for the next page (None on the last)"""
+    found = []  # (tier, sort key, customer)
+    for tier, key, condition in _tiers(q.strip()):
+        if after and tier < after[0]:
+            continue
+        stmt = select(Customer, key.label("sort_key")).where(condition)
+        if after and tier == after[0]:
+            stmt = stmt.where(tuple_(key, Customer.id) > tuple_(after[1], after[2]))
+        # One row beyond the page tells us whether there is a next one
+        stmt = stmt.order_by(key, Customer.id).limit(limit + 1 - len(found))
+        result = await db.execute(stmt)
+        found.extend((tier, row.sort_key, row.Customer) for row in result.all())
+        if len(found) > limit:
+            break
+
+    next_after = None
+    if len(found) > limit:
+        found = found[:limit]
+        tier, sort_key, customer = found[-1]
+        next_after = (tier, sort_key, customer.id)
+    return [customer for _, _, customer in found], next_after
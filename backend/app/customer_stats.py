@@ -0,0 +1,130 @@
+"""
+Customer resolution and visit/spend counters for order writes.
+
+Customers are keyed by phone number and resolved with a single
+INSERT ... ON CONFLICT (phone_number) DO UPDATE ... RETURNING id, so two
+checkouts for the same new phone number can't both insert (or fail on the
+unique constraint). `total_orders` and `total_spent` only ever change through
+relative UPDATEs (`total_orders = total_orders + 1`), so concurrent orders for
+one customer don't overwrite each other's counts.
+
+The checkout() Postgres function does the same for new orders;
+`rebuild_customer_stats.py` recomputes every customer's totals from orders.
+"""
+from decimal import Decimal
+from typing import Dict, List, Optional, Sequence
+from uuid import UUID
+
+from sqlalchemy import and_, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import ORDER_COMPLETED, Customer, Order
+
+
+async def upsert_customer(db: AsyncSession, customer) -> UUID:
+    """
+    Id of the customer with customer.phoneNumber, creating them if needed
+    (a non-empty fullName renames an existing customer). `customer` is a CustomerBase.
+    """
+    stmt = insert(Customer).values(
+        full_name=customer.fullName,
+        phone_number=customer.phoneNumber,
+        notes=customer.notes,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Customer.phone_number],
+        set_={
+            "full_name": func.coalesce(func.nullif(stmt.excluded.full_name, ""), Customer.full_name),
+            "updated_at": func.now(),
+        },
+    ).returning(Customer.id)
+    result = await db.execute(stmt)
+    return result.scalar_one()
+
+
+async def upsert_customers(db: AsyncSession, customers: List[dict]) -> Dict[str, UUID]:
+    """
+    upsert_customer for many phone numbers in one statement, counting their visits too:
+    each dict has full_name, phone_number, notes, total_orders and total_spent (added to an
+    existing customer's totals). Phone numbers must be distinct. Returns phone_number -> id.
+    """
+    if not customers:
+        return {}
+    # Phone order, so two batches sharing customers lock them in the same order
+    stmt = insert(Customer).values(sorted(customers, key=lambda c: c["phone_number"]))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Customer.phone_number],
+        set_={
+            "full_name": func.coalesce(func.nullif(stmt.excluded.full_name, ""), Customer.full_name),
+            "total_orders": func.coalesce(Customer.total_orders, 0) + stmt.excluded.total_orders,
+            "total_spent": func.coalesce(Customer.total_spent, 0) + stmt.excluded.total_spent,
+            "updated_at": func.now(),
+        },
+    ).returning(Customer.phone_number, Customer.id)
+    result = await db.execute(stmt)
+    return {phone_number: customer_id for phone_number, customer_id in result.all()}
+
+
+async def add_customer_stats(db: AsyncSession, customer_id: Optional[UUID], orders: int, spent: Decimal) -> None:
+    """Add `orders` visits and `spent` to a customer's totals (negative to take an order away; floors at 0)"""
+    if not customer_id or (not orders and not spent):
+        return
+    await db.execute(
+        update(Customer)
+        .where(Customer.id == customer_id)
+        .values(
+            total_orders=func.greatest(func.coalesce(Customer.total_orders, 0) + orders, 0),
+            total_spent=func.greatest(func.coalesce(Customer.total_spent, 0) + spent, 0),
+        ),
+        execution_options={"synchronize_session": False},
+    )
+
+
+async def remove_orders_from_stats(db: AsyncSession, order_ids: Sequence[UUID]) -> None:
+    """Take the given orders off their customers' totals in one UPDATE (e.g. when voiding them)"""
+    per_customer = (
+        select(
+            Order.customer_id,
+            func.count(Order.id).label("order_count"),
+            func.sum(Order.total_amount).label("spent"),
+        )
+        .where(Order.id.in_(order_ids), Order.customer_id.isnot(None))
+        .group_by(Order.customer_id)
+        .subquery()
+    )
+    await db.execute(
+        update(Customer)
+        .where(Customer.id == per_customer.c.customer_id)
+        .values(
+            total_orders=func.greatest(func.coalesce(Customer.total_orders, 0) - per_customer.c.order_count, 0),
+            total_spent=func.greatest(func.coalesce(Customer.total_spent, 0) - per_customer.c.spent, 0),
+        ),
+        execution_options={"synchronize_session": False},
+    )
+
+
+async def rebuild_customer_stats(db: AsyncSession) -> int:
+    """Recompute every customer's totals from completed orders in one UPDATE; returns how many were wrong (caller commits)"""
+    totals = (
+        select(
+            Customer.id.label("customer_id"),
+            func.count(Order.id).label("order_count"),
+            func.coalesce(func.sum(Order.total_amount), 0).label("spent"),
+        )
+        .outerjoin(Order, and_(Order.customer_id == Customer.id, Order.status == ORDER_COMPLETED))
+        .group_by(Customer.id)
+        .subquery()
+    )
+    result = await db.execute(
+        update(Customer)
+        .where(Customer.id == totals.c.customer_id)
+        .where(
+            Customer.total_orders.is_distinct_from(totals.c.order_count)
+            | Customer.total_spent.is_distinct_from(totals.c.spent)
+        )
+        # Keep updated_at (shown as the customer's last visit) as it was
+        .values(total_orders=totals.c.order_count, total_spent=totals.c.spent, updated_at=Customer.updated_at),
+        execution_options={"synchronize_session": False},
+    )
+    return result.rowcount
@@ -1,8 +1,11 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import NullPool, AsyncAdaptedQueuePool
+import asyncio
 import os
+import time
 from dotenv import load_dotenv
+from .metrics import observe_pool_wait
 
 load_dotenv()
 
@@ -17,19 +20,65 @@ if not DATABASE_URL:
 db_info = DATABASE_URL.split('@')[-1] if '@' in DATABASE_URL else 'UNKNOWN'
 print(f"Connecting to DB: {db_info}")
 
-# Required when using pgbouncer (transaction/statement pool mode): disable prepared
-# statements and use NullPool so we don't get DuplicatePreparedStatementError.
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=os.getenv("SQL_ECHO", "false").lower() == "true",
-    poolclass=NullPool,
-    connect_args={
+# Connection pooling mode (DB_POOL_MODE):
+#   "pgbouncer" (default) - NullPool and no prepared statements. Required behind pgbouncer /
+#                           the Supabase pooler in transaction mode, otherwise we get
+#                           DuplicatePreparedStatementError.
+#   "queue"               - sized AsyncAdaptedQueuePool with pre-ping and recycle, prepared
+#                           statements still off (safe behind a session-mode pooler).
+#   "direct"              - queue pool plus asyncpg's prepared statement cache; only when the
+#                           app talks to Postgres directly with no transaction pooler in the path.
+POOL_MODES = ("pgbouncer", "queue", "direct")
+POOL_MODE = os.getenv("DB_POOL_MODE", "pgbouncer").strip().lower()
+if POOL_MODE not in POOL_MODES:
+    print(f"WARNING: Unknown DB_POOL_MODE '{POOL_MODE}', using 'pgbouncer'.")
+    POOL_MODE = "pgbouncer"
+
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds
+STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that reports how long each checkout waited (db_pool_wait_seconds)"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            observe_pool_wait(time.perf_counter() - started)
+
+
+def _engine_options(mode: str) -> dict:
+    connect_args = {
         "server_settings": {
             "application_name": "blissy_bakes_backend"
         },
-        # Disable asyncpg prepared statement cache (pgbouncer incompatible with it)
-        "statement_cache_size": 0,
-    },
+        # asyncpg prepared statement cache (pgbouncer in transaction mode is incompatible with it)
+        "statement_cache_size": STATEMENT_CACHE_SIZE if mode == "direct" else 0,
+    }
+    if mode == "pgbouncer":
+        return {"poolclass": NullPool, "connect_args": connect_args}
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": POOL_SIZE,
+        "max_overflow": MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE,
+        "pool_pre_ping": True,
+        "connect_args": connect_args,
+    }
+
+
+print(f"DB pool mode: {POOL_MODE}")
+
+engine = create_async_engine(
+    DATABASE_URL,
+    echo=os.getenv("SQL_ECHO", "false").lower() == "true",
+    **_engine_options(POOL_MODE),
 )
 
 AsyncSessionLocal = sessionmaker(
@@ -41,3 +90,37 @@ Base = declarative_base()
 async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
+
+
+async def with_session(fn, *args, **kwargs):
+    """Await fn(session, *args, **kwargs) with a session of its own (e.g. work shared by several requests)"""
+    async with AsyncSessionLocal() as session:
+        return await fn(session, *args, **kwargs)
+
+
+async def warm_pool() -> int:
+    """Open pool_size connections up front so the first requests don't pay connect + TLS"""
+    if POOL_MODE == "pgbouncer":
+        return 0
+
+    connections = await asyncio.gather(*(engine.connect() for _ in range(POOL_SIZE)))
+    try:
+        await asyncio.gather(*(conn.exec_driver_sql("SELECT 1") for conn in connections))
+    finally:
+        # Returned to the pool, not closed
+        await asyncio.gather(*(conn.close() for conn in connections))
+    return engine.pool.checkedin()
+
+
+def pool_stats() -> dict:
+    """Current pool usage (all zeros under NullPool, which keeps no connections)"""
+    pool = engine.pool
+    if isinstance(pool, NullPool):
+        return {"mode": POOL_MODE, "size": 0, "checkedIn": 0, "checkedOut": 0, "overflow": 0}
+    return {
+        "mode": POOL_MODE,
+        "size": pool.size(),
+        "checkedIn": pool.checkedin(),
+        "checkedOut": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
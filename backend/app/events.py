@@ -0,0 +1,270 @@
+"""
+Live events for dashboards and POS terminals, pushed over GET /events (SSE).
+
+Writes announce themselves with NOTIFY on the `bliss_events` channel inside
+their own transaction, so an event goes out only when the write commits:
+
+    order.created    checkout() in SQL (011_live_events.sql), POST /orders/batch
+    order.updated    PUT /orders/{id}
+    order.voided     void / delete / bulk void; order.refunded for refunds
+    stock.changed    bump_catalog() in SQL, i.e. every product, inventory and stock write,
+                     with each product's new stock (only the catalog version for big bumps)
+    stock.low        derived here: a product's stock fell to its low-stock threshold
+    resync           the worker may have missed events (LISTEN reconnected) or the
+                     subscriber fell behind; refetch what you show
+
+Each uvicorn worker opens one LISTEN connection (outside the pool, started by the
+first subscriber) and fans every event out to its subscribers. When the last
+subscriber leaves, the connection is closed after EVENTS_IDLE_SECONDS (30) without
+one, so a worker nobody listens to holds no connection while a browser that is
+only reconnecting doesn't make it reconnect as well. A subscriber has a
+bounded queue (EVENTS_QUEUE_SIZE): one that can't keep up never slows the others
+or grows memory, its backlog is dropped and replaced by a single `resync`.
+Behind a transaction pooler (the Supabase pooler on 6543) LISTEN doesn't work:
+set DATABASE_LISTEN_URL to a direct or session-mode connection.
+"""
+import asyncio
+import json
+import os
+from decimal import Decimal
+from typing import Dict, Iterable, Optional, Set
+
+import asyncpg
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import metrics
+from .database import DATABASE_URL, engine
+
+CHANNEL = "bliss_events"
+LISTEN_URL = os.getenv("DATABASE_LISTEN_URL") or DATABASE_URL
+QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+MAX_SUBSCRIBERS = int(os.getenv("EVENTS_MAX_SUBSCRIBERS", "1000"))
+HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+IDLE_SECONDS = float(os.getenv("EVENTS_IDLE_SECONDS", "30"))
+
+# NOTIFY payloads must stay under 8000 bytes; bulk voids are announced in chunks
+_IDS_PER_NOTIFY = 100
+_NOTIFY = text("SELECT pg_notify(:channel, :payload)")
+_ORDERS_CREATED = text("""
+    SELECT pg_notify(:channel, jsonb_build_object(
+        'type', 'order.created', 'orderId', id, 'orderNumber', order_number,
+        'totalAmount', total_amount, 'createdAt', created_at
+    )::text)
+    FROM orders
+    WHERE id = ANY(CAST(:order_ids AS uuid[]))
+    ORDER BY created_at, id
+""")
+_RECONNECT_DELAYS = (0.5, 1, 2, 5, 10)
+
+
+def _default(value):
+    # Amounts as numbers, as json_build_object writes them in SQL; UUIDs and dates as strings
+    return float(value) if isinstance(value, Decimal) else str(value)
+
+
+async def publish(db: AsyncSession, event_type: str, **data) -> None:
+    """Announce an event when the caller's transaction commits"""
+    payload = json.dumps({"type": event_type, **data}, default=_default, separators=(",", ":"))
+    await db.execute(_NOTIFY, {"channel": CHANNEL, "payload": payload})
+
+
+async def publish_orders(db: AsyncSession, event_type: str, order_ids: Iterable) -> None:
+    """`event_type` for many orders, {"orderIds": [...]} in as few NOTIFYs as fit"""
+    order_ids = [str(order_id) for order_id in order_ids]
+    for start in range(0, len(order_ids), _IDS_PER_NOTIFY):
+        await publish(db, event_type, orderIds=order_ids[start:start + _IDS_PER_NOTIFY])
+
+
+async def publish_orders_created(db: AsyncSession, order_ids: Iterable) -> None:
+    """order.created for each of `order_ids`, as checkout() sends it, in one statement"""
+    await db.execute(_ORDERS_CREATED, {"channel": CHANNEL, "order_ids": list(order_ids)})
+
+
+def _frame(event_id: int, event_type: str, data: str) -> str:
+    return f"id: {event_id}\nevent: {event_type}\ndata: {data}\n\n"
+
+
+class Subscriber:
+    def __init__(self, types: Optional[Set[str]]):
+        self.types = types  # None: everything
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.resyncs = 0
+
+
+class EventHub:
+    """One LISTEN connection per worker, fanned out to bounded subscriber queues"""
+
+    def __init__(self):
+        self.subscribers: Set[Subscriber] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._connection: Optional[asyncpg.Connection] = None  # the current LISTEN connection
+        self._idle: Optional[asyncio.TimerHandle] = None  # pending stop once nobody listens
+        self._connected = asyncio.Event()
+        self._next_id = 0
+        self._low_stock: Optional[Set[str]] = None  # product ids at/below threshold, once loaded
+        self.received = 0
+        self.delivered = 0
+        self.overflows = 0
+        self.reconnects = 0
+
+    # --- subscribers ---
+
+    def subscribe(self, types: Optional[Iterable[str]] = None) -> Optional[Subscriber]:
+        """A new subscriber, or None if this worker is at EVENTS_MAX_SUBSCRIBERS"""
+        if len(self.subscribers) >= MAX_SUBSCRIBERS:
+            return None
+        subscriber = Subscriber(set(types) if types else None)
+        self.subscribers.add(subscriber)
+        metrics.EVENT_SUBSCRIBERS.inc()
+        if self._idle is not None:
+            self._idle.cancel()
+            self._idle = None
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._listen())
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        if subscriber in self.subscribers:
+            self.subscribers.discard(subscriber)
+            metrics.EVENT_SUBSCRIBERS.dec()
+            if not self.subscribers and self._task is not None and self._idle is None:
+                self._idle = asyncio.get_running_loop().call_later(IDLE_SECONDS, self._stop_idle)
+
+    def _stop_idle(self):
+        """Close the LISTEN connection: nobody has subscribed for IDLE_SECONDS"""
+        self._idle = None
+        if not self.subscribers:
+            self._stop_listener()
+
+    def _stop_listener(self) -> Optional[asyncio.Task]:
+        """Cancel the listener task (it closes its connection); returns it to await, if any"""
+        task, self._task = self._task, None
+        self._connection = None
+        self._connected.clear()
+        self._low_stock = None
+        if task is not None:
+            task.cancel()
+        return task
+
+    async def wait_connected(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def _broadcast(self, event_type: str, data: str):
+        self._next_id += 1
+        frame = _frame(self._next_id, event_type, data)
+        for subscriber in self.subscribers:
+            if subscriber.types is not None and event_type not in subscriber.types and event_type != "resync":
+                continue
+            try:
+                subscriber.queue.put_nowait(frame)
+                self.delivered += 1
+            except asyncio.QueueFull:
+                # Too slow: drop its backlog rather than block everyone or buffer without bound
+                self.overflows += 1
+                subscriber.resyncs += 1
+                metrics.EVENT_OVERFLOWS.inc()
+                while not subscriber.queue.empty():
+                    subscriber.queue.get_nowait()
+                subscriber.queue.put_nowait(_frame(self._next_id, "resync", '{"reason":"overflow"}'))
+
+    # --- LISTEN connection ---
+
+    def _on_notify(self, connection, pid, channel, payload: str):
+        if connection is not self._connection:
+            return  # a stopped listener's connection, still closing
+        self.received += 1
+        try:
+            event = json.loads(payload)
+            event_type = event["type"]
+        except (ValueError, KeyError, TypeError):
+            return
+        self._broadcast(event_type, payload)
+        if event_type == "stock.changed" and self._low_stock is not None:
+            for item in event.get("items", ()):
+                product_id, low = item["productId"], item["stock"] <= item["minStock"]
+                if low and product_id not in self._low_stock:
+                    self._broadcast("stock.low", json.dumps({"type": "stock.low", **item}, separators=(",", ":")))
+                if low:
+                    self._low_stock.add(product_id)
+                else:
+                    self._low_stock.discard(product_id)
+
+    async def _connect(self) -> asyncpg.Connection:
+        cargs, cparams = engine.dialect.create_connect_args(make_url(LISTEN_URL))
+        connection = await asyncpg.connect(
+            *cargs, **cparams, statement_cache_size=0,
+            server_settings={"application_name": "blissy_bakes_events"},
+        )
+        await connection.add_listener(CHANNEL, self._on_notify)
+        # Listening before reading the low-stock set, so no crossing falls in between
+        rows = await connection.fetch("SELECT product_id FROM inventory WHERE stock_quantity <= low_stock_threshold")
+        self._low_stock = {str(row["product_id"]) for row in rows}
+        return connection
+
+    async def _listen(self):
+        attempt = 0
+        listened = False
+        while True:
+            connection = None
+            try:
+                connection = await self._connect()
+                lost = asyncio.Event()
+                connection.add_termination_listener(lambda _: lost.set())
+                self._connection = connection
+                if attempt or listened:
+                    # Events may have been missed while disconnected
+                    self.reconnects += 1
+                    self._broadcast("resync", '{"reason":"reconnected"}')
+                attempt = 0
+                listened = True
+                self._connected.set()
+                while not lost.is_set():
+                    try:
+                        await asyncio.wait_for(lost.wait(), HEARTBEAT_SECONDS * 2)
+                    except asyncio.TimeoutError:
+                        # Idle connections can die silently; make sure this one is still there
+                        await asyncio.wait_for(connection.fetchval("SELECT 1"), 10)
+            except asyncio.CancelledError:
+                if connection is not None:
+                    await connection.close()
+                raise
+            except Exception as e:
+                print(f"WARNING: event listener connection failed: {e}")
+            self._connection = None
+            self._connected.clear()
+            self._low_stock = None
+            if connection is not None and not connection.is_closed():
+                connection.terminate()
+            await asyncio.sleep(_RECONNECT_DELAYS[min(attempt, len(_RECONNECT_DELAYS) - 1)])
+            attempt += 1
+
+    async def stop(self):
+        if self._idle is not None:
+            self._idle.cancel()
+            self._idle = None
+        task = self._stop_listener()
+        if task is not None:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "connected": self._connected.is_set(),
+            "listening": self._task is not None,
+            "subscribers": len(self.subscribers),
+            "received": self.received,
+            "delivered": self.delivered,
+            "overflows": self.overflows,
+            "reconnects": self.reconnects,
+        }
+
+
+event_hub = EventHub()
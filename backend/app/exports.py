@@ -0,0 +1,270 @@
+"""
+Streaming sales exports (XLSX and CSV).
+
+Rows are read through a server-side cursor (`yield_per`) and encoded as they
+arrive, so memory stays flat and the first bytes go out before the query has
+finished, whether the export holds a hundred rows or a few million.
+
+XLSX files are written directly as a zip stream (inline strings, no shared
+string table) instead of through openpyxl: its write-only mode keeps memory
+flat too, but only produces the file in `save()`, after every row is written.
+Sheets roll over at Excel's row limit.
+"""
+import csv
+import io
+import re
+import zipfile
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import AsyncIterator, Iterable, List, Sequence
+from xml.sax.saxutils import escape
+
+from sqlalchemy import select, true
+
+from .database import AsyncSessionLocal
+from .models import ORDER_COMPLETED, Customer, Order, OrderItem, Product
+
+FETCH_SIZE = 2000          # rows per server-side cursor fetch
+FLUSH_BYTES = 64 * 1024    # send a chunk once this much output is buffered
+XLSX_MAX_ROWS = 1_048_576  # Excel's per-sheet limit, header row included
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+CSV_MEDIA_TYPE = "text/csv; charset=utf-8"
+
+SUMMARY_HEADERS = ["Order ID", "Time", "Amount", "Payment", "Status"]
+ITEM_HEADERS = [
+    "Order Number", "Order ID", "Date", "Time", "Customer", "Payment", "Status",
+    "Order Total", "Product", "Quantity", "Unit Price", "Line Total",
+]
+
+# Characters that are not allowed in XML 1.0
+_XML_ILLEGAL = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_ATTR_ENTITIES = {'"': "&quot;"}
+
+
+def day_range(start: date, end: date):
+    """created_at bounds covering start..end inclusive"""
+    return datetime.combine(start, time.min), datetime.combine(end + timedelta(days=1), time.min)
+
+
+def _in_range(start_at: datetime, end_at: datetime, include_voided: bool):
+    # status = 'completed' plus the created_at range is served by idx_orders_status_created
+    conditions = [Order.created_at >= start_at, Order.created_at < end_at]
+    if not include_voided:
+        conditions.append(Order.status == ORDER_COMPLETED)
+    return conditions
+
+
+def _summary_query(start_at: datetime, end_at: datetime, include_voided: bool):
+    return (
+        select(Order.id, Order.created_at, Order.total_amount, Order.payment_method, Order.status)
+        .where(*_in_range(start_at, end_at, include_voided))
+        .order_by(Order.created_at, Order.id)
+    )
+
+
+def _items_query(start_at: datetime, end_at: datetime, include_voided: bool):
+    # One row per line item; orders without items still get a row. The lines are a LATERAL
+    # subquery per order, so they always come from idx_order_items_order as the orders stream
+    # out of the range index, instead of a hash of all of order_items built before the first row.
+    items = (
+        select(OrderItem.id, OrderItem.product_id, OrderItem.quantity, OrderItem.unit_price, OrderItem.total_price)
+        .where(OrderItem.order_id == Order.id)
+        .order_by(OrderItem.id)  # also keeps Postgres from flattening it into a plain join
+        .lateral("items")
+    )
+    return (
+        select(
+            Order.order_number,
+            Order.id,
+            Order.created_at,
+            Customer.full_name,
+            Order.payment_method,
+            Order.status,
+            Order.total_amount,
+            Product.name,
+            items.c.quantity,
+            items.c.unit_price,
+            items.c.total_price,
+        )
+        .outerjoin(Customer, Customer.id == Order.customer_id)
+        .outerjoin(items, true())
+        .outerjoin(Product, Product.id == items.c.product_id)
+        .where(*_in_range(start_at, end_at, include_voided))
+        .order_by(Order.created_at, Order.id, items.c.id)
+    )
+
+
+def _summary_row(row) -> list:
+    return [str(row.id), row.created_at.strftime("%H:%M:%S"), float(row.total_amount), row.payment_method, row.status]
+
+
+def _item_row(row) -> list:
+    return [
+        row.order_number or "",
+        str(row.id),
+        row.created_at.strftime("%Y-%m-%d"),
+        row.created_at.strftime("%H:%M:%S"),
+        row.full_name or "",
+        row.payment_method,
+        row.status,
+        float(row.total_amount),
+        row.name or "",
+        row.quantity,
+        float(row.unit_price) if row.unit_price is not None else None,
+        float(row.total_price) if row.total_price is not None else None,
+    ]
+
+
+async def iter_order_rows(
+    start_at: datetime, end_at: datetime, with_items: bool, include_voided: bool = False
+) -> AsyncIterator[List[list]]:
+    """
+    Batches of export rows for completed (or with include_voided, all) orders created in [start_at, end_at).
+    Uses its own session: a StreamingResponse body runs after request dependencies are closed.
+    """
+    query = (_items_query if with_items else _summary_query)(start_at, end_at, include_voided)
+    to_row = _item_row if with_items else _summary_row
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=FETCH_SIZE))
+        async for partition in result.partitions():
+            yield [to_row(row) for row in partition]
+
+
+async def csv_chunks(headers: Sequence[str], batches: AsyncIterator[List[list]]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM so Excel opens the file as UTF-8
+    buffer.write("\ufeff")
+    writer.writerow(headers)
+    async for rows in batches:
+        writer.writerows(rows)
+        if buffer.tell() >= FLUSH_BYTES:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Unseekable file object for zipfile that collects output until it's taken"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self.buffered = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self.buffered += len(data)
+        return len(data)
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        self.buffered = 0
+        return data
+
+
+def _cell(value) -> str:
+    if value is None:
+        return "<c/>"
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float, Decimal)):
+        return f"<c><v>{value}</v></c>"
+    text = escape(_XML_ILLEGAL.sub("", str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xml_row(values: Iterable) -> str:
+    return "<row>" + "".join(_cell(value) for value in values) + "</row>"
+
+
+_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_END = "</sheetData></worksheet>"
+
+
+def _workbook_parts(titles: List[str]) -> dict:
+    count = len(titles)
+    sheet_overrides = "".join(
+        f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        for i in range(1, count + 1)
+    )
+    sheets = "".join(
+        f'<sheet name="{escape(title, _ATTR_ENTITIES)}" sheetId="{i}" r:id="rId{i}"/>' for i, title in enumerate(titles, 1)
+    )
+    sheet_rels = "".join(
+        f'<Relationship Id="rId{i}" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        f'Target="worksheets/sheet{i}.xml"/>'
+        for i in range(1, count + 1)
+    )
+    header = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    return {
+        "[Content_Types].xml": (
+            header + '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            f"{sheet_overrides}</Types>"
+        ),
+        "_rels/.rels": (
+            header + '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+            'Target="xl/workbook.xml"/></Relationships>'
+        ),
+        "xl/workbook.xml": (
+            header + '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f"<sheets>{sheets}</sheets></workbook>"
+        ),
+        "xl/_rels/workbook.xml.rels": (
+            header + '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f"{sheet_rels}</Relationships>"
+        ),
+    }
+
+
+async def xlsx_chunks(title: str, headers: Sequence[str], batches: AsyncIterator[List[list]]) -> AsyncIterator[bytes]:
+    sink = _ChunkSink()
+    header_row = _xml_row(headers)
+    titles: List[str] = []
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=6) as archive:
+        sheet = None
+        rows_in_sheet = 0
+        async for rows in batches:
+            for values in rows:
+                if sheet is None or rows_in_sheet >= XLSX_MAX_ROWS:
+                    if sheet is not None:
+                        sheet.write(_SHEET_END.encode())
+                        sheet.close()
+                    titles.append(title if not titles else f"{title} ({len(titles) + 1})")
+                    sheet = archive.open(f"xl/worksheets/sheet{len(titles)}.xml", "w", force_zip64=True)
+                    sheet.write((_SHEET_START + header_row).encode())
+                    rows_in_sheet = 1
+                sheet.write(_xml_row(values).encode())
+                rows_in_sheet += 1
+            if sink.buffered >= FLUSH_BYTES:
+                yield sink.take()
+
+        if sheet is None:
+            # No orders: still a valid workbook with just the headers
+            titles.append(title)
+            sheet = archive.open("xl/worksheets/sheet1.xml", "w")
+            sheet.write((_SHEET_START + header_row).encode())
+        sheet.write(_SHEET_END.encode())
+        sheet.close()
+
+        # Parts that list the sheets go last, once we know how many there are
+        for name, xml in _workbook_parts(titles).items():
+            archive.writestr(name, xml)
+    yield sink.take()
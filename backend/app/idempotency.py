@@ -0,0 +1,130 @@
+"""
+Idempotency-Key support for POST /orders/create.
+
+Flaky networks make the frontend retry a checkout whose response it never
+got. A request with an `Idempotency-Key` header is placed at most once:
+
+- the key is claimed and the order placed by one statement, checkout_once()
+  (013_idempotency_keys.sql), which stores the response (200, or 400 for a
+  stock rejection) under the key in the same transaction; a retry gets the
+  stored response, marked with `Idempotent-Replayed: true`
+- a retry arriving while the first attempt is still running waits for it:
+  on this worker through the in-flight table below, on other workers by
+  blocking on the claimed (uncommitted) key row in Postgres
+- answers are also kept in a per-worker LRU cache, so most retries don't
+  reach the database at all
+- reusing a key for a different order body is refused with 422
+
+Keys expire after IDEMPOTENCY_TTL_HOURS (24); `prune_idempotency_keys.py`
+deletes expired rows. IDEMPOTENCY_CACHE_SIZE (10000) caps the LRU cache.
+"""
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Tuple
+
+from sqlalchemy import delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24")) * 3600
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyConflict(Exception):
+    """The key was already used with a different request body"""
+
+
+def request_hash(body: str) -> str:
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """Per-worker LRU cache of answered keys, plus the keys being answered right now"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.waits = 0
+        self.misses = 0
+
+    async def run(self, key: str, body_hash: str, execute: Callable[[], Awaitable[dict]]) -> dict:
+        """
+        The outcome for `key` ({"replayed", "requestHash", "status", "body", "expiresIn"}):
+        cached, shared with an attempt in flight on this worker, or from `execute()`.
+        Raises IdempotencyConflict if the key belongs to another request body.
+        """
+        while True:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self._check({**entry[1], "replayed": True}, body_hash)
+
+            pending = self._pending.get(key)
+            if pending is None:
+                break
+            # A retry of a request still in progress: wait for its answer rather than race it
+            self.waits += 1
+            await asyncio.wait([pending])
+            if not pending.cancelled() and pending.exception() is None:
+                return self._check({**pending.result(), "replayed": True}, body_hash)
+            # The first attempt failed (nothing was stored): loop and run it ourselves
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            outcome = await execute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # waiters retry; don't warn about an unobserved exception
+            raise
+        finally:
+            self._pending.pop(key, None)
+
+        self._store(key, outcome)
+        future.set_result(outcome)
+        return self._check(outcome, body_hash)
+
+    def _store(self, key: str, outcome: dict):
+        if self.size <= 0:
+            return
+        self._entries[key] = (time.monotonic() + float(outcome["expiresIn"]), outcome)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    @staticmethod
+    def _check(outcome: dict, body_hash: str) -> dict:
+        if outcome["requestHash"] != body_hash:
+            raise IdempotencyConflict()
+        return outcome
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "inFlight": len(self._pending),
+            "hits": self.hits,
+            "waits": self.waits,
+            "misses": self.misses,
+        }
+
+
+async def prune_idempotency_keys(db: AsyncSession) -> int:
+    """Delete expired keys; returns how many. The caller commits."""
+    result = await db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= func.now()))
+    return result.rowcount
+
+
+idempotency_store = IdempotencyStore(size=int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000")))
@@ -0,0 +1,179 @@
+"""
+Content-addressed storage for product images.
+
+Uploads are stored once under their SHA-256 (`<sha256>.<ext>`) either on local
+disk (default) or in an S3-compatible bucket, and products keep only the short
+path `/images/<sha256>.<ext>`, served by routers/images.py. Resized variants
+live next to the originals (see thumbnails.py).
+
+Settings:
+    IMAGE_STORAGE        "local" (default) or "s3"
+    IMAGE_STORAGE_DIR    local directory (default: backend/media/images)
+    IMAGE_S3_BUCKET, IMAGE_S3_ENDPOINT_URL, IMAGE_S3_PREFIX
+                         S3 settings (credentials come from the usual AWS_* variables)
+    PUBLIC_API_URL       absolute base URL for image links (default: the request's base URL)
+"""
+import asyncio
+import base64
+import hashlib
+import os
+import re
+import uuid
+from pathlib import Path
+from typing import Optional, Tuple
+
+IMAGE_URL_PREFIX = "/images/"
+MAX_IMAGE_SIZE = 5 * 1024 * 1024  # 5MB
+
+# MIME type -> stored file extension
+IMAGE_TYPES = {
+    "image/jpeg": "jpg",
+    "image/jpg": "jpg",
+    "image/png": "png",
+    "image/gif": "gif",
+    "image/webp": "webp",
+}
+CONTENT_TYPES = {"jpg": "image/jpeg", "png": "image/png", "gif": "image/gif", "webp": "image/webp"}
+
+IMAGE_NAME = re.compile(r"^[0-9a-f]{64}\.(jpg|png|gif|webp)$")
+DATA_URI = re.compile(r"^data:(?P<mime>[\w/+.-]+);base64,(?P<data>.*)$", re.DOTALL)
+
+
+class LocalImageStore:
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+
+    def _path(self, name: str) -> Path:
+        # Fan out into subdirectories so no single directory grows too large
+        return self.directory / name[:2] / name
+
+    def exists(self, name: str) -> bool:
+        return self._path(name).is_file()
+
+    def put(self, name: str, contents: bytes, content_type: str) -> None:
+        path = self._path(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename so a concurrent reader never sees a partial file. The temporary name is
+        # unique per call: two threads of one worker may store the same image at the same time.
+        tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            tmp_path.write_bytes(contents)
+            os.replace(tmp_path, path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+    def size(self, name: str) -> Optional[int]:
+        path = self._path(name)
+        return path.stat().st_size if path.is_file() else None
+
+    def read(self, name: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        """Bytes start..end inclusive (whole file by default)"""
+        with open(self._path(name), "rb") as f:
+            f.seek(start)
+            return f.read() if end is None else f.read(end - start + 1)
+
+
+class S3ImageStore:
+    def __init__(self, bucket: str, endpoint_url: Optional[str] = None, prefix: str = "images/"):
+        try:
+            import boto3
+        except ImportError as e:
+            raise RuntimeError("IMAGE_STORAGE=s3 requires boto3 (pip install boto3)") from e
+        self.client = boto3.client("s3", endpoint_url=endpoint_url)
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def exists(self, name: str) -> bool:
+        return self.size(name) is not None
+
+    def put(self, name: str, contents: bytes, content_type: str) -> None:
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=self.prefix + name,
+            Body=contents,
+            ContentType=content_type,
+            CacheControl="public, max-age=31536000, immutable",
+        )
+
+    def size(self, name: str) -> Optional[int]:
+        from botocore.exceptions import ClientError
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self.prefix + name)["ContentLength"]
+        except ClientError:
+            return None
+
+    def read(self, name: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        kwargs = {"Bucket": self.bucket, "Key": self.prefix + name}
+        if start or end is not None:
+            kwargs["Range"] = f"bytes={start}-{'' if end is None else end}"
+        return self.client.get_object(**kwargs)["Body"].read()
+
+
+def _create_store():
+    if os.getenv("IMAGE_STORAGE", "local").lower() == "s3":
+        return S3ImageStore(
+            bucket=os.environ["IMAGE_S3_BUCKET"],
+            endpoint_url=os.getenv("IMAGE_S3_ENDPOINT_URL") or None,
+            prefix=os.getenv("IMAGE_S3_PREFIX", "images/"),
+        )
+    default_dir = Path(__file__).resolve().parent.parent / "media" / "images"
+    return LocalImageStore(os.getenv("IMAGE_STORAGE_DIR", str(default_dir)))
+
+
+_store = None
+
+
+def get_store():
+    global _store
+    if _store is None:
+        _store = _create_store()
+    return _store
+
+
+def image_name(contents: bytes, mime_type: str) -> str:
+    return f"{hashlib.sha256(contents).hexdigest()}.{IMAGE_TYPES[mime_type]}"
+
+
+async def save_image(contents: bytes, mime_type: str) -> str:
+    """Store image bytes (deduplicated by hash) and return the short path to put in image_url"""
+    name = image_name(contents, mime_type)
+    store = get_store()
+    if not await asyncio.to_thread(store.exists, name):
+        await asyncio.to_thread(store.put, name, contents, CONTENT_TYPES[name.rsplit(".", 1)[1]])
+    return IMAGE_URL_PREFIX + name
+
+
+def decode_data_uri(value: str) -> Optional[Tuple[bytes, str]]:
+    """(bytes, mime_type) for a base64 image data URI we can store, else None"""
+    match = DATA_URI.match(value or "")
+    if not match or match.group("mime") not in IMAGE_TYPES:
+        return None
+    return base64.b64decode(match.group("data")), match.group("mime")
+
+
+async def store_image_url(value: str, base_url: str) -> str:
+    """
+    image_url to persist for a client-supplied URL: image data URIs go into the store
+    and links back to our own /images/ endpoint are shortened to the stored path.
+    """
+    decoded = decode_data_uri(value)
+    if decoded:
+        return await save_image(*decoded)
+    for public_base in {public_base_url(base_url), base_url.rstrip("/")}:
+        if value.startswith(public_base + IMAGE_URL_PREFIX) and IMAGE_NAME.match(value[len(public_base + IMAGE_URL_PREFIX):]):
+            return value[len(public_base):]
+    return value
+
+
+def public_base_url(base_url: str) -> str:
+    return os.getenv("PUBLIC_API_URL", base_url).rstrip("/")
+
+
+def image_src(image_url: Optional[str], base_url: str) -> str:
+    """Image value for API responses: stored paths become absolute URLs, emoji fallback"""
+    if not image_url:
+        return "🎂"
+    if image_url.startswith(IMAGE_URL_PREFIX):
+        return public_base_url(base_url) + image_url
+    return image_url
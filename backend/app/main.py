@@ -1,10 +1,18 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from .routers import auth, orders, analytics, customers, products, inventory, expenses, offers, bulk_orders, staff
-from .database import engine, Base
+from fastapi.responses import ORJSONResponse
+from .routers import auth, orders, analytics, customers, products, inventory, expenses, offers, bulk_orders, staff, images, sync, events
+from .database import POOL_MODE, POOL_SIZE, engine, warm_pool, pool_stats
+from .cache import stats_cache
+from .events import event_hub
+from .idempotency import REPLAYED_HEADER, idempotency_store
+from .pagination import NEXT_CURSOR_HEADER
+from .query_stats import QueryCountMiddleware, instrument, query_stats
+from . import metrics, migrations
 import asyncio
 
-app = FastAPI(title="Blissy Bakes API", version="1.0.0")
+# orjson for every JSON response; the list endpoints go further (see responses.py)
+app = FastAPI(title="Blissy Bakes API", version="1.0.0", default_response_class=ORJSONResponse)
 
 # CORS Setup
 # With allow_credentials=True, browser requires explicit origins (no "*")
@@ -26,8 +34,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
     allow_headers=["*"],
-    expose_headers=["*"],
+    # Response headers the frontend reads; listed, since "*" doesn't apply to credentialed requests
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", "Server-Timing", REPLAYED_HEADER],
 )
+# Statement count and DB time per request: Server-Timing header and GET /health/queries
+instrument(engine)
+app.add_middleware(QueryCountMiddleware)
+# Prometheus metrics: GET /metrics (app/metrics.py)
+metrics.instrument(engine, pool_size=0 if POOL_MODE == "pgbouncer" else POOL_SIZE)
+if metrics.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
 
 # Include Routers
 app.include_router(auth.router)
@@ -40,16 +56,57 @@ app.include_router(expenses.router)
 app.include_router(offers.router)
 app.include_router(bulk_orders.router)
 app.include_router(staff.router)
+app.include_router(images.router)
+app.include_router(sync.router)
+app.include_router(events.router)
 
 @app.get("/")
 async def root():
     return {"message": "Welcome to Blissy Bakes Python API"}
 
-# Startup Event (Optional: create tables if not exist)
+@app.get("/health")
+async def health():
+    return {"status": "ok", "pool": pool_stats(), "statsCache": stats_cache.stats(), "events": event_hub.stats(),
+            "idempotency": idempotency_store.stats()}
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/health/queries")
+async def health_queries(reset: bool = False):
+    """Per-route SQL statement counts and DB time for this worker (reset=true clears them afterwards)"""
+    stats = query_stats.stats()
+    if reset:
+        query_stats.reset()
+    return stats
+
+# Startup: the schema is managed by `python migrate.py` (app/migrations.py) as a deploy
+# step; here we only check the database is at the version this code expects.
+#   AUTO_MIGRATE=true            apply pending migrations at startup instead (local development)
+#   REQUIRE_SCHEMA_VERSION=true  refuse to start on an out-of-date schema instead of warning
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "false").lower() == "true"
+REQUIRE_SCHEMA_VERSION = os.getenv("REQUIRE_SCHEMA_VERSION", "false").lower() == "true"
+
 @app.on_event("startup")
 async def startup():
-    # In production, use Alembic for migrations.
-    # Here we can create tables for dev convenience if they don't exist.
-    async with engine.begin() as conn:
-        # await conn.run_sync(Base.metadata.drop_all) # DATA LOSS WARNING
-        await conn.run_sync(Base.metadata.create_all)
+    expected = migrations.latest_version()
+    if AUTO_MIGRATE:
+        await migrations.migrate(engine)
+    async with engine.connect() as conn:
+        version = await migrations.schema_version(conn)
+    if version is None or version < expected:
+        message = (f"database schema at version {version or 0}, this build expects {expected}; "
+                   "run `python migrate.py` (or `python migrate.py --baseline N` for a database set up by hand)")
+        if REQUIRE_SCHEMA_VERSION:
+            raise RuntimeError(message)
+        print(f"WARNING: {message}")
+    # Open the pooled connections now rather than on the first requests (no-op for NullPool)
+    warmed = await warm_pool()
+    print(f"DB pool ready: {warmed} connections warmed")
+
+@app.on_event("shutdown")
+async def shutdown():
+    await event_hub.stop()
+    metrics.worker_exit()
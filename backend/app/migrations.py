@@ -0,0 +1,194 @@
+"""
+Versioned schema migrations.
+
+The schema is the numbered SQL files in supabase/migrations (NNN_description.sql),
+applied in order by `python migrate.py` as a deploy step (Procfile release
+phase), never by the API process. Each file runs as a single multi-statement
+script in its own transaction, so a failed migration leaves nothing half-applied,
+and is recorded in schema_migrations with a checksum of its contents. A
+transaction-level advisory lock serialises concurrent runners (two release
+processes, or a deploy racing a developer).
+
+A database whose tables predate schema_migrations (set up from
+001_init_schema.sql by hand, as production was) has no history to go on: when
+the tables already exist and nothing is recorded, the first run records 001 as
+applied without running it and applies the rest. If later files were also
+applied by hand, record them first with `migrate.py --baseline N`.
+
+At startup the API only reads the highest applied version and compares it with
+the newest file it ships with: two short queries instead of create_all
+reflecting every table.
+"""
+import hashlib
+import re
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "supabase" / "migrations"
+
+# pg_advisory_xact_lock key, arbitrary but fixed ("blissmig")
+LOCK_KEY = 0x626C6973736D6967
+
+# The hand-applied schema an existing database is assumed to have (001_init_schema.sql)
+INITIAL_VERSION = 1
+
+_FILE_NAME = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+_CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    checksum TEXT NOT NULL,
+    applied_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL
+)
+"""
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    path: Path
+
+    @property
+    def sql(self) -> str:
+        return self.path.read_text()
+
+    @property
+    def checksum(self) -> str:
+        return hashlib.sha256(self.path.read_bytes()).hexdigest()
+
+
+def discover(directory: Path = MIGRATIONS_DIR) -> List[Migration]:
+    """The migration files in version order"""
+    migrations = []
+    for path in directory.glob("*.sql"):
+        match = _FILE_NAME.match(path.name)
+        if match:
+            migrations.append(Migration(int(match.group(1)), match.group(2), path))
+    migrations.sort()
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration versions in {directory}")
+    return migrations
+
+
+def latest_version(directory: Path = MIGRATIONS_DIR) -> int:
+    migrations = discover(directory)
+    return migrations[-1].version if migrations else 0
+
+
+async def _applied(conn: AsyncConnection) -> Dict[int, str]:
+    """version -> checksum of the recorded migrations (the table must exist)"""
+    result = await conn.execute(text("SELECT version, checksum FROM schema_migrations"))
+    return dict(result.all())
+
+
+async def schema_version(conn: AsyncConnection) -> Optional[int]:
+    """Highest applied version, None if this database has never been migrated"""
+    if not (await conn.execute(text("SELECT to_regclass('schema_migrations') IS NOT NULL"))).scalar():
+        return None
+    return (await conn.execute(text("SELECT coalesce(max(version), 0) FROM schema_migrations"))).scalar()
+
+
+async def _lock(conn: AsyncConnection):
+    await conn.execute(text(_CREATE_TABLE))
+    await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": LOCK_KEY})
+
+
+async def _record(conn: AsyncConnection, migration: Migration):
+    await conn.execute(
+        text("INSERT INTO schema_migrations (version, name, checksum) VALUES (:version, :name, :checksum)"),
+        {"version": migration.version, "name": migration.name, "checksum": migration.checksum},
+    )
+
+
+async def _baseline_existing(conn: AsyncConnection, migrations: List[Migration]) -> Optional[Migration]:
+    """
+    Record the initial migration as applied if this database already has its tables but
+    no migration history (call under the lock). Returns the migration recorded, if any.
+    """
+    initial = next((m for m in migrations if m.version == INITIAL_VERSION), None)
+    if initial is None or await _applied(conn):
+        return None
+    if not (await conn.execute(text("SELECT to_regclass('public.orders') IS NOT NULL"))).scalar():
+        return None
+    await _record(conn, initial)
+    return initial
+
+
+async def _run_script(conn: AsyncConnection, sql: str):
+    """
+    Run a whole file at once over the simple query protocol (asyncpg's execute without
+    arguments), inside the transaction SQLAlchemy already began, so $$-quoted function
+    bodies and any number of statements need no splitting.
+    """
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.execute(sql)
+
+
+async def status(engine: AsyncEngine, directory: Path = MIGRATIONS_DIR) -> List[tuple]:
+    """(migration, state) for every file: 'applied', 'pending' or 'changed' (checksum differs)"""
+    async with engine.connect() as conn:
+        applied = await _applied(conn) if await schema_version(conn) is not None else {}
+    states = []
+    for migration in discover(directory):
+        checksum = applied.get(migration.version)
+        if checksum is None:
+            states.append((migration, "pending"))
+        else:
+            states.append((migration, "applied" if checksum == migration.checksum else "changed"))
+    return states
+
+
+async def migrate(engine: AsyncEngine, target: Optional[int] = None, directory: Path = MIGRATIONS_DIR) -> List[Migration]:
+    """
+    Apply the pending migrations up to `target` (default: all), one transaction each.
+    Returns the ones applied. Refuses to continue past an applied file that has since been edited.
+    """
+    migrations = discover(directory)
+    async with engine.begin() as conn:
+        await _lock(conn)
+        initial = await _baseline_existing(conn, migrations)
+    if initial is not None:
+        print(f"Existing schema without migration history: recorded {initial.path.name} as applied")
+
+    done = []
+    for migration in migrations:
+        if target is not None and migration.version > target:
+            break
+        async with engine.begin() as conn:
+            await _lock(conn)
+            # Re-read under the lock: another runner may have applied it meanwhile
+            checksum = (await _applied(conn)).get(migration.version)
+            if checksum is not None:
+                if checksum != migration.checksum:
+                    raise RuntimeError(
+                        f"{migration.path.name} was changed after it was applied; "
+                        "add a new migration instead of editing an old one"
+                    )
+                continue
+            print(f"Applying {migration.path.name}...")
+            await _run_script(conn, migration.sql)
+            await _record(conn, migration)
+        done.append(migration)
+    return done
+
+
+async def baseline(engine: AsyncEngine, version: int, directory: Path = MIGRATIONS_DIR) -> List[Migration]:
+    """
+    Record the migrations up to `version` as applied without running them, for a
+    database whose schema was set up by hand before schema_migrations existed.
+    """
+    marked = []
+    async with engine.begin() as conn:
+        await _lock(conn)
+        applied = await _applied(conn)
+        for migration in discover(directory):
+            if migration.version > version or migration.version in applied:
+                continue
+            await _record(conn, migration)
+            marked.append(migration)
+    return marked
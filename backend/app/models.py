@@ -1,7 +1,7 @@
-from sqlalchemy import Column, String, Integer, Float, Boolean, ForeignKey, DateTime, DECIMAL, Date, Text
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Integer, BigInteger, Float, Boolean, ForeignKey, DateTime, DECIMAL, Date, Text, Index, Computed
+from sqlalchemy.dialects.postgresql import JSONB, UUID, TSVECTOR
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 import uuid
 from .database import Base
 
@@ -21,7 +21,7 @@ class Customer(Base):
     __tablename__ = "customers"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     full_name = Column(String, nullable=False)
     phone_number = Column(String, unique=True, nullable=True)
@@ -30,9 +30,20 @@ class Customer(Base):
     total_orders = Column(Integer, default=0)
     total_spent = Column(DECIMAL(10, 2), default=0.00)
     tenant_id = Column(UUID(as_uuid=True), nullable=True)
+    # Maintained by Postgres for customer search (app/customer_search.py)
+    phone_digits = Column(Text, Computed("regexp_replace(coalesce(phone_number, ''), '[^0-9]', '', 'g')"))
+    search_vector = Column(TSVECTOR, Computed("to_tsvector('simple', coalesce(full_name, ''))"))
 
     orders = relationship("Order", back_populates="customer")
 
+    # supabase/migrations/005_customer_search.sql, 015_customer_list_created.sql
+    __table_args__ = (
+        Index("idx_customers_search", "search_vector", postgresql_using="gin"),
+        Index("idx_customers_name_prefix", text('lower(full_name) COLLATE "C"'), "id"),
+        Index("idx_customers_phone_digits", text('phone_digits COLLATE "C"'), "id"),
+        Index("idx_customers_created_id", "created_at", "id"),
+    )
+
 class Product(Base):
     __tablename__ = "products"
 
@@ -47,7 +58,9 @@ class Product(Base):
     is_available = Column(Boolean, default=True)
     tenant_id = Column(UUID(as_uuid=True), nullable=True)
 
-    inventory = relationship("Inventory", back_populates="product", uselist=False)
+    # Deleting a product leaves its inventory row to ON DELETE CASCADE instead of the ORM
+    # loading it and nulling product_id (an extra SELECT + UPDATE and an orphaned row)
+    inventory = relationship("Inventory", back_populates="product", uselist=False, passive_deletes="all")
 
 class Inventory(Base):
     __tablename__ = "inventory"
@@ -61,24 +74,89 @@ class Inventory(Base):
 
     product = relationship("Product", back_populates="inventory")
 
+    # supabase/migrations/007_missing_indexes.sql
+    __table_args__ = (
+        Index("idx_inventory_low_stock", "stock_quantity", postgresql_where=text("stock_quantity <= low_stock_threshold")),
+    )
+
+# Order.status values. Only completed orders count towards sales, rollups and customer
+# totals; voided (cancelled, stock restored) and refunded orders are kept for history.
+ORDER_COMPLETED = "completed"
+ORDER_VOIDED = "voided"
+ORDER_REFUNDED = "refunded"
+
 class Order(Base):
     __tablename__ = "orders"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    order_number = Column(String, unique=True, nullable=True)  # Sequential order number like BB001
+    order_number = Column(String, nullable=True)  # Sequential order number like BB001, unique per tenant
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     customer_id = Column(UUID(as_uuid=True), ForeignKey("customers.id", ondelete="SET NULL"), nullable=True)
     staff_id = Column(UUID(as_uuid=True), ForeignKey("app_users.id", ondelete="SET NULL"), nullable=True)
     total_amount = Column(DECIMAL(10, 2), nullable=False)
     payment_method = Column(String, nullable=False)
-    status = Column(String, default="completed", nullable=False)
+    status = Column(String, default=ORDER_COMPLETED, nullable=False)
     notes = Column(Text, nullable=True)
     tenant_id = Column(UUID(as_uuid=True), nullable=True)
+    client_key = Column(String, nullable=True)  # set by the POS for orders queued offline (app/order_batches.py)
 
     customer = relationship("Customer", back_populates="orders")
     items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
     staff = relationship("AppUser")
 
+    # Order history keyset pagination (supabase/migrations/004_order_history_indexes.sql)
+    __table_args__ = (
+        Index("idx_orders_created_id", "created_at", "id"),
+        Index("idx_orders_status_created", "status", "created_at", "id"),
+        Index("idx_orders_payment_created", "payment_method", "created_at", "id"),
+        Index("idx_orders_staff_created", "staff_id", "created_at", "id"),
+        Index("idx_orders_customer_created", "customer_id", "created_at", "id"),
+        Index("idx_orders_client_key", "client_key", unique=True, postgresql_where=text("client_key IS NOT NULL")),
+        # One counter per tenant (014_order_number_per_tenant.sql)
+        Index("idx_orders_tenant_order_number", "tenant_id", "order_number", unique=True,
+              postgresql_where=text("tenant_id IS NOT NULL")),
+        Index("idx_orders_default_order_number", "order_number", unique=True,
+              postgresql_where=text("tenant_id IS NULL")),
+    )
+
+class OrderNumberCounter(Base):
+    __tablename__ = "order_number_counters"
+
+    scope = Column(String, primary_key=True)  # tenant_id, or "default" for single-shop installs
+    last_value = Column(BigInteger, nullable=False, default=0)  # last number handed out (BB{last_value})
+
+class CatalogVersion(Base):
+    __tablename__ = "catalog_version"
+
+    id = Column(Boolean, primary_key=True, default=True)  # a single row (009_catalog_version.sql)
+    version = Column(BigInteger, nullable=False, default=1)  # bumped by every product/inventory/stock write
+    pruned_through = Column(BigInteger, nullable=False, default=0)  # sync cursors before this get a full snapshot
+
+class CatalogChange(Base):
+    __tablename__ = "catalog_changes"
+
+    product_id = Column(UUID(as_uuid=True), primary_key=True)  # no FK: kept as a tombstone after a delete
+    version = Column(BigInteger, nullable=False)  # catalog version of the product's last change
+    changed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("idx_catalog_changes_version", "version"),
+    )
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    key = Column(Text, primary_key=True)  # the client's Idempotency-Key (app/idempotency.py)
+    request_hash = Column(Text, nullable=False)
+    status_code = Column(Integer, nullable=False)
+    response = Column(JSONB, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index("idx_idempotency_keys_expires", "expires_at"),
+    )
+
 class OrderItem(Base):
     __tablename__ = "order_items"
 
@@ -93,6 +171,28 @@ class OrderItem(Base):
     order = relationship("Order", back_populates="items")
     product = relationship("Product") # Unidirectional link to product
 
+    # supabase/migrations/007_missing_indexes.sql
+    __table_args__ = (
+        Index("idx_order_items_order", "order_id"),
+        Index("idx_order_items_product_order", "product_id", "order_id"),
+    )
+
+class SalesHourly(Base):
+    """Order count and sales per UTC hour, maintained by order writes (see rollups.py)"""
+    __tablename__ = "sales_hourly"
+
+    bucket_start = Column(DateTime, primary_key=True)  # start of the hour, UTC
+    order_count = Column(Integer, default=0, nullable=False)
+    total_sales = Column(DECIMAL(12, 2), default=0.00, nullable=False)
+
+class ProductSalesDaily(Base):
+    """Units sold per product per UTC day, maintained by order writes (see rollups.py)"""
+    __tablename__ = "product_sales_daily"
+
+    sale_date = Column(Date, primary_key=True)
+    product_id = Column(UUID(as_uuid=True), ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    quantity = Column(Integer, default=0, nullable=False)
+
 class DailyReport(Base):
     __tablename__ = "daily_reports"
 
@@ -118,6 +218,13 @@ class BulkOrder(Base):
     advance_paid = Column(DECIMAL(10, 2), default=0.00)
     tenant_id = Column(UUID(as_uuid=True), nullable=True)
 
+    # supabase/migrations/007_missing_indexes.sql
+    __table_args__ = (
+        Index("idx_bulk_orders_delivery", "delivery_date"),
+        Index("idx_bulk_orders_status_delivery", "status", "delivery_date"),
+        Index("idx_bulk_orders_customer", "customer_id"),
+    )
+
 class Expense(Base):
     __tablename__ = "expenses"
 
@@ -130,6 +237,12 @@ class Expense(Base):
     logged_by = Column(UUID(as_uuid=True), ForeignKey("app_users.id", ondelete="SET NULL"), nullable=True)
     tenant_id = Column(UUID(as_uuid=True), nullable=True)
 
+    # supabase/migrations/007_missing_indexes.sql
+    __table_args__ = (
+        Index("idx_expenses_date_created", "date", "created_at"),
+        Index("idx_expenses_category_date", "category", "date", "created_at"),
+    )
+
 class Offer(Base):
     __tablename__ = "offers"
 
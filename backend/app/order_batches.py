@@ -0,0 +1,188 @@
+"""
+Ingesting orders that POS terminals queued while offline (POST /orders/batch).
+
+A terminal that lost its connection replays hundreds of orders at once. Each
+carries a `clientKey` the terminal generated when it queued it, stored on the
+order (012_offline_orders.sql), so replaying a batch again after a timeout
+skips the orders already applied. The whole batch is one transaction with a
+fixed number of statements, whatever its size:
+
+- take the batch lock, so two replays of the same orders can't both insert them
+- look up the keys already applied
+- lock every inventory row the batch touches and allocate stock in memory, order
+  by order in the terminal's order; an order that doesn't fit is rejected on its
+  own and the rest go ahead
+- upsert all their customers, with their visits and spend, in one statement
+- take a block of order numbers with one counter update
+- insert the orders and their items with one INSERT ... SELECT FROM unnest(...) each
+- deduct the net stock per product in one UPDATE
+- add them to the dashboard rollups, bump the catalog version and announce them
+
+Offline orders keep the time they were sold (`createdAt`), so the rollups count
+them in the hour they happened.
+"""
+from collections import defaultdict
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Dict, List, Sequence
+from uuid import uuid4
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import rollups
+from .catalog import bump_catalog_version
+from .customer_stats import upsert_customers
+from .events import publish_orders_created
+from .models import ORDER_COMPLETED, Order
+from .order_numbers import allocate_order_numbers
+from .stock import aggregate_quantities, apply_stock_deltas, lock_stock
+
+BATCH_CREATED = "created"
+BATCH_DUPLICATE = "duplicate"
+BATCH_REJECTED = "rejected"
+
+# Transaction-level advisory lock held by every batch ("BB" "batch")
+_BATCH_LOCK = 0x4242_6261_7463_68
+
+_CENTS = Decimal("0.01")
+
+_INSERT_ORDERS = text("""
+    INSERT INTO orders (id, order_number, customer_id, staff_id, total_amount, payment_method, status, notes, created_at, client_key)
+    SELECT o.id, o.order_number, o.customer_id, o.staff_id, o.total_amount, o.payment_method, :status, o.notes,
+           COALESCE(o.created_at, now()), o.client_key
+    FROM unnest(
+        CAST(:ids AS uuid[]), CAST(:order_numbers AS text[]), CAST(:customer_ids AS uuid[]), CAST(:staff_ids AS uuid[]),
+        CAST(:total_amounts AS numeric[]), CAST(:payment_methods AS text[]), CAST(:notes AS text[]),
+        CAST(:created_ats AS timestamptz[]), CAST(:client_keys AS text[])
+    ) AS o(id, order_number, customer_id, staff_id, total_amount, payment_method, notes, created_at, client_key)
+""")
+
+_INSERT_ITEMS = text("""
+    INSERT INTO order_items (id, order_id, product_id, quantity, unit_price, total_price)
+    SELECT gen_random_uuid(), i.order_id, i.product_id, i.quantity, i.unit_price, i.unit_price * i.quantity
+    FROM unnest(
+        CAST(:order_ids AS uuid[]), CAST(:product_ids AS uuid[]), CAST(:quantities AS integer[]),
+        CAST(:unit_prices AS numeric[])
+    ) AS i(order_id, product_id, quantity, unit_price)
+""")
+
+
+def _money(value: float) -> Decimal:
+    return Decimal(str(value)).quantize(_CENTS)
+
+
+def _sold_at(order, now: datetime):
+    """The order's createdAt as an aware time no later than now (None: the database's now())"""
+    if order.createdAt is None:
+        return None
+    sold_at = order.createdAt if order.createdAt.tzinfo else order.createdAt.replace(tzinfo=timezone.utc)
+    return min(sold_at, now)
+
+
+async def ingest_orders(db: AsyncSession, orders: Sequence) -> List[dict]:
+    """
+    Apply a batch of OfflineOrderRequests and return one BatchOrderResult dict per order,
+    in the same order. The caller commits.
+    """
+    await db.execute(select(func.pg_advisory_xact_lock(_BATCH_LOCK)))
+
+    keys = {order.clientKey for order in orders}
+    result = await db.execute(
+        select(Order.client_key, Order.id, Order.order_number).where(Order.client_key.in_(keys))
+    )
+    applied = {key: (order_id, number) for key, order_id, number in result.all()}
+
+    pending = [order for order in orders if order.clientKey not in applied]
+    stock = await lock_stock(db, {item.id for order in pending for item in order.items})
+
+    # Allocate stock in the terminal's order; results point at the order they describe
+    results: Dict[str, dict] = {}
+    accepted = []
+    for order in orders:
+        key = order.clientKey
+        if key in results:
+            continue  # repeated within the batch: answered like its first occurrence below
+        if key in applied:
+            order_id, number = applied[key]
+            results[key] = {"clientKey": key, "status": BATCH_DUPLICATE, "orderId": order_id, "orderNumber": number}
+            continue
+        quantities = aggregate_quantities(order.items)
+        missing = [product_id for product_id in sorted(quantities) if product_id not in stock]
+        insufficient = [
+            product_id for product_id, quantity in sorted(quantities.items())
+            if product_id in stock and stock[product_id] < quantity
+        ]
+        problems = []
+        if insufficient:
+            problems.append(f"Insufficient stock for product id {', '.join(str(p) for p in insufficient)}")
+        if missing:
+            problems.append(f"Inventory record not found for product id {', '.join(str(p) for p in missing)}")
+        if problems:
+            results[key] = {"clientKey": key, "status": BATCH_REJECTED, "error": "; ".join(problems)}
+            continue
+        for product_id, quantity in quantities.items():
+            stock[product_id] -= quantity
+        results[key] = {"clientKey": key, "status": BATCH_CREATED, "orderId": uuid4()}
+        accepted.append((order, quantities))
+
+    if accepted:
+        await _insert_orders(db, accepted, results)
+
+    answers = []
+    seen = set()
+    for order in orders:
+        answer = results[order.clientKey]
+        if order.clientKey in seen and answer["status"] == BATCH_CREATED:
+            answer = {**answer, "status": BATCH_DUPLICATE}
+        seen.add(order.clientKey)
+        answers.append({"orderId": None, "orderNumber": None, "error": None, **answer})
+    return answers
+
+
+async def _insert_orders(db: AsyncSession, accepted: list, results: Dict[str, dict]) -> None:
+    customers: Dict[str, dict] = {}
+    for order, _ in accepted:
+        # One row per phone number: the latest name and notes, every visit and its spend
+        row = customers.setdefault(order.customer.phoneNumber, {
+            "phone_number": order.customer.phoneNumber, "total_orders": 0, "total_spent": Decimal(0),
+        })
+        row["full_name"] = order.customer.fullName
+        row["notes"] = order.customer.notes if order.customer.notes is not None else row.get("notes")
+        row["total_orders"] += 1
+        row["total_spent"] += _money(order.totalAmount)
+    customer_ids = await upsert_customers(db, list(customers.values()))
+
+    numbers = await allocate_order_numbers(db, len(accepted))
+    now = datetime.now(timezone.utc)
+    columns = defaultdict(list)
+    items = defaultdict(list)
+    deductions: Dict = defaultdict(int)
+    for (order, quantities), number in zip(accepted, numbers):
+        answer = results[order.clientKey]
+        answer["orderNumber"] = number
+        columns["ids"].append(answer["orderId"])
+        columns["order_numbers"].append(number)
+        columns["customer_ids"].append(customer_ids[order.customer.phoneNumber])
+        columns["staff_ids"].append(order.staffId)
+        columns["total_amounts"].append(_money(order.totalAmount))
+        columns["payment_methods"].append(order.paymentMethod)
+        columns["notes"].append(order.notes)
+        columns["created_ats"].append(_sold_at(order, now))
+        columns["client_keys"].append(order.clientKey)
+        for item in order.items:
+            items["order_ids"].append(answer["orderId"])
+            items["product_ids"].append(item.id)
+            items["quantities"].append(item.quantity)
+            items["unit_prices"].append(_money(item.price))
+        for product_id, quantity in quantities.items():
+            deductions[product_id] -= quantity
+
+    await db.execute(_INSERT_ORDERS, {"status": ORDER_COMPLETED, **columns})
+    if items:
+        await db.execute(_INSERT_ITEMS, dict(items))
+    await apply_stock_deltas(db, deductions)
+    await rollups.apply_orders(db, columns["ids"])
+    if deductions:
+        await bump_catalog_version(db, deductions)
+    await publish_orders_created(db, columns["ids"])
@@ -0,0 +1,158 @@
+"""
+Diff-based order edits for PUT /orders/{id}.
+
+An edit is compared with the order as stored instead of restoring and deleting
+every old line and re-inserting and re-deducting every new one:
+
+- item lines are matched per product; unchanged lines aren't touched, changed
+  ones are updated, and added/removed ones inserted/deleted, each kind with one
+  batched statement
+- stock moves only for products whose total quantity changed
+- the dashboard rollups move by the change in sales and units
+- customer totals move only if the customer or the total changed
+
+so a header-only edit (payment method, notes) is a single UPDATE of the order.
+Locks are taken in the order checkout() uses: stock, customer, rollups, catalog version.
+"""
+from collections import defaultdict
+from decimal import Decimal
+from itertools import zip_longest
+from typing import Dict, List, NamedTuple
+from uuid import UUID
+
+from sqlalchemy import delete, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import rollups
+from .catalog import bump_catalog_version
+from .customer_stats import add_customer_stats, upsert_customer
+from .models import Order, OrderItem
+from .stock import adjust_stock, aggregate_quantities
+
+_CENTS = Decimal("0.01")
+
+
+class ItemChanges(NamedTuple):
+    inserts: List[dict]  # new order_items rows
+    updates: List[dict]  # {"id", "quantity", "unit_price", "total_price"} for changed lines
+    deletes: List[UUID]  # order_items ids to remove
+    quantity_deltas: Dict[UUID, int]  # product_id -> new minus old units, non-zero only
+
+
+def _line_values(item) -> dict:
+    """order_items column values for an OrderItemRequest, rounded like the DECIMAL(10, 2) columns"""
+    return {
+        "product_id": item.id,
+        "quantity": item.quantity,
+        "unit_price": Decimal(str(item.price)).quantize(_CENTS),
+        "total_price": Decimal(str(item.price * item.quantity)).quantize(_CENTS),
+    }
+
+
+def diff_items(order_id: UUID, old_items, new_items) -> ItemChanges:
+    """
+    Compare an order's OrderItems with the requested OrderItemRequests. Lines are
+    paired per product in their original order, so repeated products are diffed line by line.
+    """
+    old_by_product = defaultdict(list)
+    for item in old_items:
+        old_by_product[item.product_id].append(item)
+    new_by_product = defaultdict(list)
+    for item in new_items:
+        new_by_product[item.id].append(item)
+
+    inserts, updates, deletes = [], [], []
+    for product_id in sorted(set(old_by_product) | set(new_by_product), key=str):
+        for old, new in zip_longest(old_by_product.get(product_id, []), new_by_product.get(product_id, [])):
+            if new is None:
+                deletes.append(old.id)
+                continue
+            line = _line_values(new)
+            if old is None:
+                inserts.append({"order_id": order_id, **line})
+            elif (old.quantity, old.unit_price, old.total_price) != (line["quantity"], line["unit_price"], line["total_price"]):
+                updates.append({
+                    "id": old.id,
+                    "quantity": line["quantity"],
+                    "unit_price": line["unit_price"],
+                    "total_price": line["total_price"],
+                })
+
+    old_quantities = aggregate_quantities(old_items, key="product_id")
+    new_quantities = aggregate_quantities(new_items)
+    quantity_deltas = {
+        product_id: new_quantities.get(product_id, 0) - old_quantities.get(product_id, 0)
+        for product_id in set(old_quantities) | set(new_quantities)
+    }
+    return ItemChanges(
+        inserts, updates, deletes,
+        {product_id: delta for product_id, delta in quantity_deltas.items() if delta},
+    )
+
+
+def _same_customer(order: Order, customer) -> bool:
+    """Whether the request's customer is the order's current one, unchanged (no upsert needed)"""
+    current = order.customer
+    return bool(
+        current
+        and current.phone_number == customer.phoneNumber
+        and (not customer.fullName or customer.fullName == current.full_name)
+    )
+
+
+async def edit_order(db: AsyncSession, order: Order, order_data) -> List[str]:
+    """
+    Apply an UpdateOrderRequest to `order` (loaded with its items and customer).
+    Returns stock problems, in which case nothing should be committed; otherwise the caller commits.
+    """
+    changes = diff_items(order.id, order.items, order_data.items)
+    old_total = order.total_amount or Decimal("0")
+    new_total = Decimal(str(order_data.totalAmount))
+
+    # 1. Stock: only products whose quantity changed, in one locked batch
+    if changes.quantity_deltas:
+        problems = await adjust_stock(
+            db,
+            {product_id: delta for product_id, delta in changes.quantity_deltas.items() if delta > 0},
+            restore={product_id: -delta for product_id, delta in changes.quantity_deltas.items() if delta < 0},
+        )
+        if problems:
+            return problems
+
+    # 2. Customer: resolve by phone only if it changed, then move the visit and spend
+    old_customer_id = order.customer_id
+    if _same_customer(order, order_data.customer):
+        customer_id = old_customer_id
+    else:
+        customer_id = await upsert_customer(db, order_data.customer)
+    if customer_id == old_customer_id:
+        await add_customer_stats(db, customer_id, 0, new_total - old_total)
+    else:
+        await add_customer_stats(db, old_customer_id, -1, -old_total)
+        await add_customer_stats(db, customer_id, 1, new_total)
+
+    # 3. Dashboard rollups
+    await rollups.apply_order_delta(db, order.id, new_total - old_total, changes.quantity_deltas)
+
+    # 4. Item lines
+    if changes.deletes:
+        await db.execute(
+            delete(OrderItem).where(OrderItem.id.in_(changes.deletes)),
+            execution_options={"synchronize_session": False},
+        )
+    if changes.updates:
+        await db.execute(update(OrderItem), changes.updates)
+    if changes.inserts:
+        await db.execute(insert(OrderItem), changes.inserts)
+
+    # 5. Header (the ORM only writes the columns that actually changed)
+    order.customer_id = customer_id
+    order.total_amount = new_total
+    order.payment_method = order_data.paymentMethod
+    order.notes = order_data.notes
+
+    # 6. Catalog version, if stock moved (last: the row is held until commit; see catalog.py)
+    moved = [product_id for product_id, delta in changes.quantity_deltas.items() if delta]
+    if moved:
+        await bump_catalog_version(db, moved)
+    return []
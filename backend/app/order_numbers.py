@@ -0,0 +1,84 @@
+"""
+Sequential order number allocation (BB001, BB002, ...).
+
+Numbers come from a single counter row per tenant in `order_number_counters`.
+Allocating is one `UPDATE ... RETURNING` that row-locks the counter until the
+surrounding transaction commits, so concurrent checkouts can never mint the
+same number and a rolled-back checkout does not leave a gap.
+"""
+from typing import List, Optional
+from uuid import UUID
+
+from sqlalchemy import BigInteger, cast, func, literal, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import Order, OrderNumberCounter
+
+ORDER_NUMBER_PREFIX = "BB"
+DEFAULT_SCOPE = "default"
+
+
+def counter_scope(tenant_id: Optional[UUID] = None) -> str:
+    """Counter key for a tenant (single-shop installs share the default row)"""
+    return str(tenant_id) if tenant_id else DEFAULT_SCOPE
+
+
+def format_order_number(number: int) -> str:
+    return f"{ORDER_NUMBER_PREFIX}{str(number).zfill(3)}"
+
+
+def max_order_number_expr():
+    """SQL expression for the highest numeric order number in `orders` ("#BB012" -> 12)"""
+    digits = func.nullif(func.regexp_replace(Order.order_number, r"\D", "", "g"), "")
+    return func.coalesce(func.max(cast(digits, BigInteger)), 0)
+
+
+async def seed_counter(db: AsyncSession, tenant_id: Optional[UUID] = None) -> None:
+    """
+    Create the counter row for a tenant from the highest existing order number.
+    A no-op when the row already exists; this is the only place that scans `orders`.
+    """
+    highest = select(max_order_number_expr()).where(Order.order_number.isnot(None))
+    if tenant_id:
+        highest = highest.where(Order.tenant_id == tenant_id)
+    else:
+        highest = highest.where(Order.tenant_id.is_(None))
+
+    stmt = (
+        insert(OrderNumberCounter)
+        .from_select(
+            ["scope", "last_value"],
+            select(literal(counter_scope(tenant_id)), highest.scalar_subquery()),
+        )
+        .on_conflict_do_nothing(index_elements=["scope"])
+    )
+    await db.execute(stmt)
+
+
+async def allocate_order_number(db: AsyncSession, tenant_id: Optional[UUID] = None) -> str:
+    """
+    Hand out the next order number for a tenant inside the caller's transaction.
+    The counter row stays locked until commit/rollback.
+    """
+    return (await allocate_order_numbers(db, 1, tenant_id))[0]
+
+
+async def allocate_order_numbers(db: AsyncSession, count: int, tenant_id: Optional[UUID] = None) -> List[str]:
+    """`count` consecutive order numbers with one counter update (e.g. a batch of offline orders)"""
+    stmt = (
+        update(OrderNumberCounter)
+        .where(OrderNumberCounter.scope == counter_scope(tenant_id))
+        .values(last_value=OrderNumberCounter.last_value + count)
+        .returning(OrderNumberCounter.last_value)
+    )
+    result = await db.execute(stmt)
+    last = result.scalar()
+
+    if last is None:
+        # First order for this tenant (or counter never migrated): seed once, then retry
+        await seed_counter(db, tenant_id)
+        result = await db.execute(stmt)
+        last = result.scalar()
+
+    return [format_order_number(number) for number in range(last - count + 1, last + 1)]
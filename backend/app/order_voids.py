@@ -0,0 +1,64 @@
+"""
+Voiding and refunding orders.
+
+Orders are never deleted: voiding (a mistaken or cancelled sale) or refunding
+changes Order.status and takes the order out of everything that counts sales,
+so history and exports keep the record. Any number of orders is handled in one
+transaction with a fixed number of statements:
+
+- lock the still-completed orders (others are skipped, so retries are harmless)
+- voids only: give their stock back with one locked, aggregated UPDATE
+  (refunded goods have left the shop and aren't restocked)
+- take them off their customers' totals in one set-based UPDATE
+- take them out of the dashboard rollups with one upsert per rollup table
+- set their status
+- voids only: bump the catalog version (app/catalog.py)
+"""
+from typing import List, Sequence
+from uuid import UUID
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import rollups
+from .catalog import bump_catalog_version
+from .customer_stats import remove_orders_from_stats
+from .models import ORDER_COMPLETED, ORDER_VOIDED, Order, OrderItem
+from .stock import adjust_stock
+
+
+async def void_orders(db: AsyncSession, order_ids: Sequence[UUID], status: str = ORDER_VOIDED) -> List[UUID]:
+    """
+    Mark the completed orders among order_ids as `status` (ORDER_VOIDED or ORDER_REFUNDED).
+    Returns the ids that changed; the caller commits.
+    """
+    result = await db.execute(
+        select(Order.id)
+        .where(Order.id.in_(set(order_ids)), Order.status == ORDER_COMPLETED)
+        .order_by(Order.id)
+        .with_for_update()
+    )
+    ids = result.scalars().all()
+    if not ids:
+        return []
+
+    restored = {}
+    if status == ORDER_VOIDED:
+        quantities = await db.execute(
+            select(OrderItem.product_id, func.sum(OrderItem.quantity))
+            .where(OrderItem.order_id.in_(ids), OrderItem.product_id.isnot(None))
+            .group_by(OrderItem.product_id)
+        )
+        restored = {product_id: int(quantity) for product_id, quantity in quantities.all()}
+        await adjust_stock(db, {}, restore=restored)
+
+    await remove_orders_from_stats(db, ids)
+    await rollups.apply_orders(db, ids, -1)
+    await db.execute(
+        update(Order).where(Order.id.in_(ids)).values(status=status),
+        execution_options={"synchronize_session": False},
+    )
+    if restored:
+        # Stock came back, so the POS menu changed (last: the row is held until commit)
+        await bump_catalog_version(db, restored)
+    return ids
@@ -0,0 +1,31 @@
+"""
+Opaque cursors for paged list endpoints.
+
+A cursor is the url-safe base64 of a small JSON list of values, e.g. the
+(created_at, id) keyset of the last row on a page. Endpoints send the next
+page's cursor in the X-Next-Cursor response header and read it back from
+the `cursor` query parameter.
+"""
+import base64
+import json
+from typing import List
+
+from fastapi import HTTPException
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*parts) -> str:
+    raw = json.dumps([str(part) for part in parts], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, count: int) -> List[str]:
+    """The `count` values packed into `cursor`; 400 if it isn't one of ours"""
+    try:
+        parts = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        parts = None
+    if not isinstance(parts, list) or len(parts) != count or not all(isinstance(p, str) for p in parts):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return parts
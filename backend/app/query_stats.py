@@ -0,0 +1,168 @@
+"""
+Per-request SQL statement counting.
+
+Engine events time every statement the app sends and add it to the current
+request's RequestQueries (a ContextVar set by QueryCountMiddleware), so each
+response carries a Server-Timing header:
+
+    Server-Timing: db;dur=4.1;desc="3 queries", db-slowest;dur=2.7, app;dur=9.8
+
+(browser dev tools show it in the request's Timing tab). When the request ends
+its numbers are folded into per-route aggregates, served by GET /health/queries:
+requests, queries per request (mean and max), DB time and the slowest statement
+seen. A request that runs the same SQL text N_PLUS_ONE_THRESHOLD times or more
+(one statement per row of an earlier result, the N+1 pattern) is logged with a
+WARNING and counted against its route. executemany batches count as one statement.
+
+tests/test_query_budgets.py holds each endpoint to a query budget (the
+query_budget fixture in tests/conftest.py); benchmarks/check_query_budgets.py
+checks the same budgets on a running server using the header.
+"""
+import os
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import MutableHeaders
+
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+
+
+class RequestQueries:
+    """Statements run while handling one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest = 0.0
+        self.slowest_statement: Optional[str] = None
+        self.repeats: Counter = Counter()
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        self.repeats[statement] += 1
+        if seconds > self.slowest:
+            self.slowest, self.slowest_statement = seconds, statement
+
+    def repeated(self) -> Optional[tuple]:
+        """(statement, times) of the most repeated statement if it looks like N+1"""
+        if not self.repeats:
+            return None
+        statement, times = self.repeats.most_common(1)[0]
+        return (statement, times) if times >= N_PLUS_ONE_THRESHOLD else None
+
+    def server_timing(self, total_seconds: float) -> str:
+        return (f'db;dur={self.seconds * 1000:.1f};desc="{self.count} quer{"y" if self.count == 1 else "ies"}", '
+                f"db-slowest;dur={self.slowest * 1000:.1f}, app;dur={total_seconds * 1000:.1f}")
+
+
+_current: ContextVar[Optional[RequestQueries]] = ContextVar("request_queries", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    queries = _current.get()
+    started = getattr(context, "_query_started", None)
+    if queries is not None and started is not None:
+        queries.record(statement, time.perf_counter() - started)
+
+
+def instrument(engine: AsyncEngine):
+    """Time every statement on `engine` (statements outside a request are ignored)"""
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class RouteStats:
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.seconds = 0.0
+        self.slowest = 0.0
+        self.slowest_statement: Optional[str] = None
+        self.n_plus_one = 0
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "queriesPerRequest": round(self.queries / self.requests, 2) if self.requests else 0.0,
+            "maxQueries": self.max_queries,
+            "dbMsPerRequest": round(self.seconds * 1000 / self.requests, 2) if self.requests else 0.0,
+            "slowestMs": round(self.slowest * 1000, 2),
+            "slowestStatement": self.slowest_statement,
+            "nPlusOne": self.n_plus_one,
+        }
+
+
+class QueryStats:
+    """Aggregates per route template ("GET /orders/{order_id}") for this worker"""
+
+    def __init__(self):
+        self.routes: Dict[str, RouteStats] = {}
+
+    def record(self, route: str, queries: RequestQueries) -> None:
+        stats = self.routes.get(route)
+        if stats is None:
+            stats = self.routes[route] = RouteStats()
+        stats.requests += 1
+        stats.queries += queries.count
+        stats.max_queries = max(stats.max_queries, queries.count)
+        stats.seconds += queries.seconds
+        if queries.slowest > stats.slowest:
+            stats.slowest, stats.slowest_statement = queries.slowest, queries.slowest_statement
+        repeated = queries.repeated()
+        if repeated:
+            stats.n_plus_one += 1
+            statement, times = repeated
+            print(f"WARNING: possible N+1 in {route}: same statement {times} times: {' '.join(statement.split())[:200]}")
+
+    def stats(self) -> dict:
+        """Routes with the most queries per request first"""
+        ranked = sorted(self.routes.items(), key=lambda item: item[1].queries / item[1].requests, reverse=True)
+        return {route: stats.stats() for route, stats in ranked}
+
+    def reset(self) -> None:
+        self.routes.clear()
+
+
+query_stats = QueryStats()
+
+
+class QueryCountMiddleware:
+    """ASGI middleware: collects a request's statements, adds Server-Timing and records the route's aggregates"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        queries = RequestQueries()
+        token = _current.set(queries)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                # Streamed responses: covers what ran before the first byte; the aggregates get the rest
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", queries.server_timing(time.perf_counter() - started))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            # FastAPI puts the matched route in the scope
+            route = scope.get("route")
+            query_stats.record(f"{scope['method']} {getattr(route, 'path', '(unmatched)')}", queries)
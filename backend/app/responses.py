@@ -0,0 +1,52 @@
+"""
+Fast JSON responses for the list endpoints.
+
+With `response_model=List[X]` FastAPI's own path is slow for big lists: the router
+builds a model per row, FastAPI dumps those back to dicts, validates the dicts
+against the response model again, serializes the result to JSON-ready Python
+objects and finally runs the stdlib json encoder over it. The list endpoints
+instead build plain dicts (each router's `_..._row` projection is the one place
+a row's shape is decided) and return `json_response(rows, List[X])`, which
+encodes them with orjson in one call. FastAPI passes a returned Response through
+untouched, and `response_model` stays on the route for the OpenAPI schema.
+
+The projections are trusted and not validated. VALIDATE_RESPONSES=true (for
+development and CI) validates every fast response once against its response
+type with a TypeAdapter and serializes through pydantic, which is exactly what
+FastAPI would have sent.
+"""
+import os
+import uuid
+from functools import lru_cache
+from typing import Any, Mapping, Optional
+
+import orjson
+from fastapi import Response
+from pydantic import TypeAdapter
+
+VALIDATE_RESPONSES = os.getenv("VALIDATE_RESPONSES", "false").lower() == "true"
+
+# Datetimes are native to orjson; UTC as "Z" like pydantic writes it
+_ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+
+def _default(value):
+    # orjson only knows uuid.UUID itself; asyncpg returns its own subclass
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+@lru_cache(maxsize=None)
+def _adapter(response_type) -> TypeAdapter:
+    return TypeAdapter(response_type)
+
+
+def json_response(content: Any, response_type, headers: Optional[Mapping[str, str]] = None) -> Response:
+    """`content` (dicts shaped like `response_type`, e.g. List[OrderView]) as a JSON response"""
+    if VALIDATE_RESPONSES:
+        adapter = _adapter(response_type)
+        body = adapter.dump_json(adapter.validate_python(content))
+    else:
+        body = orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+    return Response(body, media_type="application/json", headers=headers)
@@ -0,0 +1,169 @@
+"""
+Pre-aggregated sales rollups for the dashboard.
+
+`sales_hourly` holds order count and sales per UTC hour and `product_sales_daily`
+units sold per product per UTC day. Order writes in routers/orders.py apply
+each order to the rollups in the same transaction (+1 when it is created, -1
+when it is voided or refunded, and just the change in sales and units when it
+is edited), so dashboard stats read a few hundred rows at most regardless of
+order history. `rebuild_rollups.py` regenerates both tables from completed
+orders/order_items.
+"""
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Sequence
+from uuid import UUID
+
+from sqlalchemy import Integer, and_, column, delete, desc, func, literal, literal_column, select, values
+from sqlalchemy.dialects.postgresql import UUID as PGUUID, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import ORDER_COMPLETED, Order, OrderItem, Product, ProductSalesDaily, SalesHourly
+
+
+# Inlined rather than bound so GROUP BY matches the selected expression
+_HOUR = literal_column("'hour'")
+_UTC = literal_column("'UTC'")
+
+
+def _hour_bucket(created_at):
+    return func.date_trunc(_HOUR, func.timezone(_UTC, created_at))
+
+
+def _day_bucket(created_at):
+    return func.date(func.timezone(_UTC, created_at))
+
+
+def _hourly_upsert(source):
+    stmt = insert(SalesHourly).from_select(["bucket_start", "order_count", "total_sales"], source)
+    return stmt.on_conflict_do_update(
+        index_elements=[SalesHourly.bucket_start],
+        set_={
+            "order_count": SalesHourly.order_count + stmt.excluded.order_count,
+            "total_sales": SalesHourly.total_sales + stmt.excluded.total_sales,
+        },
+    )
+
+
+def _product_upsert(source):
+    stmt = insert(ProductSalesDaily).from_select(["sale_date", "product_id", "quantity"], source)
+    return stmt.on_conflict_do_update(
+        index_elements=[ProductSalesDaily.sale_date, ProductSalesDaily.product_id],
+        set_={"quantity": ProductSalesDaily.quantity + stmt.excluded.quantity},
+    )
+
+
+async def apply_order(db: AsyncSession, order_id: UUID, sign: int = 1) -> None:
+    """
+    Add (sign=1) or remove (sign=-1) an order's current database state to/from the rollups.
+    Pending ORM changes are flushed first so the order and its items are up to date.
+    """
+    await apply_orders(db, [order_id], sign)
+
+
+async def apply_orders(db: AsyncSession, order_ids: Sequence[UUID], sign: int = 1) -> None:
+    """apply_order for many orders at once: one upsert per rollup table"""
+    await db.flush()
+    await db.execute(_hourly_upsert(
+        select(_hour_bucket(Order.created_at), func.count(Order.id) * sign, func.sum(Order.total_amount) * sign)
+        .where(Order.id.in_(order_ids))
+        .group_by(_hour_bucket(Order.created_at))
+    ))
+    await db.execute(_product_upsert(
+        select(_day_bucket(Order.created_at), OrderItem.product_id, func.sum(OrderItem.quantity) * sign)
+        .join(Order, OrderItem.order_id == Order.id)
+        .where(and_(Order.id.in_(order_ids), OrderItem.product_id.isnot(None)))
+        .group_by(_day_bucket(Order.created_at), OrderItem.product_id)
+    ))
+
+
+async def apply_order_delta(
+    db: AsyncSession, order_id: UUID, sales_delta: Decimal, quantity_deltas: Dict[UUID, int]
+) -> None:
+    """
+    Shift an order's contribution to the rollups after an edit: its hour's sales by
+    sales_delta and its day's units per product by quantity_deltas (the order count is unchanged).
+    """
+    if sales_delta:
+        await db.execute(_hourly_upsert(
+            select(_hour_bucket(Order.created_at), literal(0), literal(sales_delta))
+            .where(Order.id == order_id)
+        ))
+    if quantity_deltas:
+        deltas = values(
+            column("product_id", PGUUID(as_uuid=True)),
+            column("quantity", Integer),
+            name="deltas",
+        ).data(sorted(quantity_deltas.items()))
+        sale_date = select(_day_bucket(Order.created_at)).where(Order.id == order_id).scalar_subquery()
+        await db.execute(_product_upsert(select(sale_date, deltas.c.product_id, deltas.c.quantity)))
+
+
+async def rebuild_rollups(db: AsyncSession) -> None:
+    """Regenerate both rollup tables from raw completed orders (caller commits)"""
+    await db.execute(delete(SalesHourly))
+    await db.execute(delete(ProductSalesDaily))
+    await db.execute(_hourly_upsert(
+        select(_hour_bucket(Order.created_at), func.count(Order.id), func.sum(Order.total_amount))
+        .where(Order.status == ORDER_COMPLETED)
+        .group_by(_hour_bucket(Order.created_at))
+    ))
+    await db.execute(_product_upsert(
+        select(_day_bucket(Order.created_at), OrderItem.product_id, func.sum(OrderItem.quantity))
+        .join(Order, OrderItem.order_id == Order.id)
+        .where(and_(Order.status == ORDER_COMPLETED, OrderItem.product_id.isnot(None)))
+        .group_by(_day_bucket(Order.created_at), OrderItem.product_id)
+    ))
+
+
+def _truncate_hour(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def _hours_between(start: datetime, end: datetime):
+    return and_(SalesHourly.bucket_start >= _truncate_hour(start), SalesHourly.bucket_start <= end)
+
+
+# Query builders for the dashboard. Each returns a single-row/small SELECT so the
+# caller can combine them into one statement (see analytics.load_dashboard_stats).
+
+def sales_totals_query(start: datetime, end: datetime):
+    """(total_sales, order_count) for whole UTC hours overlapping [start, end]"""
+    return select(
+        func.coalesce(func.sum(SalesHourly.total_sales), 0).label("total_sales"),
+        func.coalesce(func.sum(SalesHourly.order_count), 0).label("order_count"),
+    ).where(_hours_between(start, end))
+
+
+def hourly_sales_query(start: datetime, end: datetime):
+    """JSON array of [hour of day, order_count, total_sales] for the hours in [start, end]"""
+    hour = func.extract("hour", SalesHourly.bucket_start)
+    per_hour = (
+        select(
+            hour.label("hour"),
+            func.sum(SalesHourly.order_count).label("order_count"),
+            func.sum(SalesHourly.total_sales).label("total_sales"),
+        )
+        .where(_hours_between(start, end))
+        .group_by(hour)
+        .subquery()
+    )
+    return select(
+        func.coalesce(
+            func.json_agg(func.json_build_array(per_hour.c.hour, per_hour.c.order_count, per_hour.c.total_sales)),
+            literal_column("'[]'::json"),
+        )
+    )
+
+
+def top_product_query(start: datetime, end: datetime):
+    """Name of the best-selling product by units over the UTC days in [start, end]"""
+    return (
+        select(Product.name)
+        .join(ProductSalesDaily, ProductSalesDaily.product_id == Product.id)
+        .where(and_(ProductSalesDaily.sale_date >= start.date(), ProductSalesDaily.sale_date <= end.date()))
+        .group_by(Product.name)
+        .having(func.sum(ProductSalesDaily.quantity) > 0)
+        .order_by(desc(func.sum(ProductSalesDaily.quantity)))
+        .limit(1)
+    )
@@ -1,15 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, desc
-from sqlalchemy.orm import joinedload
-from ..database import get_db
-from ..models import Order, OrderItem, Product, Inventory, Customer
-from ..schemas import DailyReportRequest, DashboardStatsResponse, HourlyData
+from sqlalchemy import select, func, literal_column
+from ..database import with_session
+from ..models import Inventory
+from .. import exports, rollups
+from ..cache import stats_cache
+from ..schemas import DailyReportRequest, DashboardStatsResponse
 from datetime import datetime, time, timedelta
-from openpyxl import Workbook
 from typing import Optional
-import io
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
@@ -17,7 +16,6 @@ router = APIRouter(prefix="/analytics", tags=["analytics"])
 async def get_dashboard_stats(
     period: Optional[str] = Query("today", description="Period: today, week, month"),
     date: Optional[str] = Query(None, description="For period=today: YYYY-MM-DD in user's timezone (default: server date)"),
-    db: AsyncSession = Depends(get_db)
 ):
     now = datetime.now()
     # Use provided date for "today" so KPIs match user's local date (avoids timezone issues)
@@ -42,69 +40,53 @@ async def get_dashboard_stats(
         start_date = datetime.combine(now.date(), time.min)
         end_date = datetime.combine(now.date(), time.max)
     
-    # 1. Total Sales
-    sales_query = select(func.sum(Order.total_amount)).where(
-        and_(Order.created_at >= start_date, Order.created_at <= end_date)
+    # Cached per (period, date) for a few seconds; order, inventory and product writes invalidate it
+    cache_key = ("dashboard-stats", period, start_date.date().isoformat())
+    return await stats_cache.get_or_set(
+        "analytics", cache_key, lambda: with_session(load_dashboard_stats, start_date, end_date, hourly=period == "today")
     )
-    sales_result = await db.execute(sales_query)
-    total_sales = sales_result.scalar() or 0.0
 
-    # 2. Order Count
-    count_query = select(func.count(Order.id)).where(
-         and_(Order.created_at >= start_date, Order.created_at <= end_date)
+
+async def load_dashboard_stats(db: AsyncSession, start_date: datetime, end_date: datetime, hourly: bool) -> dict:
+    """
+    All dashboard KPIs in one round trip: sales, order count, top product and hourly
+    buckets come from the rollup tables (rollups.py), low stock from inventory.
+    """
+    totals = rollups.sales_totals_query(start_date, end_date).subquery()
+    low_stock_query = select(func.count(Inventory.id)).where(
+        Inventory.stock_quantity <= Inventory.low_stock_threshold
+    )
+    stmt = select(
+        totals.c.total_sales,
+        totals.c.order_count,
+        low_stock_query.scalar_subquery().label("low_stock_items"),
+        rollups.top_product_query(start_date, end_date).scalar_subquery().label("top_product"),
+        (rollups.hourly_sales_query(start_date, end_date).scalar_subquery() if hourly else literal_column("NULL")).label("hourly"),
     )
-    count_result = await db.execute(count_query)
-    order_count = count_result.scalar() or 0
+    row = (await db.execute(stmt)).one()
+
+    # 1-2. Total Sales and Order Count
+    total_sales = row.total_sales or 0.0
+    order_count = int(row.order_count or 0)
 
     # 3. Average Order Value
     avg_order = float(total_sales / order_count) if order_count > 0 else 0.0
 
     # 4. Low Stock Items
-    low_stock_query = select(func.count(Inventory.id)).where(
-        Inventory.stock_quantity <= Inventory.low_stock_threshold
-    )
-    low_stock_result = await db.execute(low_stock_query)
-    low_stock_items = low_stock_result.scalar() or 0
+    low_stock_items = row.low_stock_items or 0
 
     # 5. Top Selling Product
-    top_product_query = (
-        select(Product.name, func.sum(OrderItem.quantity).label("total_sold"))
-        .join(OrderItem, OrderItem.product_id == Product.id)
-        .join(Order, OrderItem.order_id == Order.id)
-        .where(and_(Order.created_at >= start_date, Order.created_at <= end_date))
-        .group_by(Product.name)
-        .order_by(desc("total_sold"))
-        .limit(1)
-    )
-    top_product_result = await db.execute(top_product_query)
-    top_product_row = top_product_result.first()
-    top_selling_product = top_product_row[0] if top_product_row else None
+    top_selling_product = row.top_product
 
     # 6. Hourly Data (for peak hours chart)
     hourly_data = []
-    if period == "today":
-        # Get orders grouped by hour for today
-        from sqlalchemy import extract
-        hourly_query = (
-            select(
-                extract('hour', Order.created_at).label('hour'),
-                func.count(Order.id).label('order_count'),
-                func.sum(Order.total_amount).label('total_sales')
-            )
-            .where(and_(Order.created_at >= start_date, Order.created_at <= end_date))
-            .group_by(extract('hour', Order.created_at))
-            .order_by(extract('hour', Order.created_at))
-        )
-        hourly_result = await db.execute(hourly_query)
-        hourly_rows = hourly_result.all()
-        
+    if hourly:
         # Create a map of hour -> data
         hourly_map = {}
-        for row in hourly_rows:
-            hour = int(row.hour)
-            hourly_map[hour] = {
-                'orders': row.order_count or 0,
-                'sales': float(row.total_sales or 0)
+        for hour, orders, sales in row.hourly or []:
+            hourly_map[int(hour)] = {
+                'orders': int(orders or 0),
+                'sales': float(sales or 0)
             }
         
         # Generate data for all hours (9 AM to 11:30 PM / 12 AM)
@@ -129,25 +111,7 @@ async def get_dashboard_stats(
             "orders": hourly_map.get(0, {}).get('orders', 0),
             "sales": hourly_map.get(0, {}).get('sales', 0.0)
         })
-    else:
-        # For week/month, show daily data instead
-        from sqlalchemy import extract
-        daily_query = (
-            select(
-                extract('day', Order.created_at).label('day'),
-                func.count(Order.id).label('order_count'),
-                func.sum(Order.total_amount).label('total_sales')
-            )
-            .where(and_(Order.created_at >= start_date, Order.created_at <= end_date))
-            .group_by(extract('day', Order.created_at))
-            .order_by(extract('day', Order.created_at))
-        )
-        daily_result = await db.execute(daily_query)
-        daily_rows = daily_result.all()
-        
-        # For week/month, we'll show daily breakdown
-        # But for now, let's just show empty hourly data
-        hourly_data = []
+    # For week/month there is no hourly breakdown
 
     return {
         "totalSales": float(total_sales),
@@ -159,45 +123,50 @@ async def get_dashboard_stats(
     }
 
 @router.post("/export-daily")
-async def export_daily_report(request: DailyReportRequest, db: AsyncSession = Depends(get_db)):
+async def export_daily_report(request: DailyReportRequest):
     try:
         target_date = datetime.strptime(request.date, "%Y-%m-%d").date()
     except ValueError:
         target_date = datetime.now().date()
         
-    start_of_day = datetime.combine(target_date, time.min)
-    end_of_day = datetime.combine(target_date, time.max)
-
-    query = select(Order).where(
-        and_(Order.created_at >= start_of_day, Order.created_at <= end_of_day)
-    )
-    result = await db.execute(query)
-    orders = result.scalars().all()
-    
-    # Create Excel using openpyxl directly (No Pandas)
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Daily Sales"
-    
-    # Headers
-    headers = ["Order ID", "Time", "Amount", "Payment", "Status"]
-    ws.append(headers)
-    
-    # Rows
-    for o in orders:
-        ws.append([
-            str(o.id),
-            o.created_at.strftime("%H:%M:%S"),
-            float(o.total_amount),
-            o.payment_method,
-            o.status
-        ])
-    
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
+    start_of_day, end_of_day = exports.day_range(target_date, target_date)
     
+    # Streamed straight from a server-side cursor (see exports.py)
+    rows = exports.iter_order_rows(start_of_day, end_of_day, with_items=False)
     headers = {
         'Content-Disposition': f'attachment; filename="daily_report_{request.date}.xlsx"'
     }
-    return StreamingResponse(output, headers=headers, media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    return StreamingResponse(
+        exports.xlsx_chunks("Daily Sales", exports.SUMMARY_HEADERS, rows),
+        headers=headers,
+        media_type=exports.XLSX_MEDIA_TYPE
+    )
+
+@router.get("/export")
+async def export_sales(
+    start: str = Query(..., description="First day, YYYY-MM-DD"),
+    end: Optional[str] = Query(None, description="Last day (inclusive), YYYY-MM-DD; defaults to start"),
+    format: str = Query("xlsx", description="xlsx or csv"),
+    items: bool = Query(True, description="One row per line item (false: one row per order)"),
+    include_voided: bool = Query(False, description="Also list voided and refunded orders"),
+):
+    try:
+        start_date = datetime.strptime(start, "%Y-%m-%d").date()
+        end_date = datetime.strptime(end, "%Y-%m-%d").date() if end else start_date
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD")
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    if format not in ("xlsx", "csv"):
+        raise HTTPException(status_code=400, detail="format must be xlsx or csv")
+
+    start_at, end_at = exports.day_range(start_date, end_date)
+    rows = exports.iter_order_rows(start_at, end_at, with_items=items, include_voided=include_voided)
+    columns = exports.ITEM_HEADERS if items else exports.SUMMARY_HEADERS
+    filename = f"sales_{start_date}_{end_date}.{format}"
+    headers = {'Content-Disposition': f'attachment; filename="{filename}"'}
+    if format == "csv":
+        return StreamingResponse(exports.csv_chunks(columns, rows), headers=headers, media_type=exports.CSV_MEDIA_TYPE)
+    return StreamingResponse(
+        exports.xlsx_chunks("Sales", columns, rows), headers=headers, media_type=exports.XLSX_MEDIA_TYPE
+    )
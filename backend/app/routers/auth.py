@@ -4,7 +4,6 @@ from sqlalchemy import select
 from ..database import get_db
 from ..models import AppUser
 from ..schemas import LoginRequest, LoginResponse
-import bcrypt
 import jwt
 import os
 from datetime import datetime, timedelta
@@ -29,6 +28,7 @@ async def login(login_data: LoginRequest, db: AsyncSession = Depends(get_db)):
     valid = False
     try:
         if user.pin_hash.startswith('$2a$') or user.pin_hash.startswith('$2b$'):
+             import bcrypt  # only needed here; keeps it out of API startup
              valid = bcrypt.checkpw(login_data.pin.encode(), user.pin_hash.encode())
         else:
              # Fallback for plain text during migration/testing (NOT SECURE)
@@ -1,35 +1,87 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_
+from sqlalchemy import select, tuple_
 from ..database import get_db
 from ..models import Customer
+from ..customer_search import search_customers
+from ..pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from ..responses import json_response
 from ..schemas import CustomerView
+from datetime import datetime
 from typing import List, Optional
+import uuid
 
 router = APIRouter(prefix="/customers", tags=["customers"])
 
+PAGE_LIMIT = 50
+TYPEAHEAD_LIMIT = 8
+MAX_TYPEAHEAD_LIMIT = 10
+
+
+def _decode_keyset(cursor: str):
+    created_at, customer_id = decode_cursor(cursor, 2)
+    try:
+        return datetime.fromisoformat(created_at), uuid.UUID(customer_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _decode_search_after(cursor: str):
+    tier, sort_key, customer_id = decode_cursor(cursor, 3)
+    try:
+        return int(tier), sort_key, uuid.UUID(customer_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @router.get("", response_model=List[CustomerView])
-async def get_customers(q: Optional[str] = None, db: AsyncSession = Depends(get_db)):
-    # Fetch customers
-    stmt = select(Customer).order_by(Customer.updated_at.desc())
-    
-    if q:
-        stmt = stmt.where(
-            or_(Customer.full_name.ilike(f"%{q}%"), Customer.phone_number.ilike(f"%{q}%"))
-        )
+async def get_customers(
+    q: Optional[str] = None,
+    mode: str = Query("search", description="search, or typeahead for a few quick suggestions"),
+    limit: Optional[int] = Query(None, ge=1, le=200, description="Default 50 (typeahead: 8, at most 10)"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Customers, newest first, or matches for `q` (phone digits or name words, best
+    matches first; see customer_search.py). Pages continue via the X-Next-Cursor header.
+    """
+    if mode not in ("search", "typeahead"):
+        raise HTTPException(status_code=400, detail="mode must be search or typeahead")
 
-    result = await db.execute(stmt)
-    customers = result.scalars().all()
+    headers = {}
+    if q and q.strip():
+        if mode == "typeahead":
+            # First page only, kept small
+            customers, _ = await search_customers(db, q, min(limit or TYPEAHEAD_LIMIT, MAX_TYPEAHEAD_LIMIT))
+        else:
+            after = _decode_search_after(cursor) if cursor else None
+            customers, next_after = await search_customers(db, q, limit or PAGE_LIMIT, after)
+            if next_after:
+                headers[NEXT_CURSOR_HEADER] = encode_cursor(*next_after)
+    else:
+        limit = limit or PAGE_LIMIT
+        # created_at, not updated_at: a checkout mid-walk would move the customer to another page
+        stmt = select(Customer).order_by(Customer.created_at.desc(), Customer.id.desc())
+        if cursor:
+            stmt = stmt.where(tuple_(Customer.created_at, Customer.id) < tuple_(*_decode_keyset(cursor)))
+        result = await db.execute(stmt.limit(limit + 1))
+        customers = result.scalars().all()
+        if len(customers) > limit:
+            customers = customers[:limit]
+            last = customers[-1]
+            headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at.isoformat(), last.id)
     
-    return [
-        CustomerView(
-            id=c.id,
-            name=c.full_name,
-            phone=c.phone_number,
-            totalSpent=c.total_spent,
-            visits=c.total_orders,
-            lastVisit=c.updated_at.strftime("%Y-%m-%d") if c.updated_at else "Never",
-            favoriteItems=[], # Placeholder, logic to be added if needed
-            loyaltyPoints=int(c.total_spent / 100) # Simple loyalty logic
-        ) for c in customers
-    ]
+    # Plain dicts shaped like CustomerView (see responses.py)
+    return json_response([
+        {
+            "id": c.id,
+            "name": c.full_name,
+            "phone": c.phone_number,
+            "totalSpent": float(c.total_spent),
+            "visits": c.total_orders,
+            "lastVisit": c.updated_at.strftime("%Y-%m-%d") if c.updated_at else "Never",
+            "favoriteItems": [], # Placeholder, logic to be added if needed
+            "loyaltyPoints": int(c.total_spent / 100) # Simple loyalty logic
+        } for c in customers
+    ], List[CustomerView], headers)
@@ -0,0 +1,53 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from ..events import HEARTBEAT_SECONDS, event_hub
+from typing import Optional
+import asyncio
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+EVENT_TYPES = {"order.created", "order.updated", "order.voided", "order.refunded", "stock.changed", "stock.low"}
+
+
+@router.get("")
+async def stream_events(
+    types: Optional[str] = Query(None, description="comma-separated event types, e.g. order.created,stock.low; default all")
+):
+    """
+    Server-sent events (text/event-stream) for dashboards and POS terminals, instead of
+    polling the stats, low-stock and order endpoints (see app/events.py for the events).
+    Every event has an `id`, an `event` type and JSON `data`. On `resync` refetch what you
+    show: events were missed. Browsers reconnect by themselves (EventSource).
+    """
+    wanted = None
+    if types:
+        wanted = {t.strip() for t in types.split(",") if t.strip()}
+        unknown = wanted - EVENT_TYPES
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown event types: {', '.join(sorted(unknown))}")
+
+    subscriber = event_hub.subscribe(wanted)
+    if subscriber is None:
+        raise HTTPException(status_code=503, detail="Too many event subscribers", headers={"Retry-After": "5"})
+    if not await event_hub.wait_connected(5):
+        event_hub.unsubscribe(subscriber)
+        raise HTTPException(status_code=503, detail="Live events unavailable", headers={"Retry-After": "5"})
+
+    async def stream():
+        try:
+            # Reconnect after 3s if dropped; the comment tells the client it's listening
+            yield "retry: 3000\n: listening\n\n"
+            while True:
+                try:
+                    yield await asyncio.wait_for(subscriber.queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+        finally:
+            event_hub.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_
-from ..database import get_db
+from ..database import get_db, with_session
+from ..cache import stats_cache
 from ..models import Expense, AppUser
+from ..responses import json_response
 from ..schemas import ExpenseResponse, ExpenseCreateRequest
 from typing import List, Optional
 from uuid import UUID
@@ -39,17 +41,18 @@ async def get_expenses(
     result = await db.execute(stmt)
     expenses = result.scalars().all()
     
-    return [
-        ExpenseResponse(
-            id=str(exp.id),
-            title=exp.description or "Expense",
-            amount=float(exp.amount),
-            category=exp.category,
-            date=exp.date.strftime("%Y-%m-%d"),
-            notes=exp.description
-        )
+    # Plain dicts shaped like ExpenseResponse (see responses.py)
+    return json_response([
+        {
+            "id": str(exp.id),
+            "title": exp.description or "Expense",
+            "amount": float(exp.amount),
+            "category": exp.category,
+            "date": exp.date.strftime("%Y-%m-%d"),
+            "notes": exp.description,
+        }
         for exp in expenses
-    ]
+    ], List[ExpenseResponse])
 
 @router.post("", response_model=ExpenseResponse)
 async def create_expense(
@@ -68,6 +71,7 @@ async def create_expense(
     
     db.add(new_expense)
     await db.commit()
+    stats_cache.invalidate("expenses")
     await db.refresh(new_expense)
     
     return ExpenseResponse(
@@ -89,36 +93,34 @@ async def delete_expense(expense_id: UUID, db: AsyncSession = Depends(get_db)):
     
     await db.delete(expense)
     await db.commit()
+    stats_cache.invalidate("expenses")
     
     return {"success": True, "message": "Expense deleted successfully"}
 
 @router.get("/stats")
-async def get_expense_stats(db: AsyncSession = Depends(get_db)):
+async def get_expense_stats():
     today = date.today()
+    return await stats_cache.get_or_set("expenses", ("stats", today.isoformat()), lambda: with_session(_load_expense_stats, today))
+
+async def _load_expense_stats(db: AsyncSession, today: date) -> dict:
     start_of_month = date(today.year, today.month, 1)
     
-    # Total this month
-    month_total = await db.execute(
-        select(func.sum(Expense.amount)).where(Expense.date >= start_of_month)
-    )
-    month_total_amount = month_total.scalar() or 0.0
-    
-    # Today's expenses
-    today_total = await db.execute(
-        select(func.sum(Expense.amount)).where(Expense.date == today)
-    )
-    today_total_amount = today_total.scalar() or 0.0
-    
-    # By category
+    # This month's and today's totals per category in one query
+    # (today is always within this month, so both come from the same rows)
     category_totals = await db.execute(
-        select(Expense.category, func.sum(Expense.amount).label("total"))
+        select(
+            Expense.category,
+            func.sum(Expense.amount).label("total"),
+            func.sum(Expense.amount).filter(Expense.date == today).label("today_total"),
+        )
         .where(Expense.date >= start_of_month)
         .group_by(Expense.category)
     )
-    categories = {row[0]: float(row[1]) for row in category_totals.all()}
+    rows = category_totals.all()
+    categories = {row.category: float(row.total) for row in rows}
     
     return {
-        "monthTotal": float(month_total_amount),
-        "todayTotal": float(today_total_amount),
+        "monthTotal": float(sum(categories.values())),
+        "todayTotal": float(sum(row.today_total or 0 for row in rows)),
         "byCategory": categories
     }
@@ -0,0 +1,63 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response
+from ..images import IMAGE_NAME, CONTENT_TYPES, get_store
+from ..thumbnails import VARIANT_NAME, ensure_variant
+import asyncio
+import re
+
+router = APIRouter(prefix="/images", tags=["images"])
+
+# Names are content hashes, so a given URL never changes
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+@router.get("/{name}")
+async def get_image(name: str, request: Request):
+    if VARIANT_NAME.match(name):
+        # Resized variant: generated from the original on first request if the upload-time job hasn't yet
+        if not await ensure_variant(name):
+            raise HTTPException(status_code=404, detail="Image not found")
+    elif not IMAGE_NAME.match(name):
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    store = get_store()
+    size = await asyncio.to_thread(store.size, name)
+    if size is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    etag = f'"{name.rsplit(".", 1)[0]}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+    }
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+
+    media_type = CONTENT_TYPES[name.rsplit(".", 1)[1]]
+    range_header = request.headers.get("range")
+    if range_header:
+        match = RANGE.match(range_header.strip())
+        if not match or match.groups() == ("", ""):
+            # Multiple or malformed ranges: fall back to the whole image
+            match = None
+        if match:
+            first, last = match.groups()
+            if first:
+                start = int(first)
+                end = min(int(last), size - 1) if last else size - 1
+            else:
+                # Suffix range: the last N bytes
+                start = max(0, size - int(last))
+                end = size - 1
+            if start >= size or start > end:
+                headers["Content-Range"] = f"bytes */{size}"
+                return Response(status_code=416, headers=headers)
+            contents = await asyncio.to_thread(store.read, name, start, end)
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            return Response(content=contents, status_code=206, headers=headers, media_type=media_type)
+
+    contents = await asyncio.to_thread(store.read, name)
+    return Response(content=contents, headers=headers, media_type=media_type)
@@ -1,26 +1,51 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from sqlalchemy.orm import joinedload
-from ..database import get_db
+from ..database import get_db, with_session
+from ..cache import stats_cache
+from ..catalog import CACHE_CONTROL, bump_catalog_version, catalog_etag, catalog_version, not_modified
 from ..models import Inventory, Product
 from sqlalchemy.orm import joinedload
+from ..responses import json_response
 from ..schemas import InventoryItemResponse, InventoryUpdateRequest
 from typing import List, Optional
 from uuid import UUID
 
 router = APIRouter(prefix="/inventory", tags=["inventory"])
 
+
+def _inventory_row(inv: Inventory) -> dict:
+    """An InventoryItemResponse as a plain dict (see responses.py)"""
+    return {
+        "id": str(inv.id),
+        "productId": str(inv.product_id),
+        "name": inv.product.name,
+        "category": inv.product.category,
+        "stock": inv.stock_quantity,
+        "unit": "pcs",  # Default unit, can be extended
+        "minStock": inv.low_stock_threshold,
+        "lastRestock": inv.last_updated.strftime("%Y-%m-%d") if inv.last_updated else "Never",
+    }
+
+
 @router.get("", response_model=List[InventoryItemResponse])
 async def get_inventory(
+    request: Request,
     category: Optional[str] = None,
     db: AsyncSession = Depends(get_db)
 ):
+    """Answers If-None-Match with 304 while the catalog is unchanged (see catalog.py)"""
+    etag = catalog_etag(await catalog_version(db), "inventory", category)
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
+
     stmt = (
         select(Inventory)
         .options(joinedload(Inventory.product))
         .join(Product, Inventory.product_id == Product.id)
-        .order_by(Product.name)
+        .order_by(Product.name, Inventory.id)  # id breaks ties, for a strong ETag
     )
     
     if category and category != "All":
@@ -29,19 +54,8 @@ async def get_inventory(
     result = await db.execute(stmt)
     inventory_items = result.scalars().unique().all()
     
-    return [
-        InventoryItemResponse(
-            id=str(inv.id),
-            productId=str(inv.product_id),
-            name=inv.product.name,
-            category=inv.product.category,
-            stock=inv.stock_quantity,
-            unit="pcs",  # Default unit, can be extended
-            minStock=inv.low_stock_threshold,
-            lastRestock=inv.last_updated.strftime("%Y-%m-%d") if inv.last_updated else "Never"
-        )
-        for inv in inventory_items
-    ]
+    rows = [_inventory_row(inv) for inv in inventory_items]
+    return json_response(rows, List[InventoryItemResponse], {"ETag": etag, "Cache-Control": CACHE_CONTROL})
 
 @router.get("/low-stock", response_model=List[InventoryItemResponse])
 async def get_low_stock_items(db: AsyncSession = Depends(get_db)):
@@ -56,19 +70,7 @@ async def get_low_stock_items(db: AsyncSession = Depends(get_db)):
     result = await db.execute(stmt)
     inventory_items = result.scalars().unique().all()
     
-    return [
-        InventoryItemResponse(
-            id=str(inv.id),
-            productId=str(inv.product_id),
-            name=inv.product.name,
-            category=inv.product.category,
-            stock=inv.stock_quantity,
-            unit="pcs",
-            minStock=inv.low_stock_threshold,
-            lastRestock=inv.last_updated.strftime("%Y-%m-%d") if inv.last_updated else "Never"
-        )
-        for inv in inventory_items
-    ]
+    return json_response([_inventory_row(inv) for inv in inventory_items], List[InventoryItemResponse])
 
 @router.put("/{inventory_id}/restock")
 async def restock_inventory(
@@ -89,7 +91,9 @@ async def restock_inventory(
     inventory.stock_quantity = request.newStock
     inventory.last_updated = func.now()
     
+    await bump_catalog_version(db, [inventory.product_id])
     await db.commit()
+    stats_cache.invalidate("inventory", "analytics")
     await db.refresh(inventory)
     
     return {
@@ -130,7 +134,9 @@ async def create_inventory_item(
     )
     
     db.add(new_inventory)
+    await bump_catalog_version(db, [product_id])
     await db.commit()
+    stats_cache.invalidate("inventory", "analytics")
     await db.refresh(new_inventory)
     
     # Load product for response
@@ -164,32 +170,29 @@ async def delete_inventory_item(
         raise HTTPException(status_code=404, detail="Inventory item not found")
     
     await db.delete(inventory)
+    await bump_catalog_version(db, [inventory.product_id])
     await db.commit()
+    stats_cache.invalidate("inventory", "analytics")
     
     return {"success": True, "message": "Inventory item deleted successfully"}
 
 @router.get("/stats")
-async def get_inventory_stats(db: AsyncSession = Depends(get_db)):
-    # Total items
-    total_result = await db.execute(select(func.count(Inventory.id)))
-    total_items = total_result.scalar() or 0
-    
-    # Low stock items
-    low_stock_result = await db.execute(
-        select(func.count(Inventory.id)).where(
-            Inventory.stock_quantity <= Inventory.low_stock_threshold
+async def get_inventory_stats():
+    return await stats_cache.get_or_set("inventory", "stats", lambda: with_session(_load_inventory_stats))
+
+async def _load_inventory_stats(db: AsyncSession) -> dict:
+    # Total, low stock and out of stock counts in one pass over inventory
+    result = await db.execute(
+        select(
+            func.count(Inventory.id),
+            func.count(Inventory.id).filter(Inventory.stock_quantity <= Inventory.low_stock_threshold),
+            func.count(Inventory.id).filter(Inventory.stock_quantity == 0),
         )
     )
-    low_stock_count = low_stock_result.scalar() or 0
-    
-    # Out of stock
-    out_of_stock_result = await db.execute(
-        select(func.count(Inventory.id)).where(Inventory.stock_quantity == 0)
-    )
-    out_of_stock_count = out_of_stock_result.scalar() or 0
+    total_items, low_stock_count, out_of_stock_count = result.one()
     
     return {
-        "totalItems": total_items,
-        "lowStockCount": low_stock_count,
-        "outOfStockCount": out_of_stock_count
+        "totalItems": total_items or 0,
+        "lowStockCount": low_stock_count or 0,
+        "outOfStockCount": out_of_stock_count or 0
     }
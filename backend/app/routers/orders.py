@@ -1,174 +1,147 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, func
+from sqlalchemy import select, tuple_
 from sqlalchemy.orm import joinedload, selectinload
 from ..database import get_db
-from ..models import Order, OrderItem, Customer, Product, Inventory, AppUser
-from ..schemas import CreateOrderRequest, OrderResponse, OrderView, UpdateOrderRequest
-from decimal import Decimal
+from ..cache import stats_cache
+from .. import metrics
+from ..models import ORDER_COMPLETED, ORDER_REFUNDED, ORDER_VOIDED, Order, OrderItem
+from ..idempotency import (
+    IDEMPOTENCY_HEADER, IDEMPOTENCY_TTL_SECONDS, MAX_KEY_LENGTH, REPLAYED_HEADER,
+    IdempotencyConflict, idempotency_store, request_hash,
+)
+from ..images import image_src
+from ..checkout import CheckoutRejected, checkout, checkout_once
+from ..order_edits import edit_order
+from ..order_batches import BATCH_CREATED, BATCH_DUPLICATE, BATCH_REJECTED, ingest_orders
+from ..order_voids import void_orders
+from ..events import publish, publish_orders
+from ..pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from ..responses import json_response
+from ..schemas import BatchOrdersRequest, BatchOrdersResponse, CreateOrderRequest, OrderResponse, OrderView, UpdateOrderRequest, VoidOrdersRequest, VoidOrdersResponse
+from datetime import date, datetime, time, timedelta
 import uuid
-from typing import List
+from typing import List, Optional
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
 
-def _order_to_view(o: Order) -> "OrderView":
-    from ..schemas import OrderItemView
+def _order_row(o: Order, base_url: str, include_items: bool = True) -> dict:
+    """An OrderView as a plain dict (see responses.py)"""
+    # Summary views are loaded without items (see get_orders)
+    order_items = o.items if include_items else []
     items_list = [
-        OrderItemView(
-            id=str(i.id),
-            productId=str(i.product_id) if i.product_id else "",
-            name=i.product.name if i.product else "Unknown",
-            quantity=i.quantity,
-            price=float(i.unit_price),
-            image=i.product.image_url if i.product and i.product.image_url else "🎂"
-        )
-        for i in o.items
+        {
+            "id": str(i.id),
+            "productId": str(i.product_id) if i.product_id else "",
+            "name": i.product.name if i.product else "Unknown",
+            "quantity": i.quantity,
+            "price": float(i.unit_price),
+            "image": image_src(i.product.image_url if i.product else None, base_url),
+        }
+        for i in order_items
     ]
-    return OrderView(
-        id=o.id,
-        order_number=o.order_number or f"#{str(o.id)[:8].upper()}",
-        created_at=o.created_at,
-        total_amount=o.total_amount,
-        payment_method=o.payment_method,
-        status=o.status,
-        customer_name=o.customer.full_name if o.customer else "Unknown",
-        customer_phone=o.customer.phone_number if o.customer else "",
-        staff_name=o.staff.full_name if o.staff else "System",
-        items_summary=", ".join([f"{i.quantity}x {i.product.name if i.product else 'Unknown'}" for i in o.items]),
-        items=items_list
-    )
+    return {
+        "id": o.id,
+        "order_number": o.order_number or f"#{str(o.id)[:8].upper()}",
+        "created_at": o.created_at,
+        "total_amount": float(o.total_amount),
+        "payment_method": o.payment_method,
+        "status": o.status,
+        "customer_name": o.customer.full_name if o.customer else "Unknown",
+        "customer_phone": o.customer.phone_number if o.customer else "",
+        "staff_name": o.staff.full_name if o.staff else "System",
+        "items_summary": ", ".join([f"{i['quantity']}x {i['name']}" for i in items_list]),
+        "items": items_list,
+    }
+
+
+def _decode_order_cursor(cursor: str):
+    created_at, order_id = decode_cursor(cursor, 2)
+    try:
+        return datetime.fromisoformat(created_at), uuid.UUID(order_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _parse_day(value: str, name: str) -> date:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be YYYY-MM-DD")
 
 
 @router.get("", response_model=List[OrderView])
-async def get_orders(db: AsyncSession = Depends(get_db)):
-    stmt = (
-        select(Order)
-        .options(
-            joinedload(Order.customer), 
-            joinedload(Order.staff),
-            selectinload(Order.items).joinedload(OrderItem.product)
-        )
-        .order_by(Order.created_at.desc())
-        .limit(50)
-    )
+async def get_orders(
+    request: Request,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    start_date: Optional[str] = Query(None, description="YYYY-MM-DD, inclusive"),
+    end_date: Optional[str] = Query(None, description="YYYY-MM-DD, inclusive"),
+    status: Optional[str] = None,
+    payment_method: Optional[str] = None,
+    staff_id: Optional[uuid.UUID] = None,
+    customer_id: Optional[uuid.UUID] = None,
+    view: str = Query("full", description="full, or summary to skip line items"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Newest orders first, paged by (created_at, id) keyset: pass the X-Next-Cursor
+    response header back as `cursor` to get the next page (no header on the last page).
+    """
+    if view not in ("full", "summary"):
+        raise HTTPException(status_code=400, detail="view must be full or summary")
+
+    stmt = select(Order).options(joinedload(Order.customer), joinedload(Order.staff))
+    if view == "full":
+        stmt = stmt.options(selectinload(Order.items).joinedload(OrderItem.product))
+
+    # Each filter has a (column, created_at, id) index (see 004_order_history_indexes.sql)
+    if status:
+        stmt = stmt.where(Order.status == status)
+    if payment_method:
+        stmt = stmt.where(Order.payment_method == payment_method)
+    if staff_id:
+        stmt = stmt.where(Order.staff_id == staff_id)
+    if customer_id:
+        stmt = stmt.where(Order.customer_id == customer_id)
+    if start_date:
+        stmt = stmt.where(Order.created_at >= datetime.combine(_parse_day(start_date, "start_date"), time.min))
+    if end_date:
+        day_after = _parse_day(end_date, "end_date") + timedelta(days=1)
+        stmt = stmt.where(Order.created_at < datetime.combine(day_after, time.min))
+    if cursor:
+        stmt = stmt.where(tuple_(Order.created_at, Order.id) < tuple_(*_decode_order_cursor(cursor)))
+
+    # One extra row tells us whether there is a next page
+    stmt = stmt.order_by(Order.created_at.desc(), Order.id.desc()).limit(limit + 1)
     result = await db.execute(stmt)
     orders = result.scalars().all()
-    return [_order_to_view(o) for o in orders]
+    headers = {}
+    if len(orders) > limit:
+        orders = orders[:limit]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(orders[-1].created_at.isoformat(), orders[-1].id)
+
+    base_url = str(request.base_url)
+    rows = [_order_row(o, base_url, include_items=view == "full") for o in orders]
+    return json_response(rows, List[OrderView], headers)
 
 @router.post("/create", response_model=OrderResponse)
-async def create_order(order_data: CreateOrderRequest, db: AsyncSession = Depends(get_db)):
+async def create_order(order_data: CreateOrderRequest, request: Request, db: AsyncSession = Depends(get_db)):
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if key is not None:
+        return await _create_order_once(order_data, key, db)
     try:
-        # ALL database operations in a single transaction
-        # 1. Handle Customer
-        customer_id = None
-        existing_customer = None
-        new_customer = None
-        
-        # Check if customer exists by phone
-        result = await db.execute(select(Customer).where(Customer.phone_number == order_data.customer.phoneNumber))
-        existing_customer = result.scalars().first()
-        
-        if existing_customer:
-            customer_id = existing_customer.id
-            # Update customer name if provided (in case it changed)
-            if order_data.customer.fullName and order_data.customer.fullName != existing_customer.full_name:
-                existing_customer.full_name = order_data.customer.fullName
-        else:
-            new_customer = Customer(
-                full_name=order_data.customer.fullName,
-                phone_number=order_data.customer.phoneNumber,
-                notes=order_data.customer.notes
-            )
-            db.add(new_customer)
-            await db.flush() # get ID
-            customer_id = new_customer.id
-
-        # 2. Generate sequential order number
-        # Find all existing order numbers and get the highest
-        all_orders_result = await db.execute(
-            select(Order.order_number)
-            .where(Order.order_number.isnot(None))
-        )
-        all_order_numbers = [row[0] for row in all_orders_result.all() if row[0]]
-        
-        # Extract numbers and find the maximum
-        max_number = 0
-        for order_num in all_order_numbers:
-            # Extract number from format like "BB001" or "#BB001"
-            number_str = str(order_num).replace("#", "").replace("BB", "").strip()
-            try:
-                num = int(number_str)
-                if num > max_number:
-                    max_number = num
-            except ValueError:
-                continue
-        
-        # Generate next order number
-        next_number = max_number + 1
-        order_number = f"BB{str(next_number).zfill(3)}"
-        
-        # 3. Create Order
-        new_order = Order(
-            order_number=order_number,
-            customer_id=customer_id,
-            staff_id=order_data.staffId,
-            total_amount=Decimal(str(order_data.totalAmount)),
-            payment_method=order_data.paymentMethod,
-            status="completed",
-            notes=order_data.notes
-        )
-        db.add(new_order)
-        await db.flush() # get ID
-
-        # Update Customer Stats
-        if existing_customer:
-             # existing_customer is already attached to the session
-             existing_customer.total_orders += 1
-             existing_customer.total_spent = existing_customer.total_spent + Decimal(str(order_data.totalAmount))
-             # updated_at will be automatically updated by SQLAlchemy due to onupdate=func.now()
-             # No need to manually set it
-        else:
-             # new_customer was just added
-             new_customer.total_orders = 1
-             new_customer.total_spent = Decimal(str(order_data.totalAmount))
-
-        # 3. Create Items and Update Inventory
-        for item in order_data.items:
-            # Add Order Item
-            order_item = OrderItem(
-                order_id=new_order.id,
-                product_id=item.id,
-                quantity=item.quantity,
-                unit_price=Decimal(str(item.price)), # Should ideally verify against DB price
-                total_price=Decimal(str(item.price * item.quantity))
-            )
-            db.add(order_item)
-
-            # Update Inventory
-            # Fetch current stock to ensure valid
-            inv_result = await db.execute(select(Inventory).where(Inventory.product_id == item.id).with_for_update())
-            inventory = inv_result.scalars().first()
-            
-            if inventory:
-                if inventory.stock_quantity < item.quantity:
-                     await db.rollback()
-                     raise HTTPException(status_code=400, detail=f"Insufficient stock for product id {item.id}")
-                
-                inventory.stock_quantity -= item.quantity
-                db.add(inventory) # Mark for update
-            else:
-                 await db.rollback()
-                 raise HTTPException(status_code=400, detail=f"Inventory record not found for product id {item.id}")
-        
-        # Commit all changes
-        await db.commit()
+        # Customer, order number, order + items, stock and rollups in one statement (app/checkout.py)
+        created = await checkout(db, order_data.model_dump_json())
+        stats_cache.invalidate("analytics", "inventory")
+        metrics.record_checkout(sum(item.quantity for item in order_data.items))
         
         # Return success with order ID and order number
-        return {"success": True, "orderId": new_order.id, "orderNumber": new_order.order_number}
-    except HTTPException:
-        # Re-raise HTTP exceptions as-is
-        raise
+        return {"success": True, "orderId": created["orderId"], "orderNumber": created["orderNumber"]}
+    except CheckoutRejected as e:
+        metrics.CHECKOUT_REJECTED.inc()
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         # Log the error and return a user-friendly message
         import traceback
@@ -177,8 +150,73 @@ async def create_order(order_data: CreateOrderRequest, db: AsyncSession = Depend
         raise HTTPException(status_code=500, detail=f"Failed to create order: {str(e)}")
 
 
+async def _create_order_once(order_data: CreateOrderRequest, key: str, db: AsyncSession):
+    """create_order for a request with an Idempotency-Key: placed at most once per key (app/idempotency.py)"""
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"{IDEMPOTENCY_HEADER} must be 1-{MAX_KEY_LENGTH} characters")
+    order_json = order_data.model_dump_json()
+    body_hash = request_hash(order_json)
+    try:
+        outcome = await idempotency_store.run(
+            key, body_hash, lambda: checkout_once(db, key, body_hash, order_json, IDEMPOTENCY_TTL_SECONDS)
+        )
+    except IdempotencyConflict:
+        raise HTTPException(status_code=422, detail=f"{IDEMPOTENCY_HEADER} was already used for a different order")
+    except Exception as e:
+        import traceback
+        print(f"Error creating order: {str(e)}")
+        print(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Failed to create order: {str(e)}")
+
+    headers = {REPLAYED_HEADER: "true"} if outcome["replayed"] else None
+    if outcome["status"] != 200:
+        if not outcome["replayed"]:
+            metrics.CHECKOUT_REJECTED.inc()
+        raise HTTPException(status_code=outcome["status"], detail=outcome["body"]["detail"], headers=headers)
+    if not outcome["replayed"]:
+        stats_cache.invalidate("analytics", "inventory")
+        metrics.record_checkout(sum(item.quantity for item in order_data.items))
+    return json_response(outcome["body"], OrderResponse, headers)
+
+
+@router.post("/batch", response_model=BatchOrdersResponse)
+async def create_orders_batch(request: BatchOrdersRequest, db: AsyncSession = Depends(get_db)):
+    """
+    Orders a POS terminal queued while offline, replayed in one request (app/order_batches.py).
+    Orders whose clientKey was already applied come back as duplicates, so a timed-out
+    batch can simply be sent again; an order without enough stock is rejected on its own.
+    """
+    try:
+        results = await ingest_orders(db, request.orders)
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        import traceback
+        print(f"Error creating order batch: {str(e)}")
+        print(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Failed to create orders: {str(e)}")
+
+    counts = {BATCH_CREATED: 0, BATCH_DUPLICATE: 0, BATCH_REJECTED: 0}
+    for order, result in zip(request.orders, results):
+        counts[result["status"]] += 1
+        if result["status"] == BATCH_CREATED:
+            metrics.record_checkout(sum(item.quantity for item in order.items))
+    if counts[BATCH_REJECTED]:
+        metrics.CHECKOUT_REJECTED.inc(counts[BATCH_REJECTED])
+    if counts[BATCH_CREATED]:
+        stats_cache.invalidate("analytics", "inventory")
+    body = {
+        "success": True,
+        "created": counts[BATCH_CREATED],
+        "duplicates": counts[BATCH_DUPLICATE],
+        "rejected": counts[BATCH_REJECTED],
+        "results": results,
+    }
+    return json_response(body, BatchOrdersResponse)
+
+
 @router.get("/{order_id}", response_model=OrderView)
-async def get_order(order_id: uuid.UUID, db: AsyncSession = Depends(get_db)):
+async def get_order(order_id: uuid.UUID, request: Request, db: AsyncSession = Depends(get_db)):
     stmt = (
         select(Order)
         .options(
@@ -192,141 +230,75 @@ async def get_order(order_id: uuid.UUID, db: AsyncSession = Depends(get_db)):
     order = result.scalars().first()
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
-    return _order_to_view(order)
+    return json_response(_order_row(order, str(request.base_url)), OrderView)
+
+
+async def _void_order(order_id: uuid.UUID, status: str, db: AsyncSession):
+    if not await void_orders(db, [order_id], status):
+        current = (await db.execute(select(Order.status).where(Order.id == order_id))).scalar()
+        await db.rollback()
+        if current is None:
+            raise HTTPException(status_code=404, detail="Order not found")
+        raise HTTPException(status_code=400, detail=f"Order is already {current}")
+    await publish_orders(db, f"order.{status}", [order_id])
+    await db.commit()
+    stats_cache.invalidate("analytics", "inventory")
+    return {"success": True, "message": f"Order {status}"}
 
 
 @router.delete("/{order_id}")
 async def delete_order(order_id: uuid.UUID, db: AsyncSession = Depends(get_db)):
-    stmt = (
-        select(Order)
-        .options(selectinload(Order.items).joinedload(OrderItem.product))
-        .where(Order.id == order_id)
-    )
-    result = await db.execute(stmt)
-    order = result.scalars().first()
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
+    # Orders are voided rather than deleted so sales history is kept (app/order_voids.py)
+    return await _void_order(order_id, ORDER_VOIDED, db)
+
+
+@router.post("/{order_id}/void")
+async def void_order(order_id: uuid.UUID, db: AsyncSession = Depends(get_db)):
+    return await _void_order(order_id, ORDER_VOIDED, db)
+
 
-    customer = None
-    if order.customer_id:
-        cust_result = await db.execute(select(Customer).where(Customer.id == order.customer_id))
-        customer = cust_result.scalars().first()
-
-    # Restore inventory for each item
-    for item in order.items:
-        if item.product_id:
-            inv_result = await db.execute(select(Inventory).where(Inventory.product_id == item.product_id).with_for_update())
-            inv = inv_result.scalars().first()
-            if inv:
-                inv.stock_quantity += item.quantity
-
-    # Revert customer stats
-    if customer:
-        customer.total_orders = max(0, customer.total_orders - 1)
-        customer.total_spent = max(Decimal("0"), (customer.total_spent or Decimal("0")) - (order.total_amount or Decimal("0")))
-
-    # Delete order items then order (cascade may handle items)
-    for item in order.items:
-        await db.delete(item)
-    await db.delete(order)
+@router.post("/{order_id}/refund")
+async def refund_order(order_id: uuid.UUID, db: AsyncSession = Depends(get_db)):
+    return await _void_order(order_id, ORDER_REFUNDED, db)
+
+
+@router.post("/void", response_model=VoidOrdersResponse)
+async def void_orders_bulk(request: VoidOrdersRequest, db: AsyncSession = Depends(get_db)):
+    """Void (or refund) many orders in one transaction, e.g. end-of-day cleanup"""
+    status = ORDER_REFUNDED if request.refund else ORDER_VOIDED
+    changed = await void_orders(db, request.orderIds, status)
+    await publish_orders(db, f"order.{status}", changed)
     await db.commit()
-    return {"success": True, "message": "Order deleted"}
+    if changed:
+        stats_cache.invalidate("analytics", "inventory")
+    changed_ids = set(changed)
+    skipped = [order_id for order_id in dict.fromkeys(request.orderIds) if order_id not in changed_ids]
+    return {"success": True, "voided": changed, "skipped": skipped}
 
 
 @router.put("/{order_id}", response_model=OrderResponse)
 async def update_order(order_id: uuid.UUID, order_data: UpdateOrderRequest, db: AsyncSession = Depends(get_db)):
+    # The order row is locked first, as when voiding, so an edit and a void can't interleave
     stmt = (
         select(Order)
-        .options(
-            joinedload(Order.customer),
-            selectinload(Order.items).joinedload(OrderItem.product)
-        )
+        .options(joinedload(Order.customer), selectinload(Order.items))
         .where(Order.id == order_id)
+        .with_for_update(of=Order)
     )
     result = await db.execute(stmt)
     order = result.scalars().first()
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
+    if order.status != ORDER_COMPLETED:
+        raise HTTPException(status_code=400, detail=f"Order is {order.status} and can't be edited")
 
-    old_customer_id = order.customer_id
-    old_total = order.total_amount or Decimal("0")
-    old_items = list(order.items)
-
-    # 1. Restore inventory for old items
-    for item in old_items:
-        if item.product_id:
-            inv_result = await db.execute(select(Inventory).where(Inventory.product_id == item.product_id).with_for_update())
-            inv = inv_result.scalars().first()
-            if inv:
-                inv.stock_quantity += item.quantity
-
-    # 2. Revert old customer stats
-    if order.customer_id:
-        cust_result = await db.execute(select(Customer).where(Customer.id == order.customer_id))
-        old_customer = cust_result.scalars().first()
-        if old_customer:
-            old_customer.total_orders = max(0, old_customer.total_orders - 1)
-            old_customer.total_spent = max(Decimal("0"), (old_customer.total_spent or Decimal("0")) - old_total)
-
-    # 3. Handle customer (same as create)
-    customer_id = None
-    existing_customer = None
-    new_customer = None
-    result = await db.execute(select(Customer).where(Customer.phone_number == order_data.customer.phoneNumber))
-    existing_customer = result.scalars().first()
-    if existing_customer:
-        customer_id = existing_customer.id
-        if order_data.customer.fullName and order_data.customer.fullName != existing_customer.full_name:
-            existing_customer.full_name = order_data.customer.fullName
-    else:
-        new_customer = Customer(
-            full_name=order_data.customer.fullName,
-            phone_number=order_data.customer.phoneNumber,
-            notes=order_data.customer.notes
-        )
-        db.add(new_customer)
-        await db.flush()
-        customer_id = new_customer.id
-
-    # 4. Update order header
-    order.customer_id = customer_id
-    order.total_amount = Decimal(str(order_data.totalAmount))
-    order.payment_method = order_data.paymentMethod
-    order.notes = order_data.notes
-
-    # 5. Remove old order items
-    for item in old_items:
-        await db.delete(item)
-    await db.flush()
-
-    # 6. Add new items and deduct inventory (same as create)
-    for item in order_data.items:
-        order_item = OrderItem(
-            order_id=order.id,
-            product_id=item.id,
-            quantity=item.quantity,
-            unit_price=Decimal(str(item.price)),
-            total_price=Decimal(str(item.price * item.quantity))
-        )
-        db.add(order_item)
-        inv_result = await db.execute(select(Inventory).where(Inventory.product_id == item.id).with_for_update())
-        inventory = inv_result.scalars().first()
-        if inventory:
-            if inventory.stock_quantity < item.quantity:
-                await db.rollback()
-                raise HTTPException(status_code=400, detail=f"Insufficient stock for product id {item.id}")
-            inventory.stock_quantity -= item.quantity
-        else:
-            await db.rollback()
-            raise HTTPException(status_code=400, detail=f"Inventory record not found for product id {item.id}")
-
-    # 7. Update customer stats for new total
-    if existing_customer:
-        existing_customer.total_orders += 1
-        existing_customer.total_spent = (existing_customer.total_spent or Decimal("0")) + Decimal(str(order_data.totalAmount))
-    else:
-        new_customer.total_orders = 1
-        new_customer.total_spent = Decimal(str(order_data.totalAmount))
+    # Only the lines, stock, rollups and customer totals that actually change are written (app/order_edits.py)
+    stock_problems = await edit_order(db, order, order_data)
+    if stock_problems:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="; ".join(stock_problems))
 
+    await publish(db, "order.updated", orderId=order.id, orderNumber=order.order_number, totalAmount=order.total_amount)
     await db.commit()
+    stats_cache.invalidate("analytics", "inventory")
     return {"success": True, "orderId": order.id, "orderNumber": order.order_number}
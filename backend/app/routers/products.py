@@ -1,75 +1,111 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File, Form
 from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from sqlalchemy.orm import joinedload
 from ..database import get_db
+from ..cache import stats_cache
+from ..catalog import CACHE_CONTROL, bump_catalog_version, catalog_etag, catalog_version, not_modified
 from ..models import Product, Inventory
 from ..schemas import ProductResponse, ProductCreateRequest, ProductUpdateRequest
+from ..responses import json_response
+from ..images import IMAGE_TYPES, MAX_IMAGE_SIZE, image_src, save_image, store_image_url
+from ..thumbnails import image_variants, schedule_variants
 from typing import List, Optional
 from uuid import UUID
-import base64
 
 router = APIRouter(prefix="/products", tags=["products"])
 
+
+async def _store_upload(image: UploadFile) -> str:
+    """Validate an uploaded image and store it in the image store; returns the short image path"""
+    # Validate file type
+    if not image.content_type or not image.content_type.startswith('image/'):
+        raise HTTPException(status_code=400, detail="File must be an image (JPEG, PNG, etc.)")
+    
+    contents = await image.read()
+    if len(contents) > MAX_IMAGE_SIZE:  # 5MB limit
+        raise HTTPException(status_code=400, detail="Image file too large. Maximum size is 5MB")
+    
+    # Determine MIME type
+    mime_type = image.content_type
+    if mime_type not in IMAGE_TYPES:
+        raise HTTPException(status_code=400, detail="Unsupported image format. Use JPEG, PNG, GIF, or WebP")
+    
+    # Stored once per content hash; the product only keeps /images/<hash>.<ext>
+    image_url = await save_image(contents, mime_type)
+    schedule_variants(image_url, contents)
+    return image_url
+
+def _product_row(product: Product, base_url: str) -> dict:
+    """A ProductResponse as a plain dict (see responses.py)"""
+    inventory = product.inventory
+    return {
+        "id": str(product.id),
+        "name": product.name,
+        "price": float(product.price),
+        "category": product.category,
+        "image": image_src(product.image_url, base_url),
+        "imageVariants": image_variants(product.image_url, base_url),
+        "stock": inventory.stock_quantity if inventory else 0,
+        "isAvailable": product.is_available and (inventory is None or inventory.stock_quantity > 0),
+    }
+
 @router.get("", response_model=List[ProductResponse])
 async def get_products(
+    request: Request,
     category: Optional[str] = None,
     db: AsyncSession = Depends(get_db)
 ):
+    """The POS menu. Answers If-None-Match with 304 while the catalog is unchanged (see catalog.py)."""
+    base_url = str(request.base_url)
+    etag = catalog_etag(await catalog_version(db), "products", category, base_url)
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
+
     # Use joinedload to fetch inventory in a single query (avoid N+1)
     stmt = select(Product).options(joinedload(Product.inventory)).where(Product.is_available == True)
     
     if category and category != "All":
         stmt = stmt.where(Product.category == category)
     
-    stmt = stmt.order_by(Product.name)
+    # id breaks name ties, so an unchanged catalog always gives the same bytes (strong ETag)
+    stmt = stmt.order_by(Product.name, Product.id)
     
     result = await db.execute(stmt)
     products = result.unique().scalars().all()
     
-    # Build response list (inventory is already loaded)
-    product_list = []
-    for product in products:
-        inventory = product.inventory
-        
-        product_list.append(ProductResponse(
-            id=str(product.id),
-            name=product.name,
-            price=float(product.price),
-            category=product.category,
-            image=product.image_url or "🎂",
-            stock=inventory.stock_quantity if inventory else 0,
-            isAvailable=product.is_available and (inventory is None or inventory.stock_quantity > 0)
-        ))
-    
-    return product_list
+    # Inventory is already loaded
+    rows = [_product_row(product, base_url) for product in products]
+    return json_response(rows, List[ProductResponse], {"ETag": etag, "Cache-Control": CACHE_CONTROL})
 
 @router.get("/{product_id}")
-async def get_product(product_id: UUID, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Product).where(Product.id == product_id))
+async def get_product(product_id: UUID, request: Request, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(
+        select(Product).options(joinedload(Product.inventory)).where(Product.id == product_id)
+    )
     product = result.scalars().first()
     
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     
-    inv_result = await db.execute(
-        select(Inventory).where(Inventory.product_id == product.id)
-    )
-    inventory = inv_result.scalars().first()
+    inventory = product.inventory
     
     return ProductResponse(
         id=str(product.id),
         name=product.name,
         price=float(product.price),
         category=product.category,
-        image=product.image_url or "🎂",
+        image=image_src(product.image_url, str(request.base_url)),
+        imageVariants=image_variants(product.image_url, str(request.base_url)),
         stock=inventory.stock_quantity if inventory else 0,
         isAvailable=product.is_available and (inventory is None or inventory.stock_quantity > 0)
     )
 
 @router.post("", response_model=ProductResponse)
 async def create_product(
+    request: Request,
     name: str = Form(...),
     price: float = Form(...),
     category: str = Form(...),
@@ -88,26 +124,11 @@ async def create_product(
     # Handle image upload
     image_data = None
     if image and image.filename:
-        # Validate file type
-        if not image.content_type or not image.content_type.startswith('image/'):
-            raise HTTPException(status_code=400, detail="File must be an image (JPEG, PNG, etc.)")
-        
-        # Read and convert to base64
-        contents = await image.read()
-        if len(contents) > 5 * 1024 * 1024:  # 5MB limit
-            raise HTTPException(status_code=400, detail="Image file too large. Maximum size is 5MB")
-        
-        # Determine MIME type
-        mime_type = image.content_type
-        if mime_type not in ['image/jpeg', 'image/jpg', 'image/png', 'image/gif', 'image/webp']:
-            raise HTTPException(status_code=400, detail="Unsupported image format. Use JPEG, PNG, GIF, or WebP")
-        
-        # Convert to base64 data URI
-        base64_data = base64.b64encode(contents).decode('utf-8')
-        image_data = f"data:{mime_type};base64,{base64_data}"
+        image_data = await _store_upload(image)
     elif imageUrl:
-        # Use provided URL
-        image_data = imageUrl
+        # Use provided URL (data URIs are moved into the image store)
+        image_data = await store_image_url(imageUrl, str(request.base_url))
+        schedule_variants(image_data)
     
     # Generate SKU
     count_result = await db.execute(select(func.count(Product.id)))
@@ -135,27 +156,26 @@ async def create_product(
         )
         db.add(new_inventory)
     
+    await bump_catalog_version(db, [new_product.id])
+    # Nothing to reload: the session keeps attributes after commit and the stock is what we just wrote
     await db.commit()
-    await db.refresh(new_product)
-    
-    inv_result = await db.execute(
-        select(Inventory).where(Inventory.product_id == new_product.id)
-    )
-    inventory = inv_result.scalars().first()
+    stats_cache.invalidate("inventory", "analytics")
     
     return ProductResponse(
         id=str(new_product.id),
         name=new_product.name,
         price=float(new_product.price),
         category=new_product.category,
-        image=new_product.image_url or "🎂",
-        stock=inventory.stock_quantity if inventory else 0,
+        image=image_src(new_product.image_url, str(request.base_url)),
+        imageVariants=image_variants(new_product.image_url, str(request.base_url)),
+        stock=stock if stock > 0 else 0,
         isAvailable=new_product.is_available
     )
 
 @router.put("/{product_id}", response_model=ProductResponse)
 async def update_product(
     product_id: UUID,
+    request: Request,
     name: Optional[str] = Form(None),
     price: Optional[float] = Form(None),
     category: Optional[str] = Form(None),
@@ -166,7 +186,9 @@ async def update_product(
 ):
     from decimal import Decimal
     
-    result = await db.execute(select(Product).where(Product.id == product_id))
+    result = await db.execute(
+        select(Product).options(joinedload(Product.inventory)).where(Product.id == product_id)
+    )
     product = result.scalars().first()
     
     if not product:
@@ -185,41 +207,25 @@ async def update_product(
     
     # Handle image upload
     if image and image.filename:
-        # Validate file type
-        if not image.content_type or not image.content_type.startswith('image/'):
-            raise HTTPException(status_code=400, detail="File must be an image (JPEG, PNG, etc.)")
-        
-        # Read and convert to base64
-        contents = await image.read()
-        if len(contents) > 5 * 1024 * 1024:  # 5MB limit
-            raise HTTPException(status_code=400, detail="Image file too large. Maximum size is 5MB")
-        
-        # Determine MIME type
-        mime_type = image.content_type
-        if mime_type not in ['image/jpeg', 'image/jpg', 'image/png', 'image/gif', 'image/webp']:
-            raise HTTPException(status_code=400, detail="Unsupported image format. Use JPEG, PNG, GIF, or WebP")
-        
-        # Convert to base64 data URI
-        base64_data = base64.b64encode(contents).decode('utf-8')
-        product.image_url = f"data:{mime_type};base64,{base64_data}"
+        product.image_url = await _store_upload(image)
     elif imageUrl is not None:
         # Use provided URL or clear image
-        product.image_url = imageUrl if imageUrl else None
+        product.image_url = await store_image_url(imageUrl, str(request.base_url)) if imageUrl else None
+        schedule_variants(product.image_url)
     
+    await bump_catalog_version(db, [product.id])
     await db.commit()
-    await db.refresh(product)
+    stats_cache.invalidate("inventory", "analytics")
     
-    inv_result = await db.execute(
-        select(Inventory).where(Inventory.product_id == product.id)
-    )
-    inventory = inv_result.scalars().first()
+    inventory = product.inventory
     
     return ProductResponse(
         id=str(product.id),
         name=product.name,
         price=float(product.price),
         category=product.category,
-        image=product.image_url or "🎂",
+        image=image_src(product.image_url, str(request.base_url)),
+        imageVariants=image_variants(product.image_url, str(request.base_url)),
         stock=inventory.stock_quantity if inventory else 0,
         isAvailable=product.is_available
     )
@@ -233,6 +239,8 @@ async def delete_product(product_id: UUID, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Product not found")
     
     await db.delete(product)
+    await bump_catalog_version(db, [product.id])
     await db.commit()
+    stats_cache.invalidate("inventory", "analytics")
     
     return {"success": True, "message": "Product deleted successfully"}
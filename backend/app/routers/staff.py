@@ -3,8 +3,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from ..database import get_db
 from ..models import AppUser
+from ..responses import json_response
 from ..schemas import StaffResponse, StaffCreateRequest, StaffUpdateRequest
-import bcrypt
 from typing import List
 from uuid import UUID
 
@@ -12,6 +12,7 @@ router = APIRouter(prefix="/staff", tags=["staff"])
 
 def hash_pin(pin: str) -> str:
     """Hash a PIN using bcrypt"""
+    import bcrypt  # only needed here; keeps it out of API startup
     return bcrypt.hashpw(pin.encode(), bcrypt.gensalt()).decode()
 
 @router.get("", response_model=List[StaffResponse])
@@ -20,17 +21,18 @@ async def get_staff(db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(AppUser).order_by(AppUser.created_at.desc()))
     staff = result.scalars().all()
     
-    return [
-        StaffResponse(
-            id=str(s.id),
-            fullName=s.full_name,
-            phoneNumber=s.phone_number,
-            role=s.role,
-            isActive=s.is_active,
-            createdAt=s.created_at.isoformat() if s.created_at else None
-        )
+    # Plain dicts shaped like StaffResponse (see responses.py)
+    return json_response([
+        {
+            "id": str(s.id),
+            "fullName": s.full_name,
+            "phoneNumber": s.phone_number,
+            "role": s.role,
+            "isActive": s.is_active,
+            "createdAt": s.created_at.isoformat() if s.created_at else None,
+        }
         for s in staff
-    ]
+    ], List[StaffResponse])
 
 @router.post("", response_model=StaffResponse)
 async def create_staff(staff_data: StaffCreateRequest, db: AsyncSession = Depends(get_db)):
@@ -0,0 +1,72 @@
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+from ..database import get_db
+from ..models import CatalogChange, CatalogVersion, Product
+from ..pagination import decode_cursor, encode_cursor
+from ..responses import json_response
+from ..schemas import CatalogSyncResponse
+from .inventory import _inventory_row
+from .products import _product_row
+from typing import Optional
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+
+def _decode_since(since: str) -> int:
+    (version,) = decode_cursor(since, 1)
+    try:
+        return int(version)
+    except ValueError:
+        return -1  # not a version of ours; treated like an expired cursor
+
+
+@router.get("/catalog", response_model=CatalogSyncResponse)
+async def sync_catalog(
+    request: Request,
+    since: Optional[str] = Query(None, description="cursor from the previous sync; omit for a full snapshot"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Products and inventory changed since `since` (see catalog.py): a terminal keeps the
+    catalog locally and applies these, instead of re-downloading GET /products. Without
+    `since`, or with a cursor older than the change log, returns a full snapshot (`full`).
+    """
+    version, pruned_through = (await db.execute(
+        select(CatalogVersion.version, CatalogVersion.pruned_through)
+    )).one()
+    # The version is read first, so the rows below are at least this new (see catalog.py)
+    cursor = encode_cursor(version)
+    after = _decode_since(since) if since else None
+    full = after is None or after < pruned_through or after > version
+    body = {"cursor": cursor, "full": full, "products": [], "inventory": [], "removedProducts": [], "removedInventory": []}
+    if not full and after == version:
+        return json_response(body, CatalogSyncResponse)
+
+    if full:
+        result = await db.execute(
+            select(Product).options(joinedload(Product.inventory)).order_by(Product.name, Product.id)
+        )
+        products = result.unique().scalars().all()
+    else:
+        # Changed ids with their products, if still there, in one query
+        result = await db.execute(
+            select(CatalogChange.product_id, Product)
+            .outerjoin(Product, Product.id == CatalogChange.product_id)
+            .options(joinedload(Product.inventory))
+            .where(CatalogChange.version > after)
+            .order_by(Product.name, CatalogChange.product_id)
+        )
+        rows = result.unique().all()
+        changed_ids = {str(product_id) for product_id, _ in rows}
+        products = [product for _, product in rows if product is not None]
+
+    base_url = str(request.base_url)
+    body["products"] = [_product_row(product, base_url) for product in products if product.is_available]
+    # inventory.product is this product, from the identity map (no extra query)
+    body["inventory"] = [_inventory_row(product.inventory) for product in products if product.inventory]
+    if not full:
+        body["removedProducts"] = sorted(changed_ids - {row["id"] for row in body["products"]})
+        body["removedInventory"] = sorted(changed_ids - {row["productId"] for row in body["inventory"]})
+    return json_response(body, CatalogSyncResponse)
@@ -90,6 +90,36 @@ class UpdateOrderRequest(BaseModel):
     notes: Optional[str] = None
     totalAmount: float
 
+class OfflineOrderRequest(CreateOrderRequest):
+    clientKey: str = Field(..., min_length=1, max_length=100)  # generated by the POS when it queued the order
+    createdAt: Optional[datetime] = None  # when the sale was made; defaults to now
+
+class BatchOrdersRequest(BaseModel):
+    orders: List[OfflineOrderRequest] = Field(..., min_length=1, max_length=1000)
+
+class BatchOrderResult(BaseModel):
+    clientKey: str
+    status: str  # created, duplicate (applied by an earlier request) or rejected
+    orderId: Optional[UUID] = None
+    orderNumber: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchOrdersResponse(BaseModel):
+    success: bool
+    created: int
+    duplicates: int
+    rejected: int
+    results: List[BatchOrderResult]  # one per submitted order, in the same order
+
+class VoidOrdersRequest(BaseModel):
+    orderIds: List[UUID] = Field(..., min_length=1, max_length=1000)
+    refund: bool = False  # mark as refunded (stock is not given back) instead of voided
+
+class VoidOrdersResponse(BaseModel):
+    success: bool
+    voided: List[UUID]  # orders whose status changed
+    skipped: List[UUID]  # not found, or already voided/refunded
+
 class OrderItemView(BaseModel):
     id: str
     productId: str
@@ -132,12 +162,18 @@ class DashboardStatsResponse(BaseModel):
     hourlyData: Optional[List[HourlyData]] = None
 
 # --- Products ---
+class ImageVariant(BaseModel):
+    width: int
+    format: str  # "webp" or "jpg"
+    url: str
+
 class ProductResponse(BaseModel):
     id: str
     name: str
     price: float
     category: str
     image: str
+    imageVariants: List[ImageVariant] = []  # resized copies of image, smallest first
     stock: int
     isAvailable: bool
 
@@ -155,6 +191,15 @@ class InventoryItemResponse(BaseModel):
 class InventoryUpdateRequest(BaseModel):
     newStock: int
 
+# --- Catalog sync ---
+class CatalogSyncResponse(BaseModel):
+    cursor: str  # pass back as `since` next time
+    full: bool  # true: a full snapshot, replace everything; false: apply the changes below
+    products: List[ProductResponse] = []  # new or changed menu products
+    inventory: List[InventoryItemResponse] = []  # new or changed inventory rows
+    removedProducts: List[str] = []  # product ids off the menu (deleted or unavailable)
+    removedInventory: List[str] = []  # product ids without an inventory row any more
+
 # --- Expenses ---
 class ExpenseResponse(BaseModel):
     id: str
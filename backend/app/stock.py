@@ -0,0 +1,99 @@
+"""
+Batched inventory locking and stock adjustment for order writes.
+
+Every inventory row an order touches is locked with one SELECT ... FOR UPDATE
+in product_id order (so two orders can't deadlock each other), checked in
+memory, and the net change is written with a single UPDATE ... FROM (VALUES ...).
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+from uuid import UUID
+
+from sqlalchemy import Integer, column, select, update, values
+from sqlalchemy.dialects.postgresql import UUID as PGUUID
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import Inventory
+
+
+def aggregate_quantities(items: Iterable, key: str = "id") -> Dict[UUID, int]:
+    """
+    Sum quantities per product (the same product can appear on several lines).
+    `key` names the product id attribute: "id" on OrderItemRequest, "product_id" on OrderItem.
+    """
+    totals: Dict[UUID, int] = defaultdict(int)
+    for item in items:
+        product_id = getattr(item, key)
+        if product_id:
+            totals[product_id] += item.quantity
+    return dict(totals)
+
+
+async def lock_stock(db: AsyncSession, product_ids: Iterable[UUID]) -> Dict[UUID, int]:
+    """Lock inventory rows in product_id order and return product_id -> stock_quantity"""
+    ids = sorted(set(product_ids))
+    if not ids:
+        return {}
+    result = await db.execute(
+        select(Inventory.product_id, Inventory.stock_quantity)
+        .where(Inventory.product_id.in_(ids))
+        .order_by(Inventory.product_id)
+        .with_for_update()
+    )
+    return {row.product_id: row.stock_quantity for row in result.all()}
+
+
+async def apply_stock_deltas(db: AsyncSession, deltas: Dict[UUID, int]) -> None:
+    """Add each delta to its product's stock in one UPDATE (rows should already be locked)"""
+    deltas = {product_id: delta for product_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    delta_rows = values(
+        column("product_id", PGUUID(as_uuid=True)),
+        column("delta", Integer),
+        name="deltas",
+    ).data(sorted(deltas.items()))
+    await db.execute(
+        update(Inventory)
+        .where(Inventory.product_id == delta_rows.c.product_id)
+        .values(stock_quantity=Inventory.stock_quantity + delta_rows.c.delta),
+        execution_options={"synchronize_session": False},
+    )
+
+
+async def adjust_stock(
+    db: AsyncSession,
+    deduct: Dict[UUID, int],
+    restore: Optional[Dict[UUID, int]] = None,
+) -> List[str]:
+    """
+    Deduct `deduct` quantities (and give back `restore` ones, e.g. an order's old
+    items) as one locked, batched change.
+
+    Returns a message per product that is missing an inventory record or would go
+    below zero; in that case nothing is written and the caller should roll back.
+    """
+    restore = restore or {}
+    stock = await lock_stock(db, set(deduct) | set(restore))
+
+    missing = [product_id for product_id in sorted(deduct) if product_id not in stock]
+    insufficient = [
+        product_id
+        for product_id, quantity in sorted(deduct.items())
+        if product_id in stock and stock[product_id] + restore.get(product_id, 0) < quantity
+    ]
+    problems = []
+    if insufficient:
+        problems.append(f"Insufficient stock for product id {', '.join(str(p) for p in insufficient)}")
+    if missing:
+        problems.append(f"Inventory record not found for product id {', '.join(str(p) for p in missing)}")
+    if problems:
+        return problems
+
+    deltas: Dict[UUID, int] = defaultdict(int)
+    for product_id, quantity in restore.items():
+        deltas[product_id] += quantity
+    for product_id, quantity in deduct.items():
+        deltas[product_id] -= quantity
+    await apply_stock_deltas(db, deltas)
+    return []
@@ -0,0 +1,144 @@
+"""
+Responsive variants of stored product images.
+
+For every stored image `<sha256>.<ext>` we serve resized copies named
+`<sha256>_<width>.<webp|jpg>` at the fixed widths in VARIANT_WIDTHS, so the POS
+grid can load a ~200px tile instead of the full upload. Variants are generated
+with Pillow in a small thread pool (off the event loop) right after upload,
+and on demand by GET /images if one is missing. Names derive from the content
+hash, so generation is idempotent and each variant is built at most once.
+"""
+import asyncio
+import io
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from .images import CONTENT_TYPES, IMAGE_URL_PREFIX, get_store, public_base_url
+
+VARIANT_WIDTHS = (200, 400, 800)
+VARIANT_FORMATS = ("webp", "jpg")
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+
+VARIANT_NAME = re.compile(r"^(?P<hash>[0-9a-f]{64})_(?P<width>\d+)\.(?P<format>webp|jpg)$")
+ORIGINAL_PATH = re.compile(r"^/images/(?P<hash>[0-9a-f]{64})\.(?P<ext>jpg|png|gif|webp)$")
+
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("IMAGE_WORKERS", "2")),
+    thread_name_prefix="image-variants",
+)
+# Variant name -> its in-flight generation, shared by an upload and any request for that variant
+_pending: Dict[str, asyncio.Future] = {}
+
+
+def variant_name(content_hash: str, width: int, fmt: str) -> str:
+    return f"{content_hash}_{width}.{fmt}"
+
+
+def render_variant(contents: bytes, width: int, fmt: str) -> bytes:
+    """Resize image bytes to `width` (never upscaling) and encode as WebP or JPEG"""
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(contents)) as original:
+        image = ImageOps.exif_transpose(original)  # also loads the first frame of GIFs
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.LANCZOS)
+
+        output = io.BytesIO()
+        if fmt == "webp":
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+            image.save(output, format="WEBP", quality=WEBP_QUALITY, method=4)
+        else:
+            if image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info):
+                # JPEG has no alpha: flatten onto white like the POS tiles
+                rgba = image.convert("RGBA")
+                image = Image.new("RGB", rgba.size, (255, 255, 255))
+                image.paste(rgba, mask=rgba.getchannel("A"))
+            elif image.mode != "RGB":
+                image = image.convert("RGB")
+            image.save(output, format="JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+        return output.getvalue()
+
+
+def _build_variant(original_name: str, contents: Optional[bytes], name: str) -> None:
+    """Worker thread: render and store one variant of an original, unless it exists already"""
+    store = get_store()
+    if store.exists(name):
+        return
+    if contents is None:
+        contents = store.read(original_name)
+    match = VARIANT_NAME.match(name)
+    fmt = match.group("format")
+    store.put(name, render_variant(contents, int(match.group("width")), fmt), CONTENT_TYPES[fmt])
+
+
+async def _run(original_name: str, contents: Optional[bytes], names: List[str]) -> None:
+    """Build the given variants, joining any already being built (by an upload or another request)"""
+    loop = asyncio.get_running_loop()
+    futures = []
+    for name in names:
+        future = _pending.get(name)
+        if future is None:
+            future = asyncio.ensure_future(
+                loop.run_in_executor(_executor, _build_variant, original_name, contents, name)
+            )
+            _pending[name] = future
+            future.add_done_callback(lambda _, name=name: _pending.pop(name, None))
+        futures.append(future)
+    await asyncio.shield(asyncio.gather(*futures))
+
+
+def _original_name(image_url: Optional[str]) -> Optional[str]:
+    match = ORIGINAL_PATH.match(image_url or "")
+    return f"{match.group('hash')}.{match.group('ext')}" if match else None
+
+
+def schedule_variants(image_url: str, contents: Optional[bytes] = None) -> None:
+    """Start generating every variant of a stored image in the background"""
+    original = _original_name(image_url)
+    if not original:
+        return
+    content_hash = original.split(".")[0]
+    names = [variant_name(content_hash, width, fmt) for width in VARIANT_WIDTHS for fmt in VARIANT_FORMATS]
+    task = asyncio.ensure_future(_run(original, contents, names))
+    task.add_done_callback(_report_failure)
+
+
+def _report_failure(task: asyncio.Future) -> None:
+    # Missing variants are regenerated on demand by GET /images, so just log
+    if not task.cancelled() and task.exception():
+        print(f"Error generating image variants: {task.exception()}")
+
+
+async def ensure_variant(name: str) -> bool:
+    """Make sure a variant exists, generating it from its original if needed; False if unknown"""
+    match = VARIANT_NAME.match(name)
+    if not match or int(match.group("width")) not in VARIANT_WIDTHS:
+        return False
+    store = get_store()
+    if await asyncio.to_thread(store.exists, name):
+        return True
+    for ext in ("jpg", "png", "webp", "gif"):
+        original = f"{match.group('hash')}.{ext}"
+        if await asyncio.to_thread(store.exists, original):
+            await _run(original, None, [name])
+            return True
+    return False
+
+
+def image_variants(image_url: Optional[str], base_url: str) -> List[dict]:
+    """Variant URLs for API responses (empty for emoji / external images)"""
+    original = _original_name(image_url)
+    if not original:
+        return []
+    content_hash = original.split(".")[0]
+    base = public_base_url(base_url)
+    return [
+        {"width": width, "format": fmt, "url": f"{base}{IMAGE_URL_PREFIX}{variant_name(content_hash, width, fmt)}"}
+        for width in VARIANT_WIDTHS
+        for fmt in VARIANT_FORMATS
+    ]
@@ -0,0 +1,84 @@
+"""
+Polling traffic for a terminal: full GET /products vs delta GET /sync/catalog.
+
+While orders keep arriving (--orders between polls, each 1-3 lines, which
+changes those products' stock), a terminal polls both ways and the script
+reports rows, bytes and latency per poll. Writes are real, so use a scratch
+database; for a 2,000-SKU shop fill it first with
+
+    python benchmarks/datagen.py --products 2000 --orders 20000
+    uvicorn app.main:app --port 8000
+    python benchmarks/bench_catalog_sync.py --polls 50 --orders 3
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+
+import httpx
+
+from bench_pool_modes import percentile
+
+
+def order_body(rng: random.Random, products) -> dict:
+    lines = rng.sample(products, k=rng.choice([1, 1, 2, 3]))
+    items = [{"id": p["id"], "quantity": 1, "price": p["price"]} for p in lines]
+    return {
+        "customer": {"fullName": "Sync Bench", "phoneNumber": "0500000003"},
+        "items": items,
+        "paymentMethod": "cash",
+        "totalAmount": sum(i["price"] for i in items),
+        "notes": "catalog sync benchmark",
+    }
+
+
+async def timed_get(client: httpx.AsyncClient, url: str, **params):
+    start = time.perf_counter()
+    response = await client.get(url, params=params)
+    response.raise_for_status()
+    return response, time.perf_counter() - start
+
+
+async def main(base_url: str, polls: int, orders: int, seed: int) -> int:
+    rng = random.Random(seed)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        snapshot, _ = await timed_get(client, "/sync/catalog")
+        cursor = snapshot.json()["cursor"]
+        products = [p for p in snapshot.json()["products"] if p["stock"] >= polls * orders * 3]
+        if not products:
+            raise SystemExit("No product with enough stock; fill the database with datagen.py first.")
+        print(f"Catalog: {len(snapshot.json()['products'])} products, full snapshot {len(snapshot.content) / 1024:.0f} KB")
+
+        samples = {"full": [], "delta": []}
+        for _ in range(polls):
+            for _ in range(orders):
+                (await client.post("/orders/create", json=order_body(rng, products))).raise_for_status()
+            response, elapsed = await timed_get(client, "/products")
+            samples["full"].append((len(response.json()), len(response.content), elapsed))
+            response, elapsed = await timed_get(client, "/sync/catalog", since=cursor)
+            delta = response.json()
+            if delta["full"]:
+                raise SystemExit("The change log was pruned during the run")
+            cursor = delta["cursor"]
+            rows = len(delta["products"]) + len(delta["removedProducts"])
+            samples["delta"].append((rows, len(response.content), elapsed))
+
+    print(f"{polls} polls, {orders} orders between polls")
+    print(f"{'poll':<6} {'rows/poll':>10} {'KB/poll':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, values in samples.items():
+        latencies = sorted(v[2] for v in values)
+        print(f"{name:<6} {statistics.mean(v[0] for v in values):>10.1f} {statistics.mean(v[1] for v in values) / 1024:>9.1f} "
+              f"{percentile(latencies, 0.50) * 1000:>8.2f} {percentile(latencies, 0.99) * 1000:>8.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--polls", type=int, default=50)
+    parser.add_argument("--orders", type=int, default=3, help="orders placed between polls")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.url, args.polls, args.orders, args.seed)))
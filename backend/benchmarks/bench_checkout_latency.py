@@ -0,0 +1,171 @@
+"""
+Checkout latency over a slow database link: ORM steps vs the checkout() function.
+
+Puts a TCP proxy that adds --latency ms of round-trip delay between the app and
+DATABASE_URL, then places --orders sequential checkouts with each path:
+
+    orm        the previous create_order: customer lookup, flushes, order number,
+               item inserts, stock lock/update and rollups as separate statements
+    function   POST /orders/create today: one call to checkout(jsonb)
+               (supabase/migrations/006_checkout_function.sql)
+
+and reports p50/p99 latency and how many messages the app sent per checkout.
+Needs products with inventory; orders are really created, so use a scratch database.
+
+    python benchmarks/bench_checkout_latency.py --latency 20 --orders 100 --items 5
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+from uuid import UUID
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import rollups
+from app.checkout import checkout
+from app.database import DATABASE_URL, _engine_options
+from app.models import Customer, Order, OrderItem
+from app.order_numbers import allocate_order_number
+from app.stock import adjust_stock, aggregate_quantities
+
+
+class DelayProxy:
+    """Forwards TCP (or to a unix socket) adding one_way seconds in each direction"""
+
+    def __init__(self, upstream, one_way: float):
+        self.upstream = upstream  # ("tcp", host, port) or ("unix", path)
+        self.one_way = one_way
+        self.client_messages = 0
+
+    async def _pipe(self, reader, writer, count: bool):
+        try:
+            while data := await reader.read(65536):
+                if count:
+                    self.client_messages += 1
+                await asyncio.sleep(self.one_way)
+                writer.write(data)
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle(self, client_reader, client_writer):
+        if self.upstream[0] == "unix":
+            server_reader, server_writer = await asyncio.open_unix_connection(self.upstream[1])
+        else:
+            server_reader, server_writer = await asyncio.open_connection(self.upstream[1], self.upstream[2])
+        await asyncio.gather(
+            self._pipe(client_reader, server_writer, count=True),
+            self._pipe(server_reader, client_writer, count=False),
+        )
+
+    async def start(self) -> int:
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+
+def upstream_of(url):
+    socket_dir = url.query.get("host")
+    if socket_dir and str(socket_dir).startswith("/"):
+        return ("unix", f"{socket_dir}/.s.PGSQL.{url.port or 5432}")
+    return ("tcp", url.host or "localhost", url.port or 5432)
+
+
+def order_body(products, items: int, i: int) -> dict:
+    chosen = [products[(i + n) % len(products)] for n in range(items)]
+    return {
+        "customer": {"fullName": "Latency Bench", "phoneNumber": f"07{i % 50:08d}", "notes": None},
+        "items": [{"id": str(p), "quantity": 1, "price": 10.0} for p in chosen],
+        "paymentMethod": "cash",
+        "staffId": None,
+        "notes": "checkout latency benchmark",
+        "totalAmount": 10.0 * len(chosen),
+    }
+
+
+async def orm_checkout(db: AsyncSession, body: dict):
+    """The step-by-step create_order this function replaced"""
+    result = await db.execute(select(Customer).where(Customer.phone_number == body["customer"]["phoneNumber"]))
+    customer = result.scalars().first()
+    if not customer:
+        customer = Customer(full_name=body["customer"]["fullName"], phone_number=body["customer"]["phoneNumber"],
+                            total_orders=0, total_spent=Decimal("0"))
+        db.add(customer)
+        await db.flush()
+    order = Order(order_number=await allocate_order_number(db), customer_id=customer.id,
+                  total_amount=Decimal(str(body["totalAmount"])), payment_method=body["paymentMethod"],
+                  status="completed", notes=body["notes"])
+    db.add(order)
+    await db.flush()
+    customer.total_orders += 1
+    customer.total_spent += Decimal(str(body["totalAmount"]))
+    for item in body["items"]:
+        db.add(OrderItem(order_id=order.id, product_id=item["id"], quantity=item["quantity"],
+                         unit_price=Decimal(str(item["price"])), total_price=Decimal(str(item["price"] * item["quantity"]))))
+    items = [argparse.Namespace(id=UUID(item["id"]), quantity=item["quantity"]) for item in body["items"]]
+    if await adjust_stock(db, aggregate_quantities(items)):
+        raise SystemExit("Not enough stock for the benchmark orders.")
+    await rollups.apply_order(db, order.id)
+    await db.commit()
+
+
+async def function_checkout(db: AsyncSession, body: dict):
+    await checkout(db, json.dumps(body))
+
+
+async def run(path, Session, proxy, products, orders: int, items: int):
+    latencies, messages = [], []
+    for i in range(orders):
+        async with Session() as db:
+            before = proxy.client_messages
+            start = time.perf_counter()
+            await path(db, order_body(products, items, i))
+            latencies.append((time.perf_counter() - start) * 1000)
+            messages.append(proxy.client_messages - before)
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return statistics.median(latencies), p99, statistics.median(messages)
+
+
+async def main(latency_ms: float, orders: int, items: int):
+    url = make_url(DATABASE_URL)
+    proxy = DelayProxy(upstream_of(url), latency_ms / 2000)
+    port = await proxy.start()
+    proxied = url.set(host="127.0.0.1", port=port, query={k: v for k, v in url.query.items() if k != "host"})
+    # A warm pool, so connection setup isn't part of the measurement
+    engine = create_async_engine(proxied, **_engine_options("queue"))
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with engine.connect() as conn:
+        products = (await conn.execute(text(
+            "SELECT product_id FROM inventory WHERE stock_quantity > :need ORDER BY product_id LIMIT 50"
+        ), {"need": orders * 2})).scalars().all()
+    if len(products) < items:
+        raise SystemExit(f"Need at least {items} products with more than {orders * 2} units in stock.")
+
+    print(f"RTT {latency_ms:.0f} ms, {orders} orders x {items} items")
+    print(f"{'path':<10} {'p50 ms':>8} {'p99 ms':>8} {'msgs':>5}")
+    for name, path in (("orm", orm_checkout), ("function", function_checkout)):
+        p50, p99, msgs = await run(path, Session, proxy, products, orders, items)
+        print(f"{name:<10} {p50:>8.1f} {p99:>8.1f} {msgs:>5.0f}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=20, help="added round-trip time in ms")
+    parser.add_argument("--orders", type=int, default=100)
+    parser.add_argument("--items", type=int, default=5, help="line items per order")
+    args = parser.parse_args()
+    asyncio.run(main(args.latency, args.orders, args.items))
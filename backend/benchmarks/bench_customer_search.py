@@ -0,0 +1,101 @@
+"""
+Customer search latency (app/customer_search.py) on synthetic customers.
+
+Optionally seeds N customers with generated Indian-style names and phone
+numbers into DATABASE_URL first (use a scratch database), then reports p50/p99
+for typeahead and paged search over a mix of name prefixes, full names and
+phone digits. Apply supabase/migrations/005_customer_search.sql beforehand.
+
+    DATABASE_URL=postgresql+asyncpg://.../scratch python benchmarks/bench_customer_search.py --seed 500000
+    python benchmarks/bench_customer_search.py --repeat 50
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import text
+
+from app.customer_search import search_customers
+from app.database import AsyncSessionLocal, engine
+
+SEED_NOTE = "customer search benchmark seed"
+FIRST_NAMES = [
+    "Aarav", "Aditi", "Akash", "Ananya", "Arjun", "Deepa", "Divya", "Gaurav", "Ishaan", "Kavya",
+    "Kiran", "Lakshmi", "Meera", "Neha", "Nikhil", "Pooja", "Priya", "Rahul", "Ravi", "Rohan",
+    "Sanjay", "Shreya", "Sneha", "Suresh", "Tanvi", "Varun", "Vikram", "Yash", "Zara", "Anil",
+]
+LAST_NAMES = [
+    "Sharma", "Verma", "Iyer", "Nair", "Reddy", "Patel", "Shah", "Gupta", "Kumar", "Singh",
+    "Menon", "Pillai", "Rao", "Das", "Bose", "Joshi", "Kulkarni", "Mehta", "Chopra", "Kapoor",
+]
+QUERIES = ["a", "pr", "sha", "priya", "priya sh", "kumar", "nair r", "9", "900", "90001 2"]
+
+
+async def seed(customers: int, batch: int = 100_000):
+    done = 0
+    while done < customers:
+        n = min(batch, customers - done)
+        async with engine.begin() as conn:
+            await conn.execute(text("""
+                INSERT INTO customers (id, full_name, phone_number, notes, total_orders, total_spent, updated_at)
+                SELECT gen_random_uuid(),
+                       f.names[1 + floor(random() * array_length(f.names, 1))::int] || ' ' ||
+                       l.names[1 + floor(random() * array_length(l.names, 1))::int],
+                       '9' || lpad((:offset + g)::text, 9, '0'),
+                       :note, 0, 0, now() - random() * interval '365 days'
+                FROM generate_series(1, :n) g
+                CROSS JOIN (SELECT CAST(:first AS text[]) AS names) f
+                CROSS JOIN (SELECT CAST(:last AS text[]) AS names) l
+            """), {"first": FIRST_NAMES, "last": LAST_NAMES, "offset": done, "n": n, "note": SEED_NOTE})
+        done += n
+        print(f"  seeded {done}/{customers} customers")
+    async with engine.begin() as conn:
+        await conn.execute(text("ANALYZE customers"))
+
+
+async def timed(q, limit, page, repeat):
+    """Latency of fetching page number `page` (1-based) of results for q"""
+    samples = []
+    async with AsyncSessionLocal() as db:
+        after = None
+        for _ in range(page - 1):
+            _, after = await search_customers(db, q, limit, after)
+            if after is None:
+                return None
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            rows, _ = await search_customers(db, q, limit, after)
+            samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.99))], len(rows)
+
+
+async def main(seed_customers: int, repeat: int):
+    if seed_customers:
+        print(f"Seeding {seed_customers} customers...")
+        await seed(seed_customers)
+
+    async with engine.connect() as conn:
+        total = (await conn.execute(text("SELECT count(*) FROM customers"))).scalar()
+    print(f"\nCustomers in database: {total}")
+    print(f"{'query':<10} {'mode':<16} {'p50 ms':>8} {'p99 ms':>8} {'rows':>5}")
+    runs = (("typeahead", 8, 1), ("search page 1", 50, 1), ("search page 20", 50, 20))
+    for q in QUERIES:
+        for mode, limit, page in runs:
+            timing = await timed(q, limit, page, repeat)
+            if timing:
+                p50, p99, rows = timing
+                print(f"{q:<10} {mode:<16} {p50:>8.2f} {p99:>8.2f} {rows:>5}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=0, help="synthetic customers to insert first")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.seed, args.repeat))
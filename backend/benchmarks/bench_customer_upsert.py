@@ -0,0 +1,101 @@
+"""
+Stress test for customer upserts and customer totals.
+
+Points --clients concurrent clients at one brand-new phone number. Each client
+places --orders orders with POST /orders/create and re-prices every order once
+with PUT /orders/{id}. Afterwards there must be exactly one customer with that
+phone, and their visits and total spent must equal the orders that succeeded
+(lost updates or a unique-constraint race show up as a mismatch or as failures).
+
+    uvicorn app.main:app --port 8000
+    python benchmarks/bench_customer_upsert.py --clients 50 --orders 4
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from decimal import Decimal
+
+import httpx
+
+from bench_order_numbers import pick_product
+
+
+async def run(base_url: str, clients: int, orders: int):
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        product = await pick_product(client, clients * orders * 2)
+        phone = f"8{int(time.time() * 1000) % 10**9:09d}"
+        price = Decimal(str(product["price"]))
+
+        def payload(quantity: int) -> dict:
+            return {
+                "customer": {"fullName": "Stress Test Regular", "phoneNumber": phone},
+                "items": [{"id": product["id"], "quantity": quantity, "price": product["price"]}],
+                "paymentMethod": "cash",
+                "totalAmount": float(price * quantity),
+                "notes": "customer upsert stress test",
+            }
+
+        latencies = {"create": [], "update": []}
+        final_totals = []
+        failures = []
+
+        async def timed(kind, call):
+            start = time.perf_counter()
+            try:
+                response = await call
+            except httpx.HTTPError as e:
+                failures.append(f"{kind}: {e!r}")
+                return None
+            latencies[kind].append(time.perf_counter() - start)
+            if response.status_code != 200:
+                failures.append(f"{kind} {response.status_code}: {response.text[:200]}")
+                return None
+            return response.json()
+
+        async def one_client():
+            for _ in range(orders):
+                created = await timed("create", client.post("/orders/create", json=payload(1)))
+                if not created:
+                    continue
+                updated = await timed("update", client.put(f"/orders/{created['orderId']}", json=payload(2)))
+                final_totals.append(price * (2 if updated else 1))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one_client() for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+
+        response = await client.get("/customers", params={"q": phone, "limit": 50})
+        response.raise_for_status()
+        matches = [c for c in response.json() if c["phone"] == phone]
+
+    expected_visits, expected_spent = len(final_totals), sum(final_totals, Decimal("0"))
+    print(f"Phone:          {phone} ({clients} clients x {orders} orders)")
+    print(f"Requests:       {len(latencies['create']) + len(latencies['update'])} in {elapsed:.1f}s, {len(failures)} failed")
+    for kind, samples in latencies.items():
+        if samples:
+            samples.sort()
+            print(f"{kind + ' p50/p99:':<16}{statistics.median(samples) * 1000:.1f} / "
+                  f"{samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000:.1f} ms")
+    print(f"Customer rows:  {len(matches)} (expected 1)")
+    ok = len(matches) == 1 and not failures
+    if matches:
+        visits, spent = matches[0]["visits"], Decimal(str(matches[0]["totalSpent"]))
+        print(f"Visits:         {visits} (expected {expected_visits})")
+        print(f"Total spent:    {spent} (expected {expected_spent})")
+        ok = ok and visits == expected_visits and spent == expected_spent
+    for failure in failures[:5]:
+        print(f"  ! {failure}")
+    print("OK" if ok else "MISMATCH")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--orders", type=int, default=4, help="orders per client")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.url, args.clients, args.orders)))
@@ -0,0 +1,126 @@
+"""
+Dashboard stats: raw orders/order_items aggregates vs the rollup tables.
+
+Optionally seeds N synthetic orders (2 items each, spread over the last year)
+into DATABASE_URL first. Use a scratch database: seeded rows are real orders.
+
+    DATABASE_URL=postgresql+asyncpg://.../scratch python benchmarks/bench_dashboard_rollups.py --seed 1000000
+    python benchmarks/bench_dashboard_rollups.py --repeat 20
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from datetime import datetime, time as dtime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import and_, desc, extract, func, select, text
+
+from app import rollups
+from app.database import AsyncSessionLocal, engine
+from app.models import Order, OrderItem, Product
+from app.routers.analytics import load_dashboard_stats
+
+SEED_NOTE = "dashboard benchmark seed"
+
+
+async def seed(orders: int, batch: int = 100_000):
+    async with engine.begin() as conn:
+        if not (await conn.execute(text("SELECT count(*) FROM products"))).scalar():
+            raise SystemExit("Seeding needs at least one product.")
+    done = 0
+    while done < orders:
+        n = min(batch, orders - done)
+        async with engine.begin() as conn:
+            await conn.execute(text("""
+                WITH new_orders AS (
+                    INSERT INTO orders (id, created_at, total_amount, payment_method, status, notes)
+                    SELECT gen_random_uuid(), now() - random() * interval '365 days',
+                           round((50 + random() * 950)::numeric, 2),
+                           (ARRAY['cash', 'card', 'upi'])[1 + floor(random() * 3)::int], 'completed', :note
+                    FROM generate_series(1, :n)
+                    RETURNING id
+                )
+                INSERT INTO order_items (id, order_id, product_id, quantity, unit_price, total_price)
+                SELECT gen_random_uuid(), o.id, p.ids[1 + floor(random() * array_length(p.ids, 1))::int],
+                       1 + floor(random() * 3)::int, 50, 50
+                FROM new_orders o
+                CROSS JOIN (SELECT array_agg(id) AS ids FROM products) p
+                CROSS JOIN generate_series(1, 2)
+            """), {"n": n, "note": SEED_NOTE})
+        done += n
+        print(f"  seeded {done}/{orders} orders")
+    async with AsyncSessionLocal() as db:
+        await rollups.rebuild_rollups(db)
+        await db.commit()
+    async with engine.begin() as conn:
+        await conn.execute(text("ANALYZE"))
+
+
+async def raw_path(db, start, end, hourly: bool):
+    """The queries get_dashboard_stats used to run against orders/order_items"""
+    window = and_(Order.created_at >= start, Order.created_at <= end)
+    await db.execute(select(func.sum(Order.total_amount)).where(window))
+    await db.execute(select(func.count(Order.id)).where(window))
+    await db.execute(
+        select(Product.name, func.sum(OrderItem.quantity).label("total_sold"))
+        .join(OrderItem, OrderItem.product_id == Product.id)
+        .join(Order, OrderItem.order_id == Order.id)
+        .where(window)
+        .group_by(Product.name)
+        .order_by(desc("total_sold"))
+        .limit(1)
+    )
+    if hourly:
+        hour = extract("hour", Order.created_at)
+        await db.execute(
+            select(hour, func.count(Order.id), func.sum(Order.total_amount)).where(window).group_by(hour)
+        )
+
+
+async def rollup_path(db, start, end, hourly: bool):
+    # Uncached: the same single statement the endpoint runs on a cache miss
+    await load_dashboard_stats(db, start, end, hourly)
+
+
+async def timed(fn, start, end, hourly, repeat):
+    samples = []
+    async with AsyncSessionLocal() as db:
+        await fn(db, start, end, hourly)  # warm-up
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            await fn(db, start, end, hourly)
+            samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+async def main(seed_orders: int, repeat: int):
+    if seed_orders:
+        print(f"Seeding {seed_orders} orders...")
+        await seed(seed_orders)
+
+    async with engine.connect() as conn:
+        order_total = (await conn.execute(text("SELECT count(*) FROM orders"))).scalar()
+    now = datetime.now()
+    periods = {
+        "today": (datetime.combine(now.date(), dtime.min), datetime.combine(now.date(), dtime.max), True),
+        "week": (now - timedelta(days=7), now, False),
+        "month": (now - timedelta(days=30), now, False),
+    }
+    print(f"\nOrders in database: {order_total}")
+    print(f"{'period':<8} {'raw ms':>10} {'rollup ms':>10} {'speedup':>8}")
+    for name, (start, end, hourly) in periods.items():
+        raw = await timed(raw_path, start, end, hourly, repeat)
+        rolled = await timed(rollup_path, start, end, hourly, repeat)
+        print(f"{name:<8} {raw:>10.2f} {rolled:>10.2f} {raw / rolled:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=0, help="synthetic orders to insert first")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.seed, args.repeat))
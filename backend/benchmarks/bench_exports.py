@@ -0,0 +1,104 @@
+"""
+Streaming sales export: time to first byte, total time and server memory.
+
+Starts a uvicorn worker against DATABASE_URL and downloads GET /analytics/export
+for date ranges of increasing size, in each format. While a download runs, the
+server's resident memory is sampled from /proc (Linux only); with streaming the
+peak should stay about the same whatever the row count. Seed data with
+bench_dashboard_rollups.py --seed N first.
+
+    python benchmarks/bench_exports.py --days 1 30 365
+    python benchmarks/bench_exports.py --days 3650 --formats csv --no-items
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise SystemExit("Backend did not come up; check DATABASE_URL.")
+
+
+async def sample_peak(pid: int, stop: asyncio.Event) -> float:
+    peak = rss_mb(pid)
+    while not stop.is_set():
+        peak = max(peak, rss_mb(pid))
+        await asyncio.sleep(0.02)
+    return max(peak, rss_mb(pid))
+
+
+async def download(client: httpx.AsyncClient, pid: int, params: dict):
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_peak(pid, stop))
+    size = 0
+    first_byte = None
+    started = time.perf_counter()
+    try:
+        async with client.stream("GET", "/analytics/export", params=params) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_raw():
+                if first_byte is None:
+                    first_byte = time.perf_counter() - started
+                size += len(chunk)
+    finally:
+        stop.set()
+    total = time.perf_counter() - started
+    return (first_byte or total) * 1000, total, size / 1024 / 1024, await sampler
+
+
+async def main(days_list, formats, items: bool, port: int):
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=os.environ.copy(), stdout=subprocess.DEVNULL,
+    )
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None) as client:
+            await wait_ready(client)
+            idle = rss_mb(server.pid)
+            print(f"server RSS before exports: {idle:.1f} MB")
+            print(f"{'days':>6} {'format':<6} {'TTFB ms':>9} {'total s':>8} {'MB out':>8} {'peak RSS MB':>12}")
+            end = date.today()
+            for days in days_list:
+                start = end - timedelta(days=days - 1)
+                for fmt in formats:
+                    params = {"start": start.isoformat(), "end": end.isoformat(), "format": fmt, "items": str(items).lower()}
+                    ttfb, total, size, peak = await download(client, server.pid, params)
+                    print(f"{days:>6} {fmt:<6} {ttfb:>9.1f} {total:>8.2f} {size:>8.1f} {peak:>12.1f}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", nargs="+", type=int, default=[1, 30, 365], help="range sizes, ending today")
+    parser.add_argument("--formats", nargs="+", choices=("xlsx", "csv"), default=["xlsx", "csv"])
+    parser.add_argument("--no-items", dest="items", action="store_false", help="one row per order")
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+    asyncio.run(main(args.days, args.formats, args.items, args.port))
@@ -0,0 +1,66 @@
+"""
+Requests/sec for POS terminals polling an unchanged menu.
+
+Loads GET /products and GET /inventory from --terminals concurrent pollers on a
+running server, first as plain GETs (every poll re-runs the query and sends the
+whole list, as before ETags) and then as conditional GETs that send back the
+ETag from the previous answer (304 while the catalog version is unchanged; see
+app/catalog.py). Nothing should write to the catalog while it runs.
+
+    uvicorn app.main:app --port 8000
+    python benchmarks/bench_menu_polling.py --seconds 10 --terminals 20
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from bench_pool_modes import percentile
+
+
+async def poll(client: httpx.AsyncClient, path: str, seconds: float, terminals: int, conditional: bool):
+    latencies, statuses, received = [], {}, 0
+    deadline = time.perf_counter() + seconds
+
+    async def terminal():
+        nonlocal received
+        etag = None
+        while time.perf_counter() < deadline:
+            headers = {"If-None-Match": etag} if conditional and etag else {}
+            start = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            received += len(response.content)
+            etag = response.headers.get("etag", etag)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(terminal() for _ in range(terminals)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return len(latencies) / elapsed, percentile(latencies, 0.50), percentile(latencies, 0.99), received / len(latencies), statuses
+
+
+async def main(base_url: str, seconds: float, terminals: int):
+    limits = httpx.Limits(max_connections=terminals, max_keepalive_connections=terminals)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        print(f"{terminals} terminals, {seconds:.0f}s per run")
+        print(f"{'endpoint':<10} {'mode':<12} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'bytes/req':>10}  statuses")
+        for path in ("/products", "/inventory"):
+            await poll(client, path, 1, terminals, False)  # warm up
+            results = {}
+            for mode, conditional in (("plain", False), ("conditional", True)):
+                rps, p50, p99, size, statuses = await poll(client, path, seconds, terminals, conditional)
+                results[mode] = rps
+                print(f"{path:<10} {mode:<12} {rps:>8.0f} {p50 * 1000:>8.2f} {p99 * 1000:>8.2f} {size:>10.0f}  {statuses}")
+            print(f"{'':<10} {'speedup':<12} {results['conditional'] / results['plain']:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--terminals", type=int, default=20, help="concurrent pollers")
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.seconds, args.terminals))
@@ -0,0 +1,89 @@
+"""
+Cost of the Prometheus request metrics (app/metrics.py) on GET /products.
+
+Starts two uvicorn workers against DATABASE_URL, one with METRICS_ENABLED=true
+and one with METRICS_ENABLED=false, then loads them in alternating rounds (so
+drift in the machine or database affects both alike) and compares mean, p50 and
+p99 latency. The request metrics should add well under 2%.
+
+    python benchmarks/bench_metrics_overhead.py --rounds 10 --requests 500
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from bench_pool_modes import BACKEND_DIR, percentile, wait_ready
+
+
+def start_server(port: int, enabled: bool) -> subprocess.Popen:
+    env = {**os.environ, "METRICS_ENABLED": "true" if enabled else "false"}
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL,
+    )
+
+
+async def round_latencies(client: httpx.AsyncClient, total: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get("/products")
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(total)))
+    return latencies
+
+
+async def main(port: int, rounds: int, total: int, concurrency: int):
+    servers = {"off": start_server(port, False), "on": start_server(port + 1, True)}
+    samples = {"off": [], "on": []}
+    try:
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        clients = {
+            "off": httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60, limits=limits),
+            "on": httpx.AsyncClient(base_url=f"http://127.0.0.1:{port + 1}", timeout=60, limits=limits),
+        }
+        for client in clients.values():
+            await wait_ready(client)
+            await round_latencies(client, concurrency * 5, concurrency)  # warm up
+        for n in range(rounds):
+            # Alternate which server goes first
+            for name in (("off", "on") if n % 2 == 0 else ("on", "off")):
+                samples[name] += await round_latencies(clients[name], total, concurrency)
+        for client in clients.values():
+            await client.aclose()
+    finally:
+        for server in servers.values():
+            server.terminate()
+            server.wait()
+
+    print(f"GET /products, {rounds} rounds x {total} requests, concurrency {concurrency}")
+    print(f"{'metrics':<8} {'mean ms':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    summary = {}
+    for name in ("off", "on"):
+        values = sorted(samples[name])
+        summary[name] = (statistics.mean(values) * 1000, percentile(values, 0.50) * 1000, percentile(values, 0.99) * 1000)
+        print(f"{name:<8} {summary[name][0]:>8.2f} {summary[name][1]:>8.2f} {summary[name][2]:>8.2f}")
+    overhead = (summary["on"][0] / summary["off"][0] - 1) * 100
+    print(f"Overhead (mean): {overhead:+.2f}%")
+    return 0 if overhead < 2 else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8766, help="metrics off on this port, on on the next")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=500, help="requests per round and server")
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.port, args.rounds, args.requests, args.concurrency)))
@@ -0,0 +1,125 @@
+"""
+Replaying a terminal's offline queue: one POST /orders/create per order vs POST /orders/batch.
+
+Builds --orders seeded orders as a terminal would queue them during an outage
+(1-3 lines each, a few hundred returning customers, sold over the last two
+hours), replays the first --single of them one request at a time as terminals
+do today, then all of them through /orders/batch in --batch-size chunks, then
+the batches again as a retry after a timeout would (every order a duplicate).
+Reports orders/sec, latency per request and SQL statements per request (from
+the Server-Timing header). Writes are real, so use a scratch database:
+
+    python benchmarks/datagen.py --products 2000 --orders 20000
+    uvicorn app.main:app --port 8000
+    python benchmarks/bench_offline_replay.py --orders 5000 --batch-size 500
+"""
+import argparse
+import asyncio
+import random
+import re
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+from bench_pool_modes import percentile
+
+_QUERIES = re.compile(r'desc="(\d+) quer')
+
+
+def queued_orders(rng: random.Random, products, count: int):
+    run = uuid.uuid4().hex[:8]  # fresh keys on every run; the seed fixes everything else
+    phones = [f"05{rng.randrange(10**8):08d}" for _ in range(300)]
+    start = datetime.now(timezone.utc) - timedelta(hours=2)
+    orders = []
+    for i in range(count):
+        lines = rng.sample(products, k=rng.choice([1, 1, 2, 3]))
+        items = [{"id": p["id"], "quantity": 1, "price": p["price"]} for p in lines]
+        phone = rng.choice(phones)
+        orders.append({
+            "clientKey": f"bench-{run}-{i}",
+            "createdAt": (start + timedelta(seconds=i * 7200 / count)).isoformat(),
+            "customer": {"fullName": f"Offline {phone[-4:]}", "phoneNumber": phone},
+            "items": items,
+            "paymentMethod": rng.choice(["cash", "card"]),
+            "totalAmount": sum(item["price"] for item in items),
+            "notes": "offline replay benchmark",
+        })
+    return orders
+
+
+async def timed_post(client: httpx.AsyncClient, url: str, body):
+    start = time.perf_counter()
+    response = await client.post(url, json=body)
+    response.raise_for_status()
+    match = _QUERIES.search(response.headers.get("server-timing", ""))
+    return response.json(), time.perf_counter() - start, int(match.group(1)) if match else None
+
+
+def report(name: str, orders: int, latencies, queries, elapsed: float):
+    latencies = sorted(latencies)
+    queries = [q for q in queries if q is not None]
+    print(f"{name:<18} {orders:>7} {orders / elapsed:>10.0f} {len(latencies):>9} "
+          f"{percentile(latencies, 0.50) * 1000:>9.1f} {percentile(latencies, 0.99) * 1000:>9.1f} "
+          f"{statistics.mean(queries) if queries else float('nan'):>9.1f}")
+
+
+async def main(base_url: str, count: int, batch_size: int, single: int, seed: int) -> int:
+    rng = random.Random(seed)
+    async with httpx.AsyncClient(base_url=base_url, timeout=300) as client:
+        products = [p for p in (await client.get("/products")).json() if p["stock"] >= 20]
+        if not products:
+            raise SystemExit("No product with enough stock; fill the database with datagen.py first.")
+        orders = queued_orders(rng, products, count)
+        print(f"{count} queued orders over {len(products)} products, {sum(len(o['items']) for o in orders)} lines")
+        print(f"{'replay':<18} {'orders':>7} {'orders/s':>10} {'requests':>9} {'p50 ms':>9} {'p99 ms':>9} {'queries':>9}")
+
+        latencies, queries = [], []
+        started = time.perf_counter()
+        for order in orders[:single]:
+            body = {key: value for key, value in order.items() if key not in ("clientKey", "createdAt")}
+            _, elapsed, statements = await timed_post(client, "/orders/create", body)
+            latencies.append(elapsed)
+            queries.append(statements)
+        if single:
+            report("one by one", single, latencies, queries, time.perf_counter() - started)
+
+        totals = {}
+        for name in ("batch", "batch (retried)"):
+            latencies, queries = [], []
+            counts = {"created": 0, "duplicates": 0, "rejected": 0}
+            started = time.perf_counter()
+            for start in range(0, count, batch_size):
+                body, elapsed, statements = await timed_post(
+                    client, "/orders/batch", {"orders": orders[start:start + batch_size]}
+                )
+                latencies.append(elapsed)
+                queries.append(statements)
+                for key in counts:
+                    counts[key] += body[key]
+            report(name, count, latencies, queries, time.perf_counter() - started)
+            totals[name] = counts
+
+    for name, counts in totals.items():
+        print(f"{name}: {counts}")
+    if totals["batch"]["created"] + totals["batch"]["rejected"] != count:
+        print("FAIL the first replay reported duplicates")
+        return 1
+    if totals["batch (retried)"]["duplicates"] != totals["batch"]["created"]:
+        print("FAIL the retry didn't recognise every created order")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--single", type=int, default=500, help="orders also replayed one request each, for comparison")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.url, args.orders, args.batch_size, args.single, args.seed)))
@@ -0,0 +1,144 @@
+"""
+Order edit cost: full rewrite vs the diff-based edit engine (app/order_edits.py).
+
+Places one order with --items lines, then edits it --edits times with each path:
+
+    rewrite    the previous PUT /orders/{id}: take the order out of the rollups,
+               delete and re-insert every line, restore and re-deduct all stock,
+               re-apply customer totals and rollups
+    diff       PUT /orders/{id} today: only what changed is written
+
+for two kinds of edit: header-only (payment method flips between cash and card)
+and single-item (one line's quantity flips between 1 and 2). Reports p50/p99
+latency and SQL statements per edit. Orders are really written, so use a
+scratch database with products in inventory.
+
+    python benchmarks/bench_order_edits.py --items 10 --edits 200
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import event, select, text
+from sqlalchemy.orm import joinedload, selectinload
+
+from app import rollups
+from app.checkout import checkout
+from app.customer_stats import add_customer_stats, upsert_customer
+from app.database import AsyncSessionLocal, engine
+from app.models import Order, OrderItem
+from app.order_edits import edit_order
+from app.schemas import CreateOrderRequest, UpdateOrderRequest
+from app.stock import adjust_stock, aggregate_quantities, lock_stock
+
+statements = 0
+
+
+def count_statement(*args):
+    global statements
+    statements += 1
+
+
+async def rewrite_edit(db, order, order_data):
+    """The restore/delete/reinsert update_order this engine replaced"""
+    old_customer_id = order.customer_id
+    old_total = order.total_amount or Decimal("0")
+    new_total = Decimal(str(order_data.totalAmount))
+    old_items = list(order.items)
+    old_quantities = aggregate_quantities(old_items, key="product_id")
+    new_quantities = aggregate_quantities(order_data.items)
+
+    await lock_stock(db, set(old_quantities) | set(new_quantities))
+    customer_id = await upsert_customer(db, order_data.customer)
+    if old_customer_id == customer_id:
+        await add_customer_stats(db, customer_id, 0, new_total - old_total)
+    else:
+        await add_customer_stats(db, old_customer_id, -1, -old_total)
+        await add_customer_stats(db, customer_id, 1, new_total)
+    await rollups.apply_order(db, order.id, -1)
+
+    order.customer_id = customer_id
+    order.total_amount = new_total
+    order.payment_method = order_data.paymentMethod
+    order.notes = order_data.notes
+    for item in old_items:
+        await db.delete(item)
+    await db.flush()
+    for item in order_data.items:
+        db.add(OrderItem(order_id=order.id, product_id=item.id, quantity=item.quantity,
+                         unit_price=Decimal(str(item.price)), total_price=Decimal(str(item.price * item.quantity))))
+    if await adjust_stock(db, new_quantities, restore=old_quantities):
+        raise SystemExit("Not enough stock for the benchmark edits.")
+    await rollups.apply_order(db, order.id)
+
+
+def order_body(products, items: int, payment_method: str, first_quantity: int) -> dict:
+    return {
+        "customer": {"fullName": "Edit Bench", "phoneNumber": "0500000001"},
+        "items": [{"id": str(p), "quantity": first_quantity if n == 0 else 1, "price": 10.0}
+                  for n, p in enumerate(products[:items])],
+        "paymentMethod": payment_method,
+        "notes": "order edit benchmark",
+        "totalAmount": 10.0 * (items - 1 + first_quantity),
+    }
+
+
+async def run(path, order_id, products, items: int, edits: int, kind: str):
+    global statements
+    latencies, counts = [], []
+    for i in range(edits):
+        flip = i % 2 == 0
+        body = order_body(
+            products, items,
+            payment_method=("card" if flip else "cash") if kind == "header" else "cash",
+            first_quantity=(2 if flip else 1) if kind == "item" else 1,
+        )
+        start = time.perf_counter()
+        statements = 0
+        async with AsyncSessionLocal() as db:
+            order = (await db.execute(
+                select(Order).options(joinedload(Order.customer), selectinload(Order.items)).where(Order.id == order_id)
+            )).scalars().first()
+            await path(db, order, UpdateOrderRequest.model_validate(body))
+            await db.commit()
+        latencies.append((time.perf_counter() - start) * 1000)
+        counts.append(statements)
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return statistics.median(latencies), p99, statistics.median(counts)
+
+
+async def main(items: int, edits: int):
+    async with engine.connect() as conn:
+        products = (await conn.execute(text(
+            "SELECT product_id FROM inventory WHERE stock_quantity > :need ORDER BY product_id LIMIT :items"
+        ), {"need": edits * 4, "items": items})).scalars().all()
+    if len(products) < items:
+        raise SystemExit(f"Need {items} products with more than {edits * 4} units in stock.")
+
+    async with AsyncSessionLocal() as db:
+        body = CreateOrderRequest.model_validate(order_body(products, items, "cash", 1))
+        order_id = (await checkout(db, body.model_dump_json()))["orderId"]
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count_statement)
+    print(f"One order with {items} lines, {edits} edits per run")
+    print(f"{'edit':<8} {'path':<8} {'p50 ms':>8} {'p99 ms':>8} {'stmts':>6}")
+    for kind in ("header", "item"):
+        for name, path in (("rewrite", rewrite_edit), ("diff", edit_order)):
+            p50, p99, stmts = await run(path, order_id, products, items, edits, kind)
+            print(f"{kind:<8} {name:<8} {p50:>8.2f} {p99:>8.2f} {stmts:>6.0f}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=10, help="lines on the edited order")
+    parser.add_argument("--edits", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.items, args.edits))
@@ -0,0 +1,64 @@
+"""
+Page depth vs latency for the keyset-paginated GET /orders.
+
+Follows X-Next-Cursor from the newest page backwards and reports latency at
+increasing page depths; with (created_at, id) keyset pagination page 10,000
+should cost the same as page 1. Fill a scratch database first, e.g. with
+`python benchmarks/bench_dashboard_rollups.py --seed 1000000`, and apply
+supabase/migrations/004_order_history_indexes.sql.
+
+    python benchmarks/bench_order_history.py --pages 20000 --view summary
+    python benchmarks/bench_order_history.py --pages 500 --view full --status completed
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+WINDOW = 10  # pages measured at each depth
+
+
+async def run(base_url: str, pages: int, params: dict):
+    depths = [d for d in (1, 10, 100, 1000, 10000, 100000) if d <= pages]
+    latencies = []
+    rows = 0
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        cursor = None
+        for _ in range(pages + WINDOW):
+            page_params = {**params, **({"cursor": cursor} if cursor else {})}
+            start = time.perf_counter()
+            response = await client.get("/orders", params=page_params)
+            response.raise_for_status()
+            page = response.json()
+            latencies.append(time.perf_counter() - start)
+            rows += len(page)
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+
+    print(f"Walked {len(latencies)} pages ({rows} orders), params {params}")
+    print(f"{'page':>8} {'p50 ms':>8} {'max ms':>8}")
+    for depth in depths:
+        window = latencies[depth - 1:depth - 1 + WINDOW]
+        if window:
+            print(f"{depth:>8} {statistics.median(window) * 1000:>8.1f} {max(window) * 1000:>8.1f}")
+    print(f"{'all':>8} {statistics.median(latencies) * 1000:>8.1f} {max(latencies) * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--pages", type=int, default=2000, help="how deep to page")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--view", choices=("full", "summary"), default="summary")
+    parser.add_argument("--status")
+    parser.add_argument("--payment-method")
+    args = parser.parse_args()
+    params = {"limit": args.limit, "view": args.view}
+    if args.status:
+        params["status"] = args.status
+    if args.payment_method:
+        params["payment_method"] = args.payment_method
+    asyncio.run(run(args.url, args.pages, params))
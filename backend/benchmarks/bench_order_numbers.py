@@ -0,0 +1,84 @@
+"""
+Concurrency benchmark for order number allocation.
+
+Fires hundreds of parallel POST /orders/create calls at a running backend and
+checks that every successful checkout got a distinct order number.
+
+    uvicorn app.main:app --port 8000
+    python benchmarks/bench_order_numbers.py --requests 500 --concurrency 100
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+
+import httpx
+
+
+async def pick_product(client: httpx.AsyncClient, needed: int) -> dict:
+    """Any available product with enough stock for the whole run"""
+    response = await client.get("/products")
+    response.raise_for_status()
+    for product in response.json():
+        if product["stock"] >= needed:
+            return product
+    raise SystemExit(f"No product with at least {needed} units in stock; restock one first.")
+
+
+async def run(base_url: str, total: int, concurrency: int):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        product = await pick_product(client, total)
+        run_id = int(time.time()) % 100000
+
+        def payload(i: int) -> dict:
+            # One customer per order so only the order number allocation is contended
+            return {
+                "customer": {"fullName": "Benchmark Customer", "phoneNumber": f"9{run_id:05d}{i:04d}"},
+                "items": [{"id": product["id"], "quantity": 1, "price": product["price"]}],
+                "paymentMethod": "cash",
+                "totalAmount": product["price"],
+                "notes": "order number benchmark",
+            }
+
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+        numbers = []
+        failures = []
+
+        async def one(i: int):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/orders/create", json=payload(i))
+                latencies.append(time.perf_counter() - start)
+                if response.status_code == 200:
+                    numbers.append(response.json()["orderNumber"])
+                else:
+                    failures.append(f"{response.status_code}: {response.text[:200]}")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    duplicates = len(numbers) - len(set(numbers))
+    print(f"Requests:      {total} ({concurrency} in flight)")
+    print(f"Succeeded:     {len(numbers)}")
+    print(f"Failed:        {len(failures)}")
+    print(f"Duplicates:    {duplicates}")
+    print(f"Throughput:    {total / elapsed:.1f} orders/s")
+    print(f"Latency p50:   {statistics.median(latencies) * 1000:.1f} ms")
+    print(f"Latency p99:   {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms")
+    for failure in failures[:5]:
+        print(f"  ! {failure}")
+    return 1 if duplicates or failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.url, args.requests, args.concurrency)))
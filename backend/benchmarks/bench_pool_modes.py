@@ -0,0 +1,110 @@
+"""
+Load test for the DB_POOL_MODE settings in app/database.py.
+
+Starts a uvicorn worker per pool mode against DATABASE_URL, then reports p50/p99
+latency and throughput for GET /products and POST /orders/create. Needs at least
+one product with enough stock for every checkout in the run.
+
+    python benchmarks/bench_pool_modes.py --requests 500 --concurrency 20
+    python benchmarks/bench_pool_modes.py --modes pgbouncer direct
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+POOL_MODES = ("pgbouncer", "queue", "direct")
+
+
+def percentile(sorted_values, pct: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, int(round(len(sorted_values) * pct)) - 1))
+    return sorted_values[index]
+
+
+async def load(client: httpx.AsyncClient, method: str, path: str, total: int, concurrency: int, body=None):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.request(method, path, json=body)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return percentile(latencies, 0.50) * 1000, percentile(latencies, 0.99) * 1000, total / elapsed
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise SystemExit("Backend did not come up; check DATABASE_URL.")
+
+
+async def bench_mode(mode: str, port: int, total: int, concurrency: int):
+    env = {**os.environ, "DB_POOL_MODE": mode}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL,
+    )
+    try:
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60, limits=limits) as client:
+            await wait_ready(client)
+            products = (await client.get("/products")).json()
+            product = next((p for p in products if p["stock"] > total), None)
+            if product is None:
+                raise SystemExit(f"Need a product with more than {total} units in stock.")
+            order = {
+                "customer": {"fullName": "Benchmark Customer", "phoneNumber": "0000000003"},
+                "items": [{"id": product["id"], "quantity": 1, "price": product["price"]}],
+                "paymentMethod": "cash",
+                "totalAmount": product["price"],
+                "notes": f"pool benchmark ({mode})",
+            }
+            await client.post("/orders/create", json=order)  # creates the benchmark customer
+
+            results = [
+                ("GET /products", await load(client, "GET", "/products", total, concurrency)),
+                ("POST /orders/create", await load(client, "POST", "/orders/create", total, concurrency, order)),
+            ]
+            pool = (await client.get("/health")).json()["pool"]
+    finally:
+        server.terminate()
+        server.wait()
+
+    for endpoint, (p50, p99, rps) in results:
+        print(f"{mode:<10} {endpoint:<20} {p50:>8.1f} {p99:>8.1f} {rps:>8.1f}")
+    print(f"{'':<10} pool after run: {pool}")
+
+
+async def main(modes, port: int, total: int, concurrency: int):
+    print(f"{'mode':<10} {'endpoint':<20} {'p50 ms':>8} {'p99 ms':>8} {'req/s':>8}")
+    for mode in modes:
+        await bench_mode(mode, port, total, concurrency)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=POOL_MODES, default=list(POOL_MODES))
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--requests", type=int, default=300, help="requests per endpoint and mode")
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.modes, args.port, args.requests, args.concurrency))
@@ -0,0 +1,54 @@
+"""
+Payload size and latency of GET /products (the POS menu load).
+
+Run it before and after `python migrate_product_images.py` to compare base64
+data URIs inline in the payload against short /images/ URLs.
+
+    python benchmarks/bench_products_payload.py --requests 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def run(base_url: str, total: int, concurrency: int, path: str):
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        first = await client.get(path)
+        first.raise_for_status()
+        items = first.json()
+        inline = sum(1 for item in items if str(item.get("image", "")).startswith("data:"))
+
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def one():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(path)
+                await response.aread()
+                latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"Endpoint:        GET {path}")
+    print(f"Products:        {len(items)} ({inline} with inline data URI images)")
+    print(f"Payload:         {len(first.content) / 1024:.1f} KiB")
+    print(f"Latency p50:     {statistics.median(latencies) * 1000:.1f} ms")
+    print(f"Latency p99:     {latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1000:.1f} ms")
+    print(f"Throughput:      {total / elapsed:.1f} req/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--path", default="/products", help="e.g. /orders to measure order history")
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.requests, args.concurrency, args.path))
@@ -0,0 +1,160 @@
+"""
+Serializing a page of orders: per-row Pydantic models vs plain dicts and orjson.
+
+Builds 10k in-memory orders with line items (no database) and turns them into
+the response body both ways, as GET /orders does:
+
+    models   an OrderView per order, then FastAPI's response_model handling
+             (dump, validate against List[OrderView], serialize) and the stdlib
+             json encoder, i.e. the path before app/responses.py
+    fast     _order_row dicts and json_response (orjson, no validation)
+    checked  _order_row dicts and json_response with VALIDATE_RESPONSES=true
+
+and reports CPU time (best of --repeat) and peak memory allocated while
+serializing (tracemalloc). All three must produce the same JSON.
+
+    python benchmarks/bench_serialization.py --orders 10000
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app import responses
+from app.images import image_src
+from app.models import AppUser, Customer, Order, OrderItem, Product
+from app.routers.orders import _order_row
+from app.schemas import OrderItemView, OrderView
+
+BASE_URL = "http://localhost:8000/"
+
+
+def make_orders(count: int, seed: int) -> List[Order]:
+    rng = random.Random(seed)
+    products = [
+        Product(id=uuid.uuid4(), name=f"Product {n}", price=Decimal(rng.randrange(40, 900)), image_url="🎂")
+        for n in range(200)
+    ]
+    customers = [Customer(id=uuid.uuid4(), full_name=f"Customer {n}", phone_number=f"98{n:08d}") for n in range(500)]
+    staff = AppUser(id=uuid.uuid4(), full_name="Counter Staff")
+    now = datetime.now(timezone.utc)
+    orders = []
+    for n in range(count):
+        items = []
+        for product in rng.sample(products, rng.choice([1, 1, 2, 2, 3, 4])):
+            quantity = rng.choice([1, 1, 2, 3])
+            items.append(OrderItem(
+                id=uuid.uuid4(), product_id=product.id, product=product, quantity=quantity,
+                unit_price=product.price, total_price=product.price * quantity,
+            ))
+        orders.append(Order(
+            id=uuid.uuid4(), order_number=f"BB{n + 1:03d}", created_at=now - timedelta(seconds=n * 37),
+            total_amount=sum(i.total_price for i in items), payment_method=rng.choice(["cash", "card", "upi"]),
+            status="completed", customer=rng.choice(customers), staff=staff, items=items,
+        ))
+    return orders
+
+
+def order_view(o: Order, base_url: str) -> OrderView:
+    """The per-row model the router used to build (the old _order_to_view)"""
+    items = [
+        OrderItemView(
+            id=str(i.id),
+            productId=str(i.product_id) if i.product_id else "",
+            name=i.product.name if i.product else "Unknown",
+            quantity=i.quantity,
+            price=float(i.unit_price),
+            image=image_src(i.product.image_url if i.product else None, base_url)
+        )
+        for i in o.items
+    ]
+    return OrderView(
+        id=o.id,
+        order_number=o.order_number or f"#{str(o.id)[:8].upper()}",
+        created_at=o.created_at,
+        total_amount=o.total_amount,
+        payment_method=o.payment_method,
+        status=o.status,
+        customer_name=o.customer.full_name if o.customer else "Unknown",
+        customer_phone=o.customer.phone_number if o.customer else "",
+        staff_name=o.staff.full_name if o.staff else "System",
+        items_summary=", ".join([f"{i.quantity}x {i.product.name if i.product else 'Unknown'}" for i in o.items]),
+        items=items
+    )
+
+
+_FIELD = create_response_field(name="Response_Get_Orders", type_=List[OrderView])
+
+
+def models_path(orders) -> bytes:
+    views = [order_view(o, BASE_URL) for o in orders]
+    content = asyncio.run(serialize_response(field=_FIELD, response_content=views))
+    return JSONResponse(content).body
+
+
+def fast_path(orders) -> bytes:
+    return responses.json_response([_order_row(o, BASE_URL) for o in orders], List[OrderView]).body
+
+
+def checked_path(orders) -> bytes:
+    responses.VALIDATE_RESPONSES = True
+    try:
+        return fast_path(orders)
+    finally:
+        responses.VALIDATE_RESPONSES = False
+
+
+def measure(fn, orders, repeat: int):
+    cpu = []
+    for _ in range(repeat):
+        started = time.process_time()
+        body = fn(orders)
+        cpu.append(time.process_time() - started)
+    tracemalloc.start()
+    fn(orders)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return body, min(cpu), peak
+
+
+def main(count: int, repeat: int, seed: int) -> int:
+    orders = make_orders(count, seed)
+    items = sum(len(o.items) for o in orders)
+    print(f"{count} orders, {items} line items, best of {repeat}")
+    print(f"{'path':<8} {'cpu ms':>9} {'peak MB':>9} {'body KB':>9}")
+    results = {}
+    for name, fn in (("models", models_path), ("fast", fast_path), ("checked", checked_path)):
+        body, cpu, peak = measure(fn, orders, repeat)
+        results[name] = (body, cpu)
+        print(f"{name:<8} {cpu * 1000:>9.1f} {peak / 2**20:>9.1f} {len(body) / 1024:>9.0f}")
+
+    reference = json.loads(results["models"][0])
+    mismatched = [name for name in ("fast", "checked") if json.loads(results[name][0]) != reference]
+    print(f"fast path: {results['models'][1] / results['fast'][1]:.1f}x less CPU")
+    if mismatched:
+        print(f"MISMATCH: {', '.join(mismatched)} differ from the models path")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    sys.exit(main(args.orders, args.repeat, args.seed))
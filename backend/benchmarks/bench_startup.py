@@ -0,0 +1,90 @@
+"""
+Startup cost: how long `import app.main` takes and how long a fresh API process
+takes to answer its first request.
+
+    import     `python -c "import app.main"` in a new interpreter, wall clock
+    first req  spawn `uvicorn app.main:app`, poll GET /health until it answers
+
+Each is measured --runs times in new processes (nothing is cached between
+runs except the OS page cache) and reported as p50 and worst. Startup talks to
+the database, so the server reaches DATABASE_URL through the delay proxy from
+bench_checkout_latency.py, adding --latency-ms per round trip like a hosted
+database would (0 connects directly).
+
+    python benchmarks/bench_startup.py --runs 10 --latency-ms 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND))
+
+from sqlalchemy.engine import make_url
+
+from app.database import DATABASE_URL
+from bench_checkout_latency import DelayProxy, upstream_of
+
+
+def time_import() -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import app.main"], cwd=BACKEND, check=True, capture_output=True)
+    return time.perf_counter() - start
+
+
+def start_proxy(database_url: str, latency_ms: float) -> str:
+    """Run a DelayProxy on a background event loop; returns the database URL that goes through it"""
+    url = make_url(database_url)
+    proxy = DelayProxy(upstream_of(url), latency_ms / 2000)
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    port = asyncio.run_coroutine_threadsafe(proxy.start(), loop).result()
+    proxied = url.set(host="127.0.0.1", port=port, query={k: v for k, v in url.query.items() if k != "host"})
+    return proxied.render_as_string(hide_password=False)
+
+
+def time_first_request(port: int, env: dict, timeout: float = 60) -> float:
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if server.poll() is not None:
+                raise SystemExit(f"uvicorn exited: {server.stderr.read().decode()[-2000:]}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        raise SystemExit(f"No answer from /health within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def report(name: str, samples):
+    print(f"{name:<10} p50 {statistics.median(samples) * 1000:8.0f} ms   max {max(samples) * 1000:8.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8799, help="port for the spawned API servers")
+    parser.add_argument("--latency-ms", type=float, default=20, help="added database round trip time")
+    args = parser.parse_args()
+    env = dict(os.environ)
+    if args.latency_ms:
+        env["DATABASE_URL"] = start_proxy(DATABASE_URL, args.latency_ms)
+    time_import()  # warm the page cache
+    report("import", [time_import() for _ in range(args.runs)])
+    report("first req", [time_first_request(args.port, env) for _ in range(args.runs)])
@@ -0,0 +1,70 @@
+"""
+Checkout latency by order size (1, 10 and 50 line items).
+
+Inventory for an order is locked, checked and deducted as one batch, so latency
+should grow far slower than the number of items. Needs a running backend with
+at least 50 products in stock.
+
+    uvicorn app.main:app --port 8000
+    python benchmarks/bench_stock_batching.py --orders 50 --concurrency 10
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+ORDER_SIZES = (1, 10, 50)
+
+
+async def run(base_url: str, orders: int, concurrency: int, sizes):
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        response = await client.get("/products")
+        response.raise_for_status()
+        needed = orders + 1
+        products = [p for p in response.json() if p["stock"] >= needed]
+        if len(products) < max(sizes):
+            raise SystemExit(f"Need {max(sizes)} products with at least {needed} units in stock, found {len(products)}.")
+
+        print(f"{'items':>6} {'orders':>7} {'p50 ms':>8} {'p99 ms':>8} {'orders/s':>9}")
+        for size in sizes:
+            lines = products[:size]
+            payload = {
+                "customer": {"fullName": "Benchmark Customer", "phoneNumber": "0000000002"},
+                "items": [{"id": p["id"], "quantity": 1, "price": p["price"]} for p in lines],
+                "paymentMethod": "cash",
+                "totalAmount": sum(p["price"] for p in lines),
+                "notes": f"stock batching benchmark ({size} items)",
+            }
+            # Warm-up (also creates the benchmark customer)
+            (await client.post("/orders/create", json=payload)).raise_for_status()
+
+            semaphore = asyncio.Semaphore(concurrency)
+            latencies = []
+
+            async def one():
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.post("/orders/create", json=payload)
+                    response.raise_for_status()
+                    latencies.append(time.perf_counter() - start)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(one() for _ in range(orders)))
+            elapsed = time.perf_counter() - started
+
+            latencies.sort()
+            p50 = statistics.median(latencies) * 1000
+            p99 = latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1000
+            print(f"{size:>6} {orders:>7} {p50:>8.1f} {p99:>8.1f} {orders / elapsed:>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--orders", type=int, default=50, help="orders per order size")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(ORDER_SIZES))
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.orders, args.concurrency, args.sizes))
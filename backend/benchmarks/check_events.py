@@ -0,0 +1,146 @@
+"""
+Live events check: fan-out to many GET /events subscribers on one worker.
+
+Opens --subscribers SSE streams (plus one filtered to order.voided and one
+that stops reading), places and voids --orders orders, and checks every
+subscriber got order.created, stock.changed and order.voided for each, in
+commit order, and the filtered one nothing else. Reports how long after the
+POST the event reached the first and the last subscriber, and the worker's
+event stats. Writes are real, so use a scratch database, and point the
+server at a Postgres that supports LISTEN (not a transaction pooler):
+
+    uvicorn app.main:app --port 8000
+    python benchmarks/check_events.py --subscribers 500 --orders 20   # exit status 1 on a missed event
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+
+from bench_pool_modes import percentile
+
+
+def order_body(product: dict) -> dict:
+    return {
+        "customer": {"fullName": "Events Check", "phoneNumber": "0500000004"},
+        "items": [{"id": product["id"], "quantity": 1, "price": product["price"]}],
+        "paymentMethod": "cash",
+        "totalAmount": product["price"],
+        "notes": "live events check",
+    }
+
+
+class Listener:
+    """One SSE stream, recording (type, data, arrival time) per event"""
+
+    def __init__(self, client: httpx.AsyncClient, types: str = None, read: bool = True):
+        self.client, self.types, self.read = client, types, read
+        self.events = []
+        self.listening = asyncio.Event()
+        self.task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        params = {"types": self.types} if self.types else None
+        async with self.client.stream("GET", "/events", params=params) as response:
+            response.raise_for_status()
+            event_type = None
+            async for line in response.aiter_lines():
+                if line == ": listening":
+                    self.listening.set()
+                    if not self.read:
+                        await asyncio.sleep(3600)  # a client that stopped reading
+                elif line.startswith("event: "):
+                    event_type = line[7:]
+                elif line.startswith("data: "):
+                    self.events.append((event_type, json.loads(line[6:]), time.perf_counter()))
+
+    def arrivals(self, event_type: str, key: str) -> dict:
+        return {data[key]: at for kind, data, at in self.events if kind == event_type and key in data}
+
+
+async def main(base_url: str, subscribers: int, orders: int) -> int:
+    limits = httpx.Limits(max_connections=subscribers + 10, max_keepalive_connections=subscribers + 10)
+    async with httpx.AsyncClient(base_url=base_url, timeout=httpx.Timeout(60, read=None), limits=limits) as client:
+        products = [p for p in (await client.get("/products")).json() if p["stock"] >= orders + 1]
+        if not products:
+            raise SystemExit("No product with enough stock; fill the database with datagen.py first.")
+        product = products[0]
+
+        started = time.perf_counter()
+        listeners = [Listener(client) for _ in range(subscribers)]
+        voids_only = Listener(client, types="order.voided")
+        stalled = Listener(client, read=False)
+        await asyncio.wait_for(asyncio.gather(*(l.listening.wait() for l in listeners + [voids_only, stalled])), 60)
+        print(f"{subscribers + 2} subscribers listening after {time.perf_counter() - started:.2f}s")
+
+        posted = {}
+        for _ in range(orders):
+            sent = time.perf_counter()
+            response = await client.post("/orders/create", json=order_body(product))
+            response.raise_for_status()
+            posted[response.json()["orderId"]] = sent
+        voided = {}
+        for order_id in posted:
+            sent = time.perf_counter()
+            (await client.post(f"/orders/{order_id}/void")).raise_for_status()
+            voided[order_id] = sent
+        await asyncio.sleep(1)
+        stats = (await client.get("/health")).json()["events"]
+        for listener in listeners + [voids_only, stalled]:
+            listener.task.cancel()
+        await asyncio.gather(*(l.task for l in listeners + [voids_only, stalled]), return_exceptions=True)
+
+    failures = 0
+    latencies = defaultdict(lambda: {"first": [], "last": []})
+    for event_type, sent_at in (("order.created", posted), ("order.voided", voided)):
+        for order_id, sent in sent_at.items():
+            if event_type == "order.created":
+                arrivals = [l.arrivals(event_type, "orderId").get(order_id) for l in listeners]
+            else:
+                arrivals = [next((at for kind, data, at in l.events if kind == event_type and order_id in data["orderIds"]), None)
+                            for l in listeners]
+            missed = arrivals.count(None)
+            if missed:
+                failures += 1
+                print(f"FAIL {event_type} {order_id}: missed by {missed} subscribers")
+                continue
+            latencies[event_type]["first"].append(min(arrivals) - sent)
+            latencies[event_type]["last"].append(max(arrivals) - sent)
+
+    expected = [e[0] for e in listeners[0].events]
+    for listener in listeners:
+        kinds = [e[0] for e in listener.events]
+        if kinds != expected:
+            failures += 1
+            print(f"FAIL a subscriber saw {len(kinds)} events in a different order from the first one's {len(expected)}")
+            break
+    stock_events = sum(1 for kind in expected if kind == "stock.changed")
+    if stock_events < 2 * orders:
+        failures += 1
+        print(f"FAIL {stock_events} stock.changed events for {orders} orders and voids")
+    if {e[0] for e in voids_only.events} - {"order.voided", "resync"}:
+        failures += 1
+        print("FAIL the order.voided subscriber got other events")
+
+    print(f"{orders} orders created and voided, {len(expected)} events per subscriber")
+    print(f"{'event':<14} {'first p50 ms':>13} {'last p50 ms':>12} {'last p99 ms':>12}")
+    for event_type, values in latencies.items():
+        first, last = sorted(values["first"]), sorted(values["last"])
+        print(f"{event_type:<14} {percentile(first, 0.50) * 1000:>13.1f} {percentile(last, 0.50) * 1000:>12.1f} "
+              f"{percentile(last, 0.99) * 1000:>12.1f}")
+    print(f"worker: {stats}")
+    print("OK" if not failures else f"{failures} failures")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--subscribers", type=int, default=500)
+    parser.add_argument("--orders", type=int, default=20)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.url, args.subscribers, args.orders)))
@@ -0,0 +1,131 @@
+"""
+Idempotency-Key check: concurrent retries of one checkout place one order.
+
+Fires the same POST /orders/create with the same Idempotency-Key from
+--concurrency coroutines at once, then --keys different keys each sent
+--concurrency / 2 times at once, and checks every answer for a key is the same
+order, the product's stock went down once per key and the customer's visits
+went up once per key. Also checks a later retry is replayed, a reused key with
+another body gets 422, a stock rejection is replayed as the same 400, and
+reports checkout latency with and without a key. Writes are real, so use a
+scratch database; run the server with several workers to exercise retries
+landing on different workers:
+
+    uvicorn app.main:app --port 8000 --workers 4
+    python benchmarks/check_idempotency.py --concurrency 50   # exit status 1 on a double order
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+import uuid
+
+import httpx
+
+from bench_pool_modes import percentile
+
+
+def order_body(product: dict, phone: str, quantity: int = 1) -> dict:
+    return {
+        "customer": {"fullName": "Idempotency Check", "phoneNumber": phone},
+        "items": [{"id": product["id"], "quantity": quantity, "price": product["price"]}],
+        "paymentMethod": "cash",
+        "totalAmount": product["price"] * quantity,
+        "notes": "idempotency check",
+    }
+
+
+async def post(client: httpx.AsyncClient, body: dict, key: str = None) -> httpx.Response:
+    return await client.post("/orders/create", json=body, headers={"Idempotency-Key": key} if key else None)
+
+
+async def stock_of(client: httpx.AsyncClient, product_id: str) -> int:
+    products = (await client.get("/products")).json()
+    return next(p["stock"] for p in products if p["id"] == product_id)
+
+
+async def visits_of(client: httpx.AsyncClient, phone: str) -> int:
+    customers = (await client.get("/customers", params={"q": phone})).json()
+    return next((c["visits"] for c in customers if c["phone"] == phone), 0)
+
+
+async def main(base_url: str, concurrency: int, keys: int, samples: int) -> int:
+    failures = 0
+
+    def check(ok: bool, message: str):
+        nonlocal failures
+        print(f"{'ok  ' if ok else 'FAIL'}  {message}")
+        failures += not ok
+
+    limits = httpx.Limits(max_connections=concurrency * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        products = [p for p in (await client.get("/products")).json() if p["stock"] >= keys + samples + 10]
+        if not products:
+            raise SystemExit("No product with enough stock; fill the database with datagen.py first.")
+        product = products[0]
+        phone = f"05{random.randrange(10**8):08d}"
+        stock, visits = await stock_of(client, product["id"]), await visits_of(client, phone)
+
+        # One key, many simultaneous attempts
+        key = str(uuid.uuid4())
+        responses = await asyncio.gather(*(post(client, order_body(product, phone), key) for _ in range(concurrency)))
+        order_ids = {r.json().get("orderId") for r in responses}
+        fresh = sum(1 for r in responses if r.headers.get("idempotent-replayed") != "true")
+        check(all(r.status_code == 200 for r in responses) and len(order_ids) == 1 and fresh == 1,
+              f"{concurrency} concurrent attempts: {len(order_ids)} order(s), {fresh} placed, "
+              f"statuses {sorted({r.status_code for r in responses})}")
+
+        retry = await post(client, order_body(product, phone), key)
+        check(retry.status_code == 200 and retry.headers.get("idempotent-replayed") == "true"
+              and retry.json()["orderId"] in order_ids, "a later retry is replayed with the same order")
+        reused = await post(client, order_body(product, phone, 2), key)
+        check(reused.status_code == 422, f"the key with another body gets {reused.status_code}")
+
+        # Many keys, each retried concurrently
+        batch_keys = [str(uuid.uuid4()) for _ in range(keys)]
+        attempts = [k for k in batch_keys for _ in range(max(concurrency // 2, 2))]
+        random.shuffle(attempts)
+        responses = await asyncio.gather(*(post(client, order_body(product, phone), k) for k in attempts))
+        per_key = {}
+        for k, r in zip(attempts, responses):
+            per_key.setdefault(k, set()).add((r.status_code, r.json().get("orderId")))
+        check(all(len(answers) == 1 and next(iter(answers))[0] == 200 for answers in per_key.values()),
+              f"{keys} keys x {len(attempts) // keys} attempts: one order per key")
+
+        placed = 1 + keys
+        stock_after, visits_after = await stock_of(client, product["id"]), await visits_of(client, phone)
+        check(stock - stock_after == placed, f"stock went down by {stock - stock_after}, expected {placed}")
+        check(visits_after - visits == placed, f"customer visits went up by {visits_after - visits}, expected {placed}")
+
+        # A stock rejection is stored like any answer
+        key = str(uuid.uuid4())
+        first = await post(client, order_body(product, phone, 10**6), key)
+        again = await post(client, order_body(product, phone, 10**6), key)
+        check(first.status_code == 400 and again.status_code == 400 and again.json() == first.json()
+              and again.headers.get("idempotent-replayed") == "true", "a stock rejection is replayed as the same 400")
+
+        latencies = {"no key": [], "with key": []}
+        for i in range(samples * 2):
+            name = "with key" if i % 2 else "no key"
+            started = time.perf_counter()
+            response = await post(client, order_body(product, phone), str(uuid.uuid4()) if i % 2 else None)
+            response.raise_for_status()
+            latencies[name].append(time.perf_counter() - started)
+
+    print(f"{'checkout':<10} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, values in latencies.items():
+        values.sort()
+        print(f"{name:<10} {percentile(values, 0.50) * 1000:>8.2f} {percentile(values, 0.99) * 1000:>8.2f}")
+    print("OK" if not failures else f"{failures} failures")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--keys", type=int, default=20)
+    parser.add_argument("--samples", type=int, default=100, help="checkouts timed with and without a key")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.url, args.concurrency, args.keys, args.samples)))
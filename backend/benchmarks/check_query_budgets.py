@@ -0,0 +1,97 @@
+"""
+Query budget check: each endpoint must stay within a fixed number of SQL statements.
+
+Calls every main read endpoint and the order/product write paths on a running
+server, reads the statement count from the Server-Timing header that
+app/query_stats.py adds, and fails if an endpoint uses more statements than its
+budget below. A budget that grows with the page size (an N+1) fails straight
+away. Writes are real, so use a scratch database: it creates a product and an
+order, edits and voids the order, and deletes the product. The test suite
+holds the same budgets in-process (tests/test_query_budgets.py); this script
+checks a deployed server.
+
+    uvicorn app.main:app --port 8000
+    python benchmarks/check_query_budgets.py            # exit status 1 if over budget
+"""
+import argparse
+import asyncio
+import re
+import sys
+import time
+
+import httpx
+
+from bench_order_numbers import pick_product
+
+_QUERIES = re.compile(r'db;dur=([\d.]+);desc="(\d+) quer')
+
+
+def order_body(product: dict, quantity: int) -> dict:
+    return {
+        "customer": {"fullName": "Budget Check", "phoneNumber": "0500000002"},
+        "items": [{"id": product["id"], "quantity": quantity, "price": product["price"]}],
+        "paymentMethod": "cash",
+        "totalAmount": product["price"] * quantity,
+        "notes": "query budget check",
+    }
+
+
+async def run(base_url: str) -> int:
+    failures = 0
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        async def check(name: str, budget: int, method: str, url: str, **kwargs) -> httpx.Response:
+            nonlocal failures
+            response = await client.request(method, url, **kwargs)
+            if response.status_code >= 400:  # a 304 is fine
+                response.raise_for_status()
+            match = _QUERIES.search(response.headers.get("server-timing", ""))
+            if not match:
+                raise SystemExit(f"{name}: no Server-Timing header; is this server running app/query_stats.py?")
+            db_ms, queries = float(match.group(1)), int(match.group(2))
+            over = queries > budget
+            failures += over
+            print(f"{'FAIL' if over else 'ok':<5} {name:<36} {queries:>3} / {budget:<3} queries {db_ms:>8.1f} ms in DB")
+            return response
+
+        product = await pick_product(client, 10)
+        listing = await check("GET /products", 2, "GET", "/products")
+        await check("GET /products (304)", 1, "GET", "/products", headers={"If-None-Match": listing.headers["etag"]})
+        snapshot = await check("GET /sync/catalog", 2, "GET", "/sync/catalog")
+        await check("GET /products/{id}", 1, "GET", f"/products/{product['id']}")
+        created = (await check("POST /products", 4, "POST", "/products", data={
+            "name": f"Budget check {int(time.time())}", "price": "10", "category": "Budget Check", "stock": "5",
+        })).json()
+        await check("PUT /products/{id}", 3, "PUT", f"/products/{created['id']}", data={"price": "12"})
+        await check("DELETE /products/{id}", 3, "DELETE", f"/products/{created['id']}")
+
+        await check("GET /orders (50, full)", 2, "GET", "/orders", params={"limit": 50})
+        await check("GET /orders (50, summary)", 1, "GET", "/orders", params={"limit": 50, "view": "summary"})
+        order = (await check("POST /orders/create", 1, "POST", "/orders/create", json=order_body(product, 1))).json()
+        await check("GET /sync/catalog?since=", 2, "GET", "/sync/catalog", params={"since": snapshot.json()["cursor"]})
+        await check("GET /orders/{id}", 2, "GET", f"/orders/{order['orderId']}")
+        await check("PUT /orders/{id}", 11, "PUT", f"/orders/{order['orderId']}", json=order_body(product, 2))
+        await check("POST /orders/{id}/void", 10, "POST", f"/orders/{order['orderId']}/void")
+
+        await check("GET /customers", 1, "GET", "/customers", params={"limit": 50})
+        await check("GET /customers?q=", 1, "GET", "/customers", params={"q": "0500", "limit": 50})
+        listing = await check("GET /inventory", 2, "GET", "/inventory")
+        await check("GET /inventory (304)", 1, "GET", "/inventory", headers={"If-None-Match": listing.headers["etag"]})
+        await check("GET /inventory/low-stock", 1, "GET", "/inventory/low-stock")
+        await check("GET /inventory/stats", 1, "GET", "/inventory/stats")
+        await check("GET /expenses", 1, "GET", "/expenses")
+        await check("GET /expenses/stats", 1, "GET", "/expenses/stats")
+        await check("GET /bulk-orders", 1, "GET", "/bulk-orders")
+        await check("GET /offers", 1, "GET", "/offers")
+        await check("GET /staff", 1, "GET", "/staff")
+        await check("GET /analytics/dashboard-stats", 1, "GET", "/analytics/dashboard-stats")
+
+    print(f"\n{failures} endpoint{'' if failures == 1 else 's'} over budget" if failures else "\nAll endpoints within budget")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.url)))
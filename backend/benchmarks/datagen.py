@@ -0,0 +1,244 @@
+"""
+Synthetic bakery data at scale, bulk-loaded with COPY.
+
+Fills a scratch database with products (with inventory), customers, and orders
+with line items, drawn from a seeded RNG so the same arguments always produce
+the same data:
+
+    products   6 categories, prices per category, popularity following a Zipf
+               curve (a few bestsellers, a long tail)
+    customers  distinct 10-digit phones, name pairs from common first/last names;
+               a Zipf curve picks repeat visitors, so there are regulars
+    orders     spread over --days, busier on weekends and towards today, around
+               the lunch and evening peaks; 35% walk-ins without a customer,
+               1-8 lines (mostly 1-3), cash/card/upi, 2% voided and 1% refunded
+
+Orders and items are streamed to COPY in batches, so memory stays flat. Customer
+totals and the dashboard rollups are rebuilt afterwards and the tables
+ANALYZEd. Products and customers that already exist (same seed, or a phone
+or SKU taken by earlier data) are kept as they are. Orders are new on every
+run, so a second run with the same --seed stops instead of loading duplicates.
+
+    python benchmarks/datagen.py --products 200 --customers 50000 --orders 500000 --seed 1
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+import uuid
+from bisect import bisect
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from itertools import accumulate
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import text
+
+from app import rollups
+from app.catalog import bump_catalog_version
+from app.customer_stats import rebuild_customer_stats
+from app.database import AsyncSessionLocal, engine
+from app.models import ORDER_COMPLETED, ORDER_REFUNDED, ORDER_VOIDED
+
+CATEGORIES = {
+    # category: (item names, price range)
+    "Cakes": (["Truffle Cake", "Black Forest", "Red Velvet Cake", "Cheesecake", "Pineapple Cake", "Tres Leches"], (450, 1800)),
+    "Cupcakes": (["Cupcake", "Muffin", "Brownie Cup", "Lava Cup"], (60, 160)),
+    "Breads": (["Sourdough", "Multigrain Loaf", "Brioche", "Focaccia", "Baguette", "Milk Bread"], (80, 260)),
+    "Pastries": (["Croissant", "Danish", "Eclair", "Puff", "Tart", "Pain au Chocolat"], (70, 220)),
+    "Cookies": (["Cookies (6)", "Biscotti", "Macarons (6)", "Shortbread", "Nankhatai"], (90, 450)),
+    "Beverages": (["Cold Coffee", "Cappuccino", "Hot Chocolate", "Iced Tea", "Lemonade"], (60, 220)),
+}
+FLAVOURS = ["Chocolate", "Vanilla", "Butterscotch", "Strawberry", "Almond", "Blueberry", "Coffee", "Hazelnut",
+            "Mango", "Lemon", "Caramel", "Pistachio", "Classic", "Honey", "Walnut", "Cinnamon"]
+FIRST_NAMES = ["Aarav", "Aditi", "Ananya", "Arjun", "Diya", "Ishaan", "Kavya", "Meera", "Neha", "Nikhil", "Priya",
+               "Rahul", "Riya", "Rohan", "Sana", "Sneha", "Tanvi", "Varun", "Vikram", "Zoya", "Amit", "Pooja",
+               "Karan", "Shreya", "Farhan", "Leela", "Joseph", "Maria", "David", "Sarah"]
+LAST_NAMES = ["Sharma", "Verma", "Iyer", "Nair", "Reddy", "Patel", "Shah", "Mehta", "Gupta", "Singh", "Khan",
+              "Das", "Menon", "Rao", "Kapoor", "Joshi", "Pillai", "Fernandes", "D'Souza", "Bose", "Chopra", "Malhotra"]
+PAYMENT_METHODS, PAYMENT_WEIGHTS = ["cash", "card", "upi"], [40, 25, 35]
+# Share of orders per hour of the day (shop open 8:00-21:00, lunch and evening peaks)
+HOUR_WEIGHTS = {8: 4, 9: 6, 10: 7, 11: 10, 12: 12, 13: 11, 14: 7, 15: 6, 16: 8, 17: 11, 18: 12, 19: 10, 20: 6}
+LINE_WEIGHTS = [45, 28, 14, 6, 3, 2, 1, 1]  # 1..8 lines per order
+QUANTITY_WEIGHTS = [70, 20, 5, 3, 1, 1]  # 1..6 units per line
+WALK_IN_SHARE = 0.35
+VOIDED_SHARE, REFUNDED_SHARE = 0.02, 0.01
+NOTE = "datagen"
+
+
+class Weighted:
+    """rng-driven choice from a fixed population with precomputed cumulative weights"""
+
+    def __init__(self, population, weights):
+        self.population = list(population)
+        self.cumulative = list(accumulate(weights))
+        self.total = self.cumulative[-1]
+
+    def pick(self, rng: random.Random):
+        return self.population[bisect(self.cumulative, rng.random() * self.total)]
+
+
+def zipf_weights(n: int, s: float):
+    return [1 / (rank ** s) for rank in range(1, n + 1)]
+
+
+def make_uuid(rng: random.Random) -> uuid.UUID:
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def make_products(rng: random.Random, count: int, seed: int):
+    names = sorted(CATEGORIES)
+    rows = []
+    for n in range(count):
+        category = names[n % len(names)]
+        items, (low, high) = CATEGORIES[category]
+        name = f"{rng.choice(FLAVOURS)} {rng.choice(items)}"
+        # Prices cluster at the low end of each category's range
+        price = Decimal(str(round(low + (high - low) * rng.random() ** 2, -1))).quantize(Decimal("0.01"))
+        rows.append((make_uuid(rng), name, f"GEN-{seed}-{n + 1:05d}", price, category, True, NOTE))
+    return rows
+
+
+def make_customers(rng: random.Random, count: int, days: int, now: datetime):
+    phones = rng.sample(range(6_000_000_000, 10_000_000_000), count)
+    rows = []
+    for phone in phones:
+        created = now - timedelta(days=days + 30) * rng.random()
+        rows.append((make_uuid(rng), f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", str(phone), created, created, NOTE))
+    return rows
+
+
+async def insert_missing(table: str, columns, rows) -> int:
+    """COPY into a temporary table, then insert the rows whose id and unique keys aren't taken yet"""
+    column_list = ", ".join(columns)
+    async with engine.begin() as conn:
+        await conn.execute(text(f"CREATE TEMP TABLE staging (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP"))
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table("staging", records=rows, columns=columns)
+        result = await conn.execute(text(
+            f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM staging ON CONFLICT DO NOTHING"
+        ))
+        return result.rowcount
+
+
+async def existing_ids(table: str, ids):
+    async with engine.connect() as conn:
+        result = await conn.execute(text(f"SELECT id FROM {table} WHERE id = ANY(:ids)"), {"ids": list(ids)})
+        return {row[0] for row in result}
+
+
+def order_batches(rng, count: int, batch: int, days: int, now: datetime, products, customers):
+    """Yields (orders, items) row lists of up to `batch` orders"""
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    # Busier on weekends and a steady 50% growth towards today
+    day_offsets = list(range(days))
+    day_weights = [
+        (1.4 if (today - timedelta(days=d)).weekday() >= 5 else 1.0) * (1.5 - 0.5 * d / max(days - 1, 1))
+        for d in day_offsets
+    ]
+    pick_day = Weighted(day_offsets, day_weights)
+    pick_hour = Weighted(HOUR_WEIGHTS.keys(), HOUR_WEIGHTS.values())
+    pick_lines = Weighted(range(1, len(LINE_WEIGHTS) + 1), LINE_WEIGHTS)
+    pick_quantity = Weighted(range(1, len(QUANTITY_WEIGHTS) + 1), QUANTITY_WEIGHTS)
+    pick_payment = Weighted(PAYMENT_METHODS, PAYMENT_WEIGHTS)
+    pick_product = Weighted(products, zipf_weights(len(products), 1.1))
+    pick_customer = Weighted(customers, zipf_weights(len(customers), 0.5)) if customers else None
+
+    orders, items = [], []
+    for _ in range(count):
+        order_id = make_uuid(rng)
+        created = (today - timedelta(days=pick_day.pick(rng))
+                   + timedelta(hours=pick_hour.pick(rng), seconds=rng.randrange(3600)))
+        total = Decimal("0")
+        for product_id, price in {pick_product.pick(rng) for _ in range(pick_lines.pick(rng))}:
+            quantity = pick_quantity.pick(rng)
+            line_total = price * quantity
+            total += line_total
+            items.append((make_uuid(rng), order_id, product_id, quantity, price, line_total))
+        customer_id = None if pick_customer is None or rng.random() < WALK_IN_SHARE else pick_customer.pick(rng)
+        roll = rng.random()
+        status = ORDER_VOIDED if roll < VOIDED_SHARE else ORDER_REFUNDED if roll < VOIDED_SHARE + REFUNDED_SHARE else ORDER_COMPLETED
+        orders.append((order_id, created, customer_id, total, pick_payment.pick(rng), status, NOTE))
+        if len(orders) == batch:
+            yield orders, items
+            orders, items = [], []
+    if orders:
+        yield orders, items
+
+
+async def generate(products: int, customers: int, orders: int, days: int, seed: int, batch: int):
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    started = time.perf_counter()
+
+    product_rows = make_products(rng, products, seed)
+    added = await insert_missing(
+        "products", ["id", "name", "sku", "price", "category", "is_available", "description"], product_rows,
+    )
+    present = await existing_ids("products", [row[0] for row in product_rows])
+    catalog = [(row[0], row[3]) for row in product_rows if row[0] in present]
+    await insert_missing(
+        "inventory", ["id", "product_id", "stock_quantity", "low_stock_threshold"],
+        [(make_uuid(rng), product_id, 1_000_000, 5) for product_id, _ in catalog],
+    )
+    print(f"Products:  {added} added, {len(catalog)} usable")
+
+    customer_rows = make_customers(rng, customers, days, now)
+    added = await insert_missing(
+        "customers", ["id", "full_name", "phone_number", "created_at", "updated_at", "notes"], customer_rows,
+    )
+    present = await existing_ids("customers", [row[0] for row in customer_rows])
+    regulars = [row[0] for row in customer_rows if row[0] in present]
+    print(f"Customers: {added} added, {len(regulars)} usable")
+
+    done = 0
+    for order_rows, item_rows in order_batches(rng, orders, batch, days, now, catalog, regulars):
+        if done == 0 and await existing_ids("orders", [order_rows[0][0]]):
+            raise SystemExit(f"Orders for --seed {seed} are already loaded; use another seed to add more.")
+        async with engine.begin() as conn:
+            raw = (await conn.get_raw_connection()).driver_connection
+            await raw.copy_records_to_table(
+                "orders", records=order_rows,
+                columns=["id", "created_at", "customer_id", "total_amount", "payment_method", "status", "notes"],
+            )
+            await raw.copy_records_to_table(
+                "order_items", records=item_rows,
+                columns=["id", "order_id", "product_id", "quantity", "unit_price", "total_price"],
+            )
+        done += len(order_rows)
+        print(f"  {done}/{orders} orders ({time.perf_counter() - started:.0f}s)")
+
+    print("Rebuilding customer totals and dashboard rollups...")
+    async with engine.begin() as conn:
+        # A customer's updated_at is shown as their last visit
+        await conn.execute(text("""
+            UPDATE customers c SET updated_at = v.last_visit
+            FROM (SELECT customer_id, max(created_at) AS last_visit FROM orders
+                  WHERE notes = :note AND customer_id IS NOT NULL GROUP BY customer_id) v
+            WHERE c.id = v.customer_id AND c.updated_at < v.last_visit
+        """), {"note": NOTE})
+    async with AsyncSessionLocal() as db:
+        await rebuild_customer_stats(db)
+        await rollups.rebuild_rollups(db)
+        await bump_catalog_version(db, [product_id for product_id, _ in catalog])
+        await db.commit()
+    async with engine.begin() as conn:
+        for table in ("products", "inventory", "customers", "orders", "order_items", "sales_hourly", "product_sales_daily"):
+            await conn.execute(text(f"ANALYZE {table}"))
+    await engine.dispose()
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--customers", type=int, default=50_000)
+    parser.add_argument("--orders", type=int, default=500_000)
+    parser.add_argument("--days", type=int, default=365, help="spread orders over this many days up to today")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--batch", type=int, default=50_000, help="orders per COPY transaction")
+    args = parser.parse_args()
+    asyncio.run(generate(args.products, args.customers, args.orders, args.days, args.seed, args.batch))
@@ -0,0 +1,254 @@
+"""
+Benchmark suite: scripted workloads against the real endpoints, results as JSON.
+
+Runs the app in-process (httpx over ASGI, no network or uvicorn in the way)
+against DATABASE_URL, which should be a local scratch Postgres filled by
+datagen.py. Workloads:
+
+    pos_menu         GET /products, the POS menu load
+    checkout         POST /orders/create with 1-4 random in-stock lines, known and new customers
+    dashboard_poll   GET /analytics/dashboard-stats, /inventory/stats and /expenses/stats, as tablets poll
+    order_history    GET /orders, first page and two cursor pages
+    customer_search  GET /customers?mode=typeahead on phone prefixes and names
+    export           GET /analytics/export, CSV with line items for the last 7 days
+
+Each reports p50/p95/p99 latency, throughput and SQL statements and DB time per
+request (from the Server-Timing header, app/query_stats.py; streamed responses
+such as the export and cached stats show 0, as their header goes out before any
+query runs or none runs at all). The JSON includes
+the git commit, so results from two commits can be compared:
+
+    python benchmarks/datagen.py --orders 500000
+    python benchmarks/suite.py --output before.json
+    git checkout <other commit>
+    python benchmarks/suite.py --output after.json --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND))
+
+import httpx
+from sqlalchemy import text
+
+from app.database import POOL_MODE, engine
+from app.main import app
+
+_SERVER_TIMING = re.compile(r'db;dur=([\d.]+);desc="(\d+) quer')
+
+# name: (requests, concurrency) defaults; --scale multiplies the request counts
+WORKLOADS = {
+    "pos_menu": (300, 10),
+    "checkout": (300, 10),
+    "dashboard_poll": (300, 10),
+    "order_history": (200, 5),
+    "customer_search": (500, 10),
+    "export": (10, 2),
+}
+
+
+def percentile(sorted_values, pct: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, int(round(len(sorted_values) * pct)) - 1))
+    return sorted_values[index]
+
+
+class Fixtures:
+    """What the workloads draw from: in-stock products and known customers"""
+
+    def __init__(self, products, customers, rng: random.Random):
+        self.products = products
+        self.customers = customers
+        self.rng = rng
+        self.new_customers = 0
+
+
+async def load_fixtures(client: httpx.AsyncClient, rng: random.Random) -> Fixtures:
+    products = [p for p in (await client.get("/products")).json() if p["stock"] >= 1000]
+    customers = (await client.get("/customers", params={"limit": 200})).json()
+    if not products:
+        raise SystemExit("No product with 1000+ units in stock; fill the database with datagen.py first.")
+    return Fixtures(products, customers, rng)
+
+
+# Each workload step takes the client and fixtures and returns the responses it got
+
+async def pos_menu(client, fx):
+    return [await client.get("/products")]
+
+
+async def checkout(client, fx):
+    lines = fx.rng.sample(fx.products, k=min(len(fx.products), fx.rng.choice([1, 1, 2, 2, 3, 4])))
+    items = [{"id": p["id"], "quantity": fx.rng.choice([1, 1, 1, 2]), "price": p["price"]} for p in lines]
+    if fx.customers and fx.rng.random() < 0.7:
+        known = fx.rng.choice(fx.customers)
+        customer = {"fullName": known["name"], "phoneNumber": known["phone"]}
+    else:
+        fx.new_customers += 1
+        customer = {"fullName": "Suite Walk-in", "phoneNumber": f"5{fx.rng.randrange(10**9):09d}"}
+    return [await client.post("/orders/create", json={
+        "customer": customer,
+        "items": items,
+        "paymentMethod": fx.rng.choice(["cash", "card", "upi"]),
+        "totalAmount": round(sum(i["price"] * i["quantity"] for i in items), 2),
+        "notes": "benchmark suite",
+    })]
+
+
+async def dashboard_poll(client, fx):
+    return [
+        await client.get("/analytics/dashboard-stats", params={"period": fx.rng.choice(["today", "week", "month"])}),
+        await client.get("/inventory/stats"),
+        await client.get("/expenses/stats"),
+    ]
+
+
+async def order_history(client, fx):
+    responses = [await client.get("/orders", params={"limit": 50})]
+    for _ in range(2):
+        cursor = responses[-1].headers.get("x-next-cursor")
+        if not cursor:
+            break
+        responses.append(await client.get("/orders", params={"limit": 50, "cursor": cursor}))
+    return responses
+
+
+async def customer_search(client, fx):
+    known = fx.rng.choice(fx.customers) if fx.customers else {"phone": "98", "name": "a"}
+    if fx.rng.random() < 0.6:
+        q = known["phone"][:fx.rng.randint(3, 6)]
+    else:
+        q = known["name"].split()[0][:fx.rng.randint(2, 5)]
+    return [await client.get("/customers", params={"q": q, "mode": "typeahead"})]
+
+
+async def export(client, fx):
+    end = datetime.now(timezone.utc).date()
+    return [await client.get("/analytics/export", params={
+        "start": str(end - timedelta(days=6)), "end": str(end), "format": "csv",
+    })]
+
+
+STEPS = {
+    "pos_menu": pos_menu,
+    "checkout": checkout,
+    "dashboard_poll": dashboard_poll,
+    "order_history": order_history,
+    "customer_search": customer_search,
+    "export": export,
+}
+
+
+async def run_workload(client, fx, name: str, total: int, concurrency: int) -> dict:
+    step = STEPS[name]
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, statements, db_ms = [], [], []
+    errors = 0
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            responses = await step(client, fx)
+            latencies.append(time.perf_counter() - start)
+            count = db = 0.0
+            for response in responses:
+                if response.status_code >= 400:
+                    errors += 1
+                match = _SERVER_TIMING.search(response.headers.get("server-timing", ""))
+                if match:
+                    db += float(match.group(1))
+                    count += int(match.group(2))
+            statements.append(count)
+            db_ms.append(db)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "throughput_rps": round(total / elapsed, 1),
+        "statements_per_request": round(statistics.mean(statements), 2),
+        "db_ms_per_request": round(statistics.mean(db_ms), 2),
+    }
+
+
+def git_commit() -> dict:
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=BACKEND, capture_output=True, text=True).stdout.strip()
+    return {"commit": git("rev-parse", "--short", "HEAD"), "dirty": bool(git("status", "--porcelain", "--", "app"))}
+
+
+async def database_size() -> dict:
+    """Approximate row counts (planner statistics, so instant on big tables)"""
+    async with engine.connect() as conn:
+        return {
+            table: (await conn.execute(text(f"SELECT reltuples::bigint FROM pg_class WHERE relname = '{table}'"))).scalar()
+            for table in ("products", "customers", "orders", "order_items")
+        }
+
+
+def print_table(result: dict, baseline: dict = None):
+    header = f"{'workload':<16} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8} {'stmts':>6} {'db ms':>7} {'errors':>6}"
+    print(header)
+    for name, r in result["workloads"].items():
+        print(f"{name:<16} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['throughput_rps']:>8.1f} "
+              f"{r['statements_per_request']:>6.2f} {r['db_ms_per_request']:>7.2f} {r['errors']:>6}")
+        old = (baseline or {}).get("workloads", {}).get(name)
+        if old:
+            def delta(key):
+                return f"{(r[key] / old[key] - 1) * 100:+.0f}%" if old[key] else "n/a"
+            print(f"{'  vs ' + baseline['git']['commit']:<16} {delta('p50_ms'):>9} {delta('p95_ms'):>9} {delta('p99_ms'):>9} "
+                  f"{delta('throughput_rps'):>8} {r['statements_per_request'] - old['statements_per_request']:>+6.2f}")
+
+
+async def main(args) -> int:
+    rng = random.Random(args.seed)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://suite", timeout=300) as client:
+        fx = await load_fixtures(client, rng)
+        result = {
+            "git": git_commit(),
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "config": {"seed": args.seed, "scale": args.scale, "pool_mode": POOL_MODE},
+            "database": await database_size(),
+            "workloads": {},
+        }
+        for name in args.workloads:
+            total, concurrency = WORKLOADS[name]
+            total = max(1, int(total * args.scale))
+            await run_workload(client, fx, name, max(1, total // 10), concurrency)  # warm up
+            result["workloads"][name] = await run_workload(client, fx, name, total, concurrency)
+            print(f"  {name} done", file=sys.stderr)
+
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+    print_table(result, baseline)
+    if args.output:
+        Path(args.output).write_text(json.dumps(result, indent=2) + "\n")
+        print(f"\nWrote {args.output}")
+    return 1 if any(r["errors"] for r in result["workloads"].values()) else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workloads", nargs="+", choices=list(WORKLOADS), default=list(WORKLOADS))
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every workload's request count")
+    parser.add_argument("--seed", type=int, default=1, help="seed for the workloads' random choices")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--compare", help="JSON from an earlier run to show deltas against")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,58 @@
+"""
+Apply the database migrations in supabase/migrations (see app/migrations.py).
+Run it once per deploy, before the new API processes start (the Procfile
+release phase does this); the API itself never changes the schema.
+
+    python migrate.py                # apply everything pending
+    python migrate.py --to 5         # stop after 005_*.sql
+    python migrate.py --status       # list applied / pending files
+    python migrate.py --baseline 7   # existing database already at 007: record 001-007 without running them
+
+A database with the tables but no schema_migrations (set up by hand from
+001_init_schema.sql) is baselined at 001 automatically on the first run.
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.database import engine
+from app import migrations
+
+
+async def main(args) -> int:
+    try:
+        if args.status:
+            for migration, state in await migrations.status(engine):
+                print(f"{state:<8} {migration.path.name}")
+            return 0
+        if args.baseline is not None:
+            marked = await migrations.baseline(engine, args.baseline)
+            for migration in marked:
+                print(f"✓ Marked {migration.path.name} as applied")
+            print(f"Baselined at version {args.baseline} ({len(marked)} recorded)")
+            return 0
+        applied = await migrations.migrate(engine, args.to)
+        async with engine.connect() as conn:
+            version = await migrations.schema_version(conn)
+        print(f"✓ {len(applied)} migration(s) applied, schema at version {version}")
+        return 0
+    except Exception as e:
+        print(f"Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--status", action="store_true", help="show which migrations are applied")
+    group.add_argument("--baseline", type=int, metavar="VERSION", help="mark migrations up to VERSION as applied")
+    group.add_argument("--to", type=int, metavar="VERSION", help="apply migrations up to VERSION only")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,70 @@
+"""
+Script to move product images stored as base64 data URIs in products.image_url
+into the image store (app/images.py). Each image is written once per content
+hash and the product keeps only the short /images/<hash>.<ext> path.
+Safe to run more than once.
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.catalog import bump_catalog_version
+from app.database import AsyncSessionLocal
+from app.images import decode_data_uri, save_image
+from app.models import Product
+from sqlalchemy import select, update
+
+BATCH_SIZE = 20  # data URIs can be several MB each
+
+async def migrate_product_images():
+    """Extract data URI images into the image store"""
+    async with AsyncSessionLocal() as db:
+        try:
+            migrated = skipped = saved_bytes = 0
+            last_id = None
+            while True:
+                stmt = (
+                    select(Product.id, Product.image_url)
+                    .where(Product.image_url.like("data:%"))
+                    .order_by(Product.id)
+                    .limit(BATCH_SIZE)
+                )
+                if last_id is not None:
+                    stmt = stmt.where(Product.id > last_id)
+                rows = (await db.execute(stmt)).all()
+                if not rows:
+                    break
+
+                for product_id, image_url in rows:
+                    decoded = decode_data_uri(image_url)
+                    if not decoded:
+                        print(f"  - Product {product_id}: unsupported data URI, left as is")
+                        skipped += 1
+                        continue
+                    path = await save_image(*decoded)
+                    await db.execute(update(Product).where(Product.id == product_id).values(image_url=path))
+                    saved_bytes += len(image_url) - len(path)
+                    migrated += 1
+                    print(f"  - Product {product_id} → {path}")
+
+                # Image URLs changed; POS terminals pick them up on their next sync
+                await bump_catalog_version(db, [product_id for product_id, _ in rows])
+                await db.commit()
+                last_id = rows[-1][0]
+
+            print(f"\n✓ Migrated {migrated} product images ({saved_bytes / 1024 / 1024:.1f} MB removed from the products table)")
+            if skipped:
+                print(f"  {skipped} images could not be migrated")
+        except Exception as e:
+            await db.rollback()
+            print(f"Error: {e}")
+            import traceback
+            traceback.print_exc()
+            sys.exit(1)
+
+if __name__ == "__main__":
+    print("Migrating product images to the image store...")
+    asyncio.run(migrate_product_images())
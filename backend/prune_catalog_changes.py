@@ -0,0 +1,39 @@
+"""
+Script to compact the catalog change log behind GET /sync/catalog
+(catalog_changes, see app/catalog.py). Live products keep one row each; this
+drops the rows of products deleted more than --days ago, and terminals that
+haven't synced since then get a full snapshot on their next sync.
+Run it daily, e.g. from cron or a scheduled job.
+"""
+import argparse
+import asyncio
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.catalog import prune_catalog_changes
+from app.database import AsyncSessionLocal
+
+async def main(days: int):
+    """Prune in one transaction"""
+    async with AsyncSessionLocal() as db:
+        try:
+            pruned = await prune_catalog_changes(db, datetime.now(timezone.utc) - timedelta(days=days))
+            await db.commit()
+            print(f"✓ Pruned {pruned} deleted products from the catalog change log")
+        except Exception as e:
+            await db.rollback()
+            print(f"Error: {e}")
+            import traceback
+            traceback.print_exc()
+            sys.exit(1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=30, help="keep deletions this recent")
+    args = parser.parse_args()
+    print("Pruning the catalog change log...")
+    asyncio.run(main(args.days))
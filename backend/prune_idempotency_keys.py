@@ -0,0 +1,32 @@
+"""
+Script to delete expired Idempotency-Key records (idempotency_keys, see
+app/idempotency.py). An expired key is already ignored by checkout; this only
+keeps the table small. Run it daily, e.g. from cron or a scheduled job.
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.database import AsyncSessionLocal
+from app.idempotency import prune_idempotency_keys
+
+async def main():
+    """Prune in one transaction"""
+    async with AsyncSessionLocal() as db:
+        try:
+            pruned = await prune_idempotency_keys(db)
+            await db.commit()
+            print(f"✓ Deleted {pruned} expired idempotency keys")
+        except Exception as e:
+            await db.rollback()
+            print(f"Error: {e}")
+            import traceback
+            traceback.print_exc()
+            sys.exit(1)
+
+if __name__ == "__main__":
+    print("Pruning expired idempotency keys...")
+    asyncio.run(main())
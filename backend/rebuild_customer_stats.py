@@ -0,0 +1,33 @@
+"""
+Script to recompute every customer's total_orders and total_spent from the
+orders table in one set-based UPDATE.
+Use after bulk imports, manual edits that bypassed the API, or to reconcile
+totals written before they were maintained atomically.
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.customer_stats import rebuild_customer_stats
+from app.database import AsyncSessionLocal
+
+async def main():
+    """Reconcile customer totals in one transaction"""
+    async with AsyncSessionLocal() as db:
+        try:
+            fixed = await rebuild_customer_stats(db)
+            await db.commit()
+            print(f"✓ Reconciled customer totals: {fixed} customers corrected")
+        except Exception as e:
+            await db.rollback()
+            print(f"Error: {e}")
+            import traceback
+            traceback.print_exc()
+            sys.exit(1)
+
+if __name__ == "__main__":
+    print("Recomputing customer totals from orders...")
+    asyncio.run(main())
@@ -0,0 +1,36 @@
+"""
+Script to regenerate the dashboard rollup tables (sales_hourly and
+product_sales_daily) from the raw orders and order_items tables.
+Use after bulk imports or manual edits that bypassed the API.
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.database import AsyncSessionLocal
+from app.models import ProductSalesDaily, SalesHourly
+from app.rollups import rebuild_rollups
+from sqlalchemy import func, select
+
+async def main():
+    """Rebuild rollups in one transaction"""
+    async with AsyncSessionLocal() as db:
+        try:
+            await rebuild_rollups(db)
+            await db.commit()
+            hours = (await db.execute(select(func.count()).select_from(SalesHourly))).scalar()
+            product_days = (await db.execute(select(func.count()).select_from(ProductSalesDaily))).scalar()
+            print(f"✓ Rebuilt rollups: {hours} hourly buckets, {product_days} product-day rows")
+        except Exception as e:
+            await db.rollback()
+            print(f"Error: {e}")
+            import traceback
+            traceback.print_exc()
+            sys.exit(1)
+
+if __name__ == "__main__":
+    print("Rebuilding dashboard rollups...")
+    asyncio.run(main())
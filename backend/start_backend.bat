@@ -31,6 +31,10 @@ if not exist venv\Lib\site-packages\fastapi (
     echo.
 )
 
+echo Applying database migrations...
+python migrate.py || exit /b 1
+echo.
+
 echo Starting FastAPI server on http://localhost:8000
 echo Press Ctrl+C to stop the server
 echo.
@@ -32,6 +32,10 @@ if [ ! -d "venv/lib/python*/site-packages/fastapi" ]; then
     echo ""
 fi
 
+echo "Applying database migrations..."
+python migrate.py || exit 1
+echo ""
+
 echo "Starting FastAPI server on http://localhost:8000"
 echo "Press Ctrl+C to stop the server"
 echo ""
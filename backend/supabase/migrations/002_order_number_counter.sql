@@ -0,0 +1,35 @@
+-- Sequential order numbers (BB001, BB002, ...) from a per-tenant counter row
+-- instead of scanning every orders.order_number at checkout.
+
+-- Older databases predate the order_number column
+ALTER TABLE orders ADD COLUMN IF NOT EXISTS order_number TEXT UNIQUE;
+
+CREATE TABLE IF NOT EXISTS order_number_counters (
+    scope TEXT PRIMARY KEY, -- tenant_id, or 'default' for single-shop installs
+    last_value BIGINT NOT NULL DEFAULT 0
+);
+
+-- Backfill orders that never got a number, oldest first, after the current maximum
+WITH current_max AS (
+    SELECT COALESCE(MAX(NULLIF(regexp_replace(order_number, '\D', '', 'g'), '')::BIGINT), 0) AS n
+    FROM orders
+    WHERE order_number IS NOT NULL
+),
+numbered AS (
+    SELECT id, ROW_NUMBER() OVER (ORDER BY created_at, id) AS rn
+    FROM orders
+    WHERE order_number IS NULL
+)
+UPDATE orders o
+SET order_number = 'BB' || LPAD((current_max.n + numbered.rn)::TEXT, GREATEST(3, LENGTH((current_max.n + numbered.rn)::TEXT)), '0')
+FROM numbered, current_max
+WHERE o.id = numbered.id;
+
+-- Seed one counter per tenant from the highest number already issued
+INSERT INTO order_number_counters (scope, last_value)
+SELECT COALESCE(tenant_id::TEXT, 'default'),
+       COALESCE(MAX(NULLIF(regexp_replace(order_number, '\D', '', 'g'), '')::BIGINT), 0)
+FROM orders
+WHERE order_number IS NOT NULL
+GROUP BY COALESCE(tenant_id::TEXT, 'default')
+ON CONFLICT (scope) DO UPDATE SET last_value = GREATEST(order_number_counters.last_value, EXCLUDED.last_value);
@@ -0,0 +1,33 @@
+-- Pre-aggregated sales for the dashboard (kept up to date by order writes, see app/rollups.py)
+
+-- Order count and sales per UTC hour
+CREATE TABLE IF NOT EXISTS sales_hourly (
+    bucket_start TIMESTAMP PRIMARY KEY, -- start of the hour, UTC
+    order_count INTEGER NOT NULL DEFAULT 0,
+    total_sales DECIMAL(12,2) NOT NULL DEFAULT 0.00
+);
+
+-- Units sold per product per UTC day
+CREATE TABLE IF NOT EXISTS product_sales_daily (
+    sale_date DATE NOT NULL,
+    product_id UUID NOT NULL REFERENCES products(id) ON DELETE CASCADE,
+    quantity INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (sale_date, product_id)
+);
+
+-- Initial fill from existing completed orders (same as `python rebuild_rollups.py`)
+DELETE FROM sales_hourly;
+DELETE FROM product_sales_daily;
+
+INSERT INTO sales_hourly (bucket_start, order_count, total_sales)
+SELECT date_trunc('hour', timezone('UTC', created_at)), COUNT(id), SUM(total_amount)
+FROM orders
+WHERE status = 'completed'
+GROUP BY 1;
+
+INSERT INTO product_sales_daily (sale_date, product_id, quantity)
+SELECT date(timezone('UTC', o.created_at)), oi.product_id, SUM(oi.quantity)
+FROM order_items oi
+JOIN orders o ON oi.order_id = o.id
+WHERE oi.product_id IS NOT NULL AND o.status = 'completed'
+GROUP BY 1, 2;
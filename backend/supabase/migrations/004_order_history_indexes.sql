@@ -0,0 +1,12 @@
+-- Keyset pagination for GET /orders: newest first by (created_at, id), optionally filtered.
+-- Each filter column leads its own index so a filtered page is one index range scan.
+
+CREATE INDEX IF NOT EXISTS idx_orders_created_id ON orders(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_orders_status_created ON orders(status, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_orders_payment_created ON orders(payment_method, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_orders_staff_created ON orders(staff_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_orders_customer_created ON orders(customer_id, created_at, id);
+
+-- Covered by the composite indexes above
+DROP INDEX IF EXISTS idx_orders_date;
+DROP INDEX IF EXISTS idx_orders_customer;
@@ -0,0 +1,18 @@
+-- Indexed customer search (see app/customer_search.py)
+
+-- Phone number with everything but digits stripped, for prefix lookups ("98765" matches "98765 43210")
+ALTER TABLE customers ADD COLUMN IF NOT EXISTS phone_digits TEXT
+    GENERATED ALWAYS AS (regexp_replace(coalesce(phone_number, ''), '[^0-9]', '', 'g')) STORED;
+
+-- Name words for ranked full-text search ('simple' config: no stemming or stop words for names)
+ALTER TABLE customers ADD COLUMN IF NOT EXISTS search_vector TSVECTOR
+    GENERATED ALWAYS AS (to_tsvector('simple', coalesce(full_name, ''))) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_customers_search ON customers USING gin (search_vector);
+
+-- Prefix matches in index order; "C" collation lets one index serve both LIKE 'q%' and ORDER BY
+CREATE INDEX IF NOT EXISTS idx_customers_name_prefix ON customers (lower(full_name) COLLATE "C", id);
+CREATE INDEX IF NOT EXISTS idx_customers_phone_digits ON customers (phone_digits COLLATE "C", id);
+
+-- Unfiltered customer list, newest activity first
+CREATE INDEX IF NOT EXISTS idx_customers_updated_id ON customers (updated_at, id);
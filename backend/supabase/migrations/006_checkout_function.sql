@@ -0,0 +1,130 @@
+-- checkout(order jsonb): the whole POS checkout as one statement.
+--
+-- Called by POST /orders/create (routers/orders.py) and the create-order edge function with
+-- the same JSON body the API takes:
+--   {"customer": {"fullName", "phoneNumber", "notes"}, "items": [{"id", "quantity", "price"}],
+--    "paymentMethod", "staffId", "notes", "totalAmount"}
+-- and returns {"orderId": ..., "orderNumber": "BB042"}.
+--
+-- In one transaction it upserts the customer (and their stats), allocates the order number
+-- from order_number_counters, inserts the order and its items, locks and deducts stock and
+-- updates the dashboard rollups. Stock problems raise SQLSTATE 'BB400' with the same message
+-- the API returns ("Insufficient stock for product id ..."), and nothing is written.
+-- Ids are generated here rather than left to column defaults, which tables created by the
+-- app's create_all (Python-side uuid defaults) don't have.
+
+CREATE OR REPLACE FUNCTION checkout(p_order JSONB)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_customer JSONB := p_order->'customer';
+    v_total DECIMAL(10,2) := (p_order->>'totalAmount')::DECIMAL(10,2);
+    v_customer_id UUID;
+    v_number BIGINT;
+    v_order_number TEXT;
+    v_order_id UUID;
+    v_created_at TIMESTAMPTZ;
+    v_product_ids UUID[];
+    v_quantities INTEGER[];
+    v_insufficient TEXT;
+    v_missing TEXT;
+BEGIN
+    -- 1. Stock: lock every inventory row the order touches (in product_id order, so concurrent
+    --    checkouts can't deadlock) and check it before writing anything
+    SELECT array_agg(product_id ORDER BY product_id), array_agg(quantity ORDER BY product_id)
+    INTO v_product_ids, v_quantities
+    FROM (
+        SELECT item.id AS product_id, SUM(item.quantity)::INTEGER AS quantity
+        FROM jsonb_to_recordset(COALESCE(p_order->'items', '[]'::jsonb)) AS item(id UUID, quantity INTEGER)
+        WHERE item.id IS NOT NULL
+        GROUP BY item.id
+    ) totals;
+
+    PERFORM 1
+    FROM inventory i
+    WHERE i.product_id = ANY(v_product_ids)
+    ORDER BY i.product_id
+    FOR UPDATE;
+
+    SELECT string_agg(q.product_id::TEXT, ', ' ORDER BY q.product_id) FILTER (WHERE i.product_id IS NOT NULL AND i.stock_quantity < q.quantity),
+           string_agg(q.product_id::TEXT, ', ' ORDER BY q.product_id) FILTER (WHERE i.product_id IS NULL)
+    INTO v_insufficient, v_missing
+    FROM unnest(v_product_ids, v_quantities) AS q(product_id, quantity)
+    LEFT JOIN inventory i ON i.product_id = q.product_id;
+
+    IF v_insufficient IS NOT NULL OR v_missing IS NOT NULL THEN
+        RAISE EXCEPTION USING
+            ERRCODE = 'BB400',
+            MESSAGE = concat_ws('; ',
+                'Insufficient stock for product id ' || v_insufficient,
+                'Inventory record not found for product id ' || v_missing);
+    END IF;
+
+    UPDATE inventory i
+    SET stock_quantity = i.stock_quantity - q.quantity, last_updated = now()
+    FROM unnest(v_product_ids, v_quantities) AS q(product_id, quantity)
+    WHERE i.product_id = q.product_id;
+
+    -- 2. Customer: create, or rename and count the visit, keyed by phone number
+    INSERT INTO customers (id, full_name, phone_number, notes, total_orders, total_spent)
+    VALUES (gen_random_uuid(), v_customer->>'fullName', v_customer->>'phoneNumber', v_customer->>'notes', 1, v_total)
+    ON CONFLICT (phone_number) DO UPDATE SET
+        full_name = COALESCE(NULLIF(EXCLUDED.full_name, ''), customers.full_name),
+        total_orders = COALESCE(customers.total_orders, 0) + 1,
+        total_spent = COALESCE(customers.total_spent, 0) + EXCLUDED.total_spent,
+        updated_at = now()
+    RETURNING id INTO v_customer_id;
+
+    -- 3. Order number (the counter row stays locked until commit; seeded on first use)
+    UPDATE order_number_counters SET last_value = last_value + 1
+    WHERE scope = 'default'
+    RETURNING last_value INTO v_number;
+
+    IF v_number IS NULL THEN
+        INSERT INTO order_number_counters (scope, last_value)
+        SELECT 'default', COALESCE(MAX(NULLIF(regexp_replace(order_number, '\D', '', 'g'), '')::BIGINT), 0)
+        FROM orders
+        WHERE order_number IS NOT NULL AND tenant_id IS NULL
+        ON CONFLICT (scope) DO NOTHING;
+
+        UPDATE order_number_counters SET last_value = last_value + 1
+        WHERE scope = 'default'
+        RETURNING last_value INTO v_number;
+    END IF;
+    v_order_number := 'BB' || lpad(v_number::TEXT, GREATEST(3, length(v_number::TEXT)), '0');
+
+    -- 4. Order and items
+    INSERT INTO orders (id, order_number, customer_id, staff_id, total_amount, payment_method, status, notes)
+    VALUES (
+        gen_random_uuid(),
+        v_order_number,
+        v_customer_id,
+        (p_order->>'staffId')::UUID,
+        v_total,
+        p_order->>'paymentMethod',
+        'completed',
+        p_order->>'notes'
+    )
+    RETURNING id, created_at INTO v_order_id, v_created_at;
+
+    INSERT INTO order_items (id, order_id, product_id, quantity, unit_price, total_price)
+    SELECT gen_random_uuid(), v_order_id, item.id, item.quantity, item.price, item.price * item.quantity
+    FROM jsonb_to_recordset(COALESCE(p_order->'items', '[]'::jsonb)) AS item(id UUID, quantity INTEGER, price DECIMAL(10,2));
+
+    -- 5. Dashboard rollups (app/rollups.py)
+    INSERT INTO sales_hourly (bucket_start, order_count, total_sales)
+    VALUES (date_trunc('hour', timezone('UTC', v_created_at)), 1, v_total)
+    ON CONFLICT (bucket_start) DO UPDATE SET
+        order_count = sales_hourly.order_count + EXCLUDED.order_count,
+        total_sales = sales_hourly.total_sales + EXCLUDED.total_sales;
+
+    INSERT INTO product_sales_daily (sale_date, product_id, quantity)
+    SELECT date(timezone('UTC', v_created_at)), q.product_id, q.quantity
+    FROM unnest(v_product_ids, v_quantities) AS q(product_id, quantity)
+    ON CONFLICT (sale_date, product_id) DO UPDATE SET
+        quantity = product_sales_daily.quantity + EXCLUDED.quantity;
+
+    RETURN jsonb_build_object('orderId', v_order_id, 'orderNumber', v_order_number);
+END;
+$$;
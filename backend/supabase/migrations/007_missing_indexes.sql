@@ -0,0 +1,28 @@
+-- Indexes for the remaining hot queries, so none of them scan a whole table.
+-- Declared on the models as well (app/models.py), and tests/test_query_plans.py
+-- checks with EXPLAIN that each query actually uses them.
+
+-- Order lines are always fetched by order (selectinload(Order.items), exports, voids)
+-- and by product (sales per product, ON DELETE SET NULL when a product is removed)
+CREATE INDEX IF NOT EXISTS idx_order_items_order ON order_items(order_id);
+CREATE INDEX IF NOT EXISTS idx_order_items_product_order ON order_items(product_id, order_id);
+
+-- GET /expenses: newest first, optionally by category and date range; monthly stats by date
+CREATE INDEX IF NOT EXISTS idx_expenses_date_created ON expenses(date, created_at);
+CREATE INDEX IF NOT EXISTS idx_expenses_category_date ON expenses(category, date, created_at);
+
+-- GET /bulk-orders: by delivery date, optionally by status; customer deletes (SET NULL)
+CREATE INDEX IF NOT EXISTS idx_bulk_orders_delivery ON bulk_orders(delivery_date);
+CREATE INDEX IF NOT EXISTS idx_bulk_orders_status_delivery ON bulk_orders(status, delivery_date);
+CREATE INDEX IF NOT EXISTS idx_bulk_orders_customer ON bulk_orders(customer_id);
+
+-- GET /inventory/low-stock and the low-stock counts: only the few rows at or below
+-- their threshold are indexed
+CREATE INDEX IF NOT EXISTS idx_inventory_low_stock ON inventory(stock_quantity)
+    WHERE stock_quantity <= low_stock_threshold;
+
+-- customers(updated_at, id) for the customer list is idx_customers_updated_id (005).
+
+-- Duplicates of the unique constraints' own indexes; dropping them saves a write per insert/update
+DROP INDEX IF EXISTS idx_inventory_product;
+DROP INDEX IF EXISTS idx_customers_phone;
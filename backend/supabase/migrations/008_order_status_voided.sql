@@ -0,0 +1,6 @@
+-- Orders are voided or refunded instead of deleted (app/order_voids.py), but the
+-- CHECK from 001 only knew pending/completed/cancelled/refunded, so voiding an
+-- order on a database built from the migrations failed. Allow 'voided'.
+ALTER TABLE orders DROP CONSTRAINT IF EXISTS orders_status_check;
+ALTER TABLE orders ADD CONSTRAINT orders_status_check
+    CHECK (status IN ('pending', 'completed', 'cancelled', 'refunded', 'voided'));
@@ -0,0 +1,8 @@
+-- Offline orders replayed through POST /orders/batch (app/order_batches.py).
+--
+-- A terminal gives every order it queues while offline its own key and sends it with the
+-- order; an order whose key is already here was applied by an earlier (possibly timed out)
+-- replay and is skipped. Orders placed online have no key.
+ALTER TABLE orders ADD COLUMN IF NOT EXISTS client_key TEXT;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_orders_client_key ON orders(client_key) WHERE client_key IS NOT NULL;
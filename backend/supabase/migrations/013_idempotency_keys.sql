@@ -0,0 +1,64 @@
+-- Idempotency-Key support for POST /orders/create (app/idempotency.py).
+--
+-- A client that retries a checkout after a timeout sends the same Idempotency-Key, and
+-- must get the first attempt's answer instead of a second order. checkout_once() claims
+-- the key and places the order in one statement, so the key and the order commit (or roll
+-- back) together. A concurrent attempt with the same key blocks on the claimed key until
+-- the first commits, then returns its stored response.
+
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key TEXT PRIMARY KEY,
+    request_hash TEXT NOT NULL,  -- sha256 of the request body; the key can't be reused for another order
+    status_code INTEGER NOT NULL,
+    response JSONB NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    expires_at TIMESTAMPTZ NOT NULL
+);
+
+-- prune_idempotency_keys.py
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires ON idempotency_keys(expires_at);
+
+-- Returns {"replayed", "requestHash", "status", "body", "expiresIn" (seconds)}: the stored
+-- answer when the key was used before (and hasn't expired), else checkout()'s, stored under
+-- the key. Stock rejections (BB400) are stored as 400s as well; any other error rolls back
+-- the claim too, so the retry runs again.
+CREATE OR REPLACE FUNCTION checkout_once(p_key TEXT, p_request_hash TEXT, p_ttl INTERVAL, p_order JSONB)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_stored idempotency_keys%ROWTYPE;
+    v_status INTEGER;
+    v_body JSONB;
+BEGIN
+    DELETE FROM idempotency_keys WHERE key = p_key AND expires_at <= now();
+
+    -- Waits here while another transaction holds the same key uncommitted
+    INSERT INTO idempotency_keys (key, request_hash, status_code, response, expires_at)
+    VALUES (p_key, p_request_hash, 0, 'null'::jsonb, now() + p_ttl)
+    ON CONFLICT (key) DO NOTHING;
+
+    IF NOT FOUND THEN
+        SELECT * INTO v_stored FROM idempotency_keys WHERE key = p_key;
+        RETURN jsonb_build_object(
+            'replayed', true, 'requestHash', v_stored.request_hash,
+            'status', v_stored.status_code, 'body', v_stored.response,
+            'expiresIn', extract(epoch FROM v_stored.expires_at - now())
+        );
+    END IF;
+
+    BEGIN
+        v_body := jsonb_build_object('success', true) || checkout(p_order);
+        v_status := 200;
+    EXCEPTION WHEN SQLSTATE 'BB400' THEN
+        v_body := jsonb_build_object('detail', SQLERRM);
+        v_status := 400;
+    END;
+
+    UPDATE idempotency_keys SET status_code = v_status, response = v_body WHERE key = p_key;
+    RETURN jsonb_build_object(
+        'replayed', false, 'requestHash', p_request_hash, 'status', v_status, 'body', v_body,
+        'expiresIn', extract(epoch FROM p_ttl)
+    );
+END;
+$$;
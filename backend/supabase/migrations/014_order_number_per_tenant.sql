@@ -0,0 +1,28 @@
+-- Order numbers are unique per tenant, not across all orders.
+--
+-- Each tenant has its own counter (002_order_number_counter.sql), so two tenants both
+-- hand out BB001 and the global UNIQUE on orders.order_number made the second one fail.
+-- Single-shop installs (tenant_id NULL) keep one sequence of their own, checked by the
+-- second, partial index (NULL tenant_ids never collide in a plain unique index).
+
+-- Drop the UNIQUE (order_number) constraint whatever it is called (001 and 002 both declare it)
+DO $$
+DECLARE
+    constraint_name TEXT;
+BEGIN
+    FOR constraint_name IN
+        SELECT c.conname
+        FROM pg_constraint c
+        JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = ANY (c.conkey)
+        WHERE c.conrelid = 'orders'::regclass AND c.contype = 'u'
+        GROUP BY c.conname
+        HAVING array_agg(a.attname::TEXT) = ARRAY['order_number']
+    LOOP
+        EXECUTE format('ALTER TABLE orders DROP CONSTRAINT %I', constraint_name);
+    END LOOP;
+END $$;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_orders_tenant_order_number
+    ON orders(tenant_id, order_number) WHERE tenant_id IS NOT NULL;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_orders_default_order_number
+    ON orders(order_number) WHERE tenant_id IS NULL;
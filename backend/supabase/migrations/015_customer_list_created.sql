@@ -0,0 +1,9 @@
+-- GET /customers pages on (created_at, id) instead of (updated_at, id) (app/routers/customers.py).
+-- updated_at moves with every checkout, so a customer who ordered while someone was
+-- paging through the list jumped pages and was skipped or listed twice. created_at
+-- never changes once set, so give the few rows without one a value and keep it that way.
+UPDATE customers SET created_at = coalesce(updated_at, now()) WHERE created_at IS NULL;
+ALTER TABLE customers ALTER COLUMN created_at SET NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_customers_created_id ON customers (created_at, id);
+DROP INDEX IF EXISTS idx_customers_updated_id;
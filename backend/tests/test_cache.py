@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from app.cache import TTLCache
+
+pytestmark = pytest.mark.anyio
+
+
+class Computation:
+    """A compute() that blocks until released and counts its calls"""
+
+    def __init__(self, value="stats"):
+        self.value = value
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if isinstance(self.value, Exception):
+            raise self.value
+        return self.value
+
+
+async def test_concurrent_misses_share_one_computation():
+    cache, compute = TTLCache(ttl=60), Computation()
+    callers = [asyncio.ensure_future(cache.get_or_set("analytics", "key", compute)) for _ in range(5)]
+    await asyncio.sleep(0)
+    compute.release.set()
+    assert await asyncio.gather(*callers) == ["stats"] * 5
+    assert compute.calls == 1
+    assert await cache.get_or_set("analytics", "key", compute) == "stats"  # cached
+    assert compute.calls == 1
+
+
+async def test_cancelled_caller_does_not_cancel_the_others():
+    cache, compute = TTLCache(ttl=60), Computation()
+    first = asyncio.ensure_future(cache.get_or_set("analytics", "key", compute))
+    await asyncio.sleep(0)
+    waiter = asyncio.ensure_future(cache.get_or_set("analytics", "key", compute))
+    await asyncio.sleep(0)
+
+    first.cancel()  # the request that started the computation goes away
+    await asyncio.sleep(0)
+    compute.release.set()
+
+    assert await waiter == "stats"
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    assert compute.calls == 1
+    assert await cache.get_or_set("analytics", "key", compute) == "stats"
+    assert compute.calls == 1
+
+
+async def test_failure_reaches_waiters_and_is_not_cached():
+    cache, compute = TTLCache(ttl=60), Computation(RuntimeError("database down"))
+    callers = [asyncio.ensure_future(cache.get_or_set("analytics", "key", compute)) for _ in range(3)]
+    await asyncio.sleep(0)
+    compute.release.set()
+    results = await asyncio.gather(*callers, return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+    compute.value = "stats"
+    assert await cache.get_or_set("analytics", "key", compute) == "stats"
+    assert compute.calls == 2
+
+
+async def test_result_computed_across_an_invalidation_is_not_stored():
+    cache, compute = TTLCache(ttl=60), Computation()
+    caller = asyncio.ensure_future(cache.get_or_set("analytics", "key", compute))
+    await asyncio.sleep(0)
+    cache.invalidate("analytics")
+    compute.release.set()
+    assert await caller == "stats"
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,58 @@
+"""
+Concurrent order writes for one brand-new phone number, each in its own
+committed transaction on TEST_DATABASE_URL, must leave exactly one customer
+whose totals add up (app/customer_stats.py). The customer is deleted afterwards.
+"""
+import asyncio
+import uuid
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import delete, select
+
+from app.customer_stats import add_customer_stats, upsert_customer, upsert_customers
+from app.database import AsyncSessionLocal
+from app.models import Customer
+from app.schemas import CustomerBase
+
+pytestmark = pytest.mark.anyio
+
+CHECKOUTS = 20
+BATCHES = 10
+
+
+async def checkout(phone: str, spent: Decimal):
+    # What an order create does: resolve the customer, then count the visit
+    async with AsyncSessionLocal() as db:
+        customer_id = await upsert_customer(db, CustomerBase(fullName="Race Test", phoneNumber=phone))
+        await add_customer_stats(db, customer_id, 1, spent)
+        await db.commit()
+
+
+async def batch(phone: str, orders: int, spent: Decimal):
+    # What an offline batch does: resolve and count in one statement
+    async with AsyncSessionLocal() as db:
+        await upsert_customers(db, [{
+            "full_name": "Race Test", "phone_number": phone, "notes": None,
+            "total_orders": orders, "total_spent": spent,
+        }])
+        await db.commit()
+
+
+async def test_concurrent_upserts_make_one_customer_with_exact_totals(test_database):
+    phone = f"09{uuid.uuid4().int % 10**8:08d}"
+    try:
+        await asyncio.gather(
+            *(checkout(phone, Decimal("12.50")) for _ in range(CHECKOUTS)),
+            *(batch(phone, 2, Decimal("7.25")) for _ in range(BATCHES)),
+        )
+        async with AsyncSessionLocal() as db:
+            customers = (await db.execute(select(Customer).where(Customer.phone_number == phone))).scalars().all()
+        assert len(customers) == 1
+        assert (customers[0].total_orders, customers[0].total_spent) == (
+            CHECKOUTS + 2 * BATCHES, CHECKOUTS * Decimal("12.50") + BATCHES * Decimal("7.25")
+        )
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(Customer).where(Customer.phone_number == phone))
+            await db.commit()
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from app import events
+from app.database import AsyncSessionLocal
+from app.events import EventHub, publish
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def hub(test_database, monkeypatch):
+    monkeypatch.setattr(events, "IDLE_SECONDS", 0.1)
+    hub = EventHub()
+    yield hub
+    await hub.stop()
+
+
+async def notify(event_type: str, **data):
+    async with AsyncSessionLocal() as db:
+        await publish(db, event_type, **data)
+        await db.commit()
+
+
+async def test_listener_stops_after_the_last_subscriber_leaves(hub):
+    first, second = hub.subscribe(), hub.subscribe()
+    assert await hub.wait_connected(5)
+    connection = hub._connection
+
+    hub.unsubscribe(first)
+    await asyncio.sleep(0.3)
+    assert hub.stats()["listening"]  # one subscriber left
+
+    hub.unsubscribe(second)
+    await asyncio.sleep(0.3)
+    assert not hub.stats()["listening"] and not hub.stats()["connected"]
+    assert connection.is_closed()
+
+
+async def test_subscriber_within_the_idle_period_keeps_the_connection(hub):
+    subscriber = hub.subscribe()
+    assert await hub.wait_connected(5)
+    connection = hub._connection
+
+    hub.unsubscribe(subscriber)
+    subscriber = hub.subscribe()  # e.g. a browser reconnecting
+    await asyncio.sleep(0.3)
+    assert hub._connection is connection and not connection.is_closed()
+
+    await notify("order.updated", orderId="kept")
+    assert "kept" in await asyncio.wait_for(subscriber.queue.get(), 5)
+
+
+async def test_listener_restarts_for_a_new_subscriber(hub):
+    hub.unsubscribe(hub.subscribe())
+    await asyncio.sleep(0.3)
+    assert not hub.stats()["listening"]
+
+    subscriber = hub.subscribe()
+    assert await hub.wait_connected(5)
+    await notify("order.updated", orderId="after-restart")
+    frame = await asyncio.wait_for(subscriber.queue.get(), 5)
+    assert "event: order.updated" in frame and "after-restart" in frame  # no resync first
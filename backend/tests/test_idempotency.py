@@ -0,0 +1,170 @@
+"""
+IdempotencyStore with a stub `execute`, and checkout_once() racing itself on
+TEST_DATABASE_URL. The race places a real order, then voids it and deletes
+its product.
+"""
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import delete, func, select
+
+from app.checkout import checkout_once
+from app.database import AsyncSessionLocal
+from app.idempotency import IdempotencyConflict, IdempotencyStore, request_hash
+from app.models import IdempotencyKey, Inventory, Order, Product
+from app.schemas import CreateOrderRequest
+
+pytestmark = pytest.mark.anyio
+
+HASH = request_hash('{"items": []}')
+
+
+class Execute:
+    """A stub checkout that blocks until released and counts its calls"""
+
+    def __init__(self, error: Exception = None, expires_in: float = 60):
+        self.error = error
+        self.expires_in = expires_in
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self) -> dict:
+        self.calls += 1
+        await self.release.wait()
+        if self.error:
+            error, self.error = self.error, None  # only the first attempt fails
+            raise error
+        return {"replayed": False, "requestHash": HASH, "status": 200,
+                "body": {"orderId": self.calls}, "expiresIn": self.expires_in}
+
+
+async def test_concurrent_retries_run_once():
+    store, execute = IdempotencyStore(size=10), Execute()
+    callers = [asyncio.ensure_future(store.run("key", HASH, execute)) for _ in range(10)]
+    await asyncio.sleep(0)
+    execute.release.set()
+    outcomes = await asyncio.gather(*callers)
+
+    assert execute.calls == 1
+    assert [o["replayed"] for o in outcomes].count(False) == 1
+    assert {o["body"]["orderId"] for o in outcomes} == {1}
+    assert store.stats() == {"entries": 1, "inFlight": 0, "hits": 0, "waits": 9, "misses": 1}
+
+    assert (await store.run("key", HASH, execute))["replayed"]  # from the cache
+    assert execute.calls == 1
+
+
+async def test_failed_attempt_is_retried_by_a_waiter():
+    store, execute = IdempotencyStore(size=10), Execute(error=RuntimeError("connection reset"))
+    first = asyncio.ensure_future(store.run("key", HASH, execute))
+    await asyncio.sleep(0)
+    retry = asyncio.ensure_future(store.run("key", HASH, execute))
+    await asyncio.sleep(0)
+    execute.release.set()
+
+    with pytest.raises(RuntimeError):
+        await first
+    outcome = await retry
+    assert execute.calls == 2
+    assert (outcome["replayed"], outcome["body"]) == (False, {"orderId": 2})
+    assert store.stats()["inFlight"] == 0
+
+
+async def test_cancelled_attempt_is_retried_by_a_waiter():
+    store, execute = IdempotencyStore(size=10), Execute()
+    first = asyncio.ensure_future(store.run("key", HASH, execute))
+    await asyncio.sleep(0)
+    retry = asyncio.ensure_future(store.run("key", HASH, execute))
+    await asyncio.sleep(0)
+
+    first.cancel()  # the client went away mid-checkout
+    await asyncio.sleep(0)
+    execute.release.set()
+
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    assert (await retry)["body"] == {"orderId": 2}
+    assert execute.calls == 2
+
+
+async def test_key_reused_for_another_body_conflicts():
+    store, execute = IdempotencyStore(size=10), Execute()
+    first = asyncio.ensure_future(store.run("key", HASH, execute))
+    await asyncio.sleep(0)
+    waiter = asyncio.ensure_future(store.run("key", request_hash("{}"), execute))
+    await asyncio.sleep(0)
+    execute.release.set()
+
+    assert not (await first)["replayed"]
+    with pytest.raises(IdempotencyConflict):
+        await waiter  # in flight
+    with pytest.raises(IdempotencyConflict):
+        await store.run("key", request_hash("{}"), execute)  # cached
+    assert execute.calls == 1
+
+
+async def test_least_recently_used_key_is_evicted():
+    store, execute = IdempotencyStore(size=2), Execute()
+    execute.release.set()
+    for key in ("a", "b"):
+        await store.run(key, HASH, execute)
+    await store.run("a", HASH, execute)  # "b" is now the oldest
+    await store.run("c", HASH, execute)
+    assert execute.calls == 3
+
+    assert (await store.run("a", HASH, execute))["replayed"]
+    assert not (await store.run("b", HASH, execute))["replayed"]
+    assert execute.calls == 4
+
+
+async def test_expired_key_runs_again():
+    store, execute = IdempotencyStore(size=10), Execute(expires_in=0)
+    execute.release.set()
+    await store.run("key", HASH, execute)
+    assert not (await store.run("key", HASH, execute))["replayed"]
+    assert execute.calls == 2
+
+
+async def _place_once(key: str, body_hash: str, order_json: str) -> dict:
+    # A session of its own, as a retry reaching another worker would have
+    async with AsyncSessionLocal() as db:
+        return await checkout_once(db, key, body_hash, order_json, ttl=60)
+
+
+async def test_checkout_once_race_places_one_order(db_client):
+    tag = uuid.uuid4().hex[:8]
+    async with AsyncSessionLocal() as db:
+        product = Product(name=f"Idempotency test {tag}", sku=f"idem-test-{tag}", price=5, category="Test")
+        db.add(product)
+        await db.flush()
+        db.add(Inventory(product_id=product.id, stock_quantity=10))
+        await db.commit()
+        product_id = product.id
+
+    key = f"idempotency-test-{tag}"
+    order_json = CreateOrderRequest(
+        customer={"fullName": "Idempotency Test", "phoneNumber": f"05{tag}"},
+        items=[{"id": product_id, "quantity": 2, "price": 5}],
+        paymentMethod="cash", totalAmount=10, notes=key,
+    ).model_dump_json()
+    body_hash = request_hash(order_json)
+    try:
+        outcomes = await asyncio.gather(*(_place_once(key, body_hash, order_json) for _ in range(8)))
+
+        assert [o["replayed"] for o in outcomes].count(False) == 1
+        assert {o["status"] for o in outcomes} == {200}
+        assert len({o["body"]["orderId"] for o in outcomes}) == 1
+        async with AsyncSessionLocal() as db:
+            assert await db.scalar(select(func.count(Order.id)).where(Order.notes == key)) == 1
+            assert await db.scalar(
+                select(Inventory.stock_quantity).where(Inventory.product_id == product_id)
+            ) == 8
+    finally:
+        async with AsyncSessionLocal() as db:
+            order_ids = (await db.execute(select(Order.id).where(Order.notes == key))).scalars().all()
+            await db.execute(delete(IdempotencyKey).where(IdempotencyKey.key == key))
+            await db.commit()
+        for order_id in order_ids:
+            assert (await db_client.post(f"/orders/{order_id}/void")).status_code == 200
+        assert (await db_client.delete(f"/products/{product_id}")).status_code == 200
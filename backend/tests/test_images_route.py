@@ -0,0 +1,92 @@
+import asyncio
+import io
+
+import pytest
+from PIL import Image
+
+from app.images import save_image
+from app.thumbnails import variant_name
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def stored_image(image_store):
+    output = io.BytesIO()
+    Image.new("RGB", (640, 480), (90, 60, 40)).save(output, format="PNG")
+    contents = output.getvalue()
+    name = (await save_image(contents, "image/png")).rsplit("/", 1)[1]
+    return name, contents
+
+
+async def test_etag_and_conditional_get(client, stored_image):
+    name, contents = stored_image
+    response = await client.get(f"/images/{name}")
+    assert response.status_code == 200
+    assert response.content == contents
+    assert response.headers["etag"] == f'"{name.split(".")[0]}"'
+    assert response.headers["content-type"] == "image/png"
+    assert "immutable" in response.headers["cache-control"]
+
+    cached = await client.get(f"/images/{name}", headers={"If-None-Match": response.headers["etag"]})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == response.headers["etag"]
+
+    other = await client.get(f"/images/{name}", headers={"If-None-Match": '"something-else"'})
+    assert other.status_code == 200
+
+
+async def test_range_requests(client, stored_image):
+    name, contents = stored_image
+    size = len(contents)
+
+    response = await client.get(f"/images/{name}", headers={"Range": "bytes=0-99"})
+    assert response.status_code == 206
+    assert response.content == contents[:100]
+    assert response.headers["content-range"] == f"bytes 0-99/{size}"
+
+    response = await client.get(f"/images/{name}", headers={"Range": "bytes=100-"})
+    assert response.status_code == 206
+    assert response.content == contents[100:]
+    assert response.headers["content-range"] == f"bytes 100-{size - 1}/{size}"
+
+    response = await client.get(f"/images/{name}", headers={"Range": "bytes=-50"})
+    assert response.status_code == 206
+    assert response.content == contents[-50:]
+
+    response = await client.get(f"/images/{name}", headers={"Range": f"bytes={size}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{size}"
+
+    # Multiple ranges aren't supported: the whole image
+    response = await client.get(f"/images/{name}", headers={"Range": "bytes=0-1,5-9"})
+    assert response.status_code == 200
+    assert response.content == contents
+
+
+async def test_variant_generated_on_first_request(client, stored_image):
+    name, _ = stored_image
+    variant = variant_name(name.split(".")[0], 200, "jpg")
+    response = await client.get(f"/images/{variant}")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/jpeg"
+    assert response.headers["etag"] == f'"{variant.rsplit(".", 1)[0]}"'
+    assert Image.open(io.BytesIO(response.content)).size == (200, 150)
+
+
+async def test_unknown_image(client, image_store):
+    assert (await client.get(f"/images/{'0' * 64}.png")).status_code == 404
+    assert (await client.get("/images/not-an-image.txt")).status_code == 404
+
+
+async def test_concurrent_uploads_of_one_image(image_store):
+    output = io.BytesIO()
+    Image.new("RGB", (64, 64), (200, 180, 160)).save(output, format="PNG")
+    contents = output.getvalue()
+    # Each upload writes from its own thread in this process: their temporary files must not collide
+    urls = await asyncio.gather(*(save_image(contents, "image/png") for _ in range(16)))
+    assert len(set(urls)) == 1
+    name = urls[0].rsplit("/", 1)[1]
+    assert image_store.read(name) == contents
+    assert list(image_store.directory.rglob("*.tmp")) == []
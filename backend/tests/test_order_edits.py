@@ -0,0 +1,145 @@
+import uuid
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, selectinload
+
+from app.models import Customer, Inventory, Order, OrderItem, Product
+from app.order_edits import diff_items, edit_order
+from app.schemas import CustomerBase, OrderItemRequest, UpdateOrderRequest
+
+ORDER_ID = uuid.uuid4()
+BREAD, CAKE, TART = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+
+
+def stored(product_id, quantity, price) -> OrderItem:
+    price = Decimal(str(price)).quantize(Decimal("0.01"))
+    return OrderItem(id=uuid.uuid4(), order_id=ORDER_ID, product_id=product_id,
+                     quantity=quantity, unit_price=price, total_price=price * quantity)
+
+
+def line(product_id, quantity, price) -> OrderItemRequest:
+    return OrderItemRequest(id=product_id, quantity=quantity, price=price)
+
+
+def test_unchanged_lines_touch_nothing():
+    old = [stored(BREAD, 2, 4.5), stored(CAKE, 1, 30)]
+    changes = diff_items(ORDER_ID, old, [line(BREAD, 2, 4.5), line(CAKE, 1, 30)])
+    assert changes == ([], [], [], {})
+
+
+def test_quantity_change():
+    old = [stored(BREAD, 2, 4.5), stored(CAKE, 1, 30)]
+    changes = diff_items(ORDER_ID, old, [line(BREAD, 5, 4.5), line(CAKE, 1, 30)])
+    assert changes.updates == [{
+        "id": old[0].id, "quantity": 5, "unit_price": Decimal("4.50"), "total_price": Decimal("22.50"),
+    }]
+    assert (changes.inserts, changes.deletes) == ([], [])
+    assert changes.quantity_deltas == {BREAD: 3}
+
+
+def test_price_only_change():
+    old = [stored(BREAD, 2, 4.5)]
+    changes = diff_items(ORDER_ID, old, [line(BREAD, 2, 4)])
+    assert changes.updates == [{
+        "id": old[0].id, "quantity": 2, "unit_price": Decimal("4.00"), "total_price": Decimal("8.00"),
+    }]
+    assert changes.quantity_deltas == {}  # no stock moves
+
+
+def test_added_line():
+    old = [stored(BREAD, 2, 4.5)]
+    changes = diff_items(ORDER_ID, old, [line(BREAD, 2, 4.5), line(TART, 3, 6)])
+    assert changes.inserts == [{
+        "order_id": ORDER_ID, "product_id": TART, "quantity": 3,
+        "unit_price": Decimal("6.00"), "total_price": Decimal("18.00"),
+    }]
+    assert (changes.updates, changes.deletes) == ([], [])
+    assert changes.quantity_deltas == {TART: 3}
+
+
+def test_removed_line():
+    old = [stored(BREAD, 2, 4.5), stored(CAKE, 1, 30)]
+    changes = diff_items(ORDER_ID, old, [line(BREAD, 2, 4.5)])
+    assert changes.deletes == [old[1].id]
+    assert (changes.inserts, changes.updates) == ([], [])
+    assert changes.quantity_deltas == {CAKE: -1}
+
+
+def test_duplicate_product_lines_pair_in_order():
+    old = [stored(BREAD, 1, 4.5), stored(BREAD, 2, 4)]
+    # First line unchanged, second one changed, and a third line for the same product
+    changes = diff_items(ORDER_ID, old, [line(BREAD, 1, 4.5), line(BREAD, 3, 4), line(BREAD, 1, 0)])
+    assert changes.updates == [{
+        "id": old[1].id, "quantity": 3, "unit_price": Decimal("4.00"), "total_price": Decimal("12.00"),
+    }]
+    assert [(row["product_id"], row["quantity"]) for row in changes.inserts] == [(BREAD, 1)]
+    assert changes.deletes == []
+    assert changes.quantity_deltas == {BREAD: 2}
+
+    # Dropping the second of two lines deletes that one, not the first
+    changes = diff_items(ORDER_ID, old, [line(BREAD, 1, 4.5)])
+    assert changes.deletes == [old[1].id]
+    assert changes.quantity_deltas == {BREAD: -2}
+
+
+def test_swapped_products():
+    old = [stored(BREAD, 2, 4.5), stored(CAKE, 1, 30)]
+    # Same lines in the other order: lines are matched per product, not by position
+    changes = diff_items(ORDER_ID, old, [line(CAKE, 1, 30), line(BREAD, 2, 4.5)])
+    assert changes == ([], [], [], {})
+
+
+@pytest.mark.anyio
+async def test_edit_order_moves_stock_and_customer_by_the_delta(db):
+    tag = uuid.uuid4().hex[:8]
+    products = {}
+    for name, price in (("bread", 4), ("cake", 30), ("tart", 6)):
+        product = Product(name=f"Edit test {name}", sku=f"edit-test-{name}-{tag}", price=Decimal(price), category="Test")
+        db.add(product)
+        await db.flush()
+        db.add(Inventory(product_id=product.id, stock_quantity=10))
+        products[name] = product
+    customer = Customer(full_name="Edit Test", phone_number=f"05{tag}", total_orders=1, total_spent=Decimal("38"))
+    db.add(customer)
+    await db.flush()
+    order = Order(customer_id=customer.id, total_amount=Decimal("38"), payment_method="cash", order_number=f"T{tag}")
+    db.add(order)
+    await db.flush()
+    db.add_all([
+        OrderItem(order_id=order.id, product_id=products["bread"].id, quantity=2, unit_price=4, total_price=8),
+        OrderItem(order_id=order.id, product_id=products["cake"].id, quantity=1, unit_price=30, total_price=30),
+    ])
+    await db.flush()
+    db.expunge_all()
+
+    order = (await db.execute(
+        select(Order).options(joinedload(Order.customer), selectinload(Order.items)).where(Order.id == order.id)
+    )).scalars().one()
+    # bread 2 -> 3, cake removed, two tarts added: 38 -> 24
+    problems = await edit_order(db, order, UpdateOrderRequest(
+        customer=CustomerBase(fullName="Edit Test", phoneNumber=f"05{tag}"),
+        items=[line(products["bread"].id, 3, 4), line(products["tart"].id, 2, 6)],
+        paymentMethod="card",
+        totalAmount=24,
+    ))
+    assert problems == []
+    await db.flush()
+    db.expunge_all()
+
+    stock = dict((await db.execute(
+        select(Inventory.product_id, Inventory.stock_quantity)
+        .where(Inventory.product_id.in_([p.id for p in products.values()]))
+    )).all())
+    assert stock == {products["bread"].id: 9, products["cake"].id: 11, products["tart"].id: 8}
+
+    customer = await db.get(Customer, customer.id)
+    assert (customer.total_orders, customer.total_spent) == (1, Decimal("24.00"))
+
+    items = (await db.execute(
+        select(OrderItem.product_id, OrderItem.quantity).where(OrderItem.order_id == order.id)
+    )).all()
+    assert sorted((str(p), q) for p, q in items) == sorted(
+        [(str(products["bread"].id), 3), (str(products["tart"].id), 2)]
+    )
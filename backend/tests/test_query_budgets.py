@@ -0,0 +1,95 @@
+"""
+Each endpoint must stay within a fixed number of SQL statements: a count that
+grows with the page size (an N+1) fails straight away. Runs against
+TEST_DATABASE_URL, which needs some products with stock (benchmarks/datagen.py);
+the write checks create a product and an order, edit and void the order, and
+delete the product.
+"""
+import time
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+READS = [
+    (2, "/products", None),
+    (2, "/sync/catalog", None),
+    (2, "/orders", {"limit": 50}),
+    (1, "/orders", {"limit": 50, "view": "summary"}),
+    (1, "/customers", {"limit": 50}),
+    (1, "/customers", {"q": "0500", "limit": 50}),
+    (2, "/inventory", None),
+    (1, "/inventory/low-stock", None),
+    (1, "/inventory/stats", None),
+    (1, "/expenses", None),
+    (1, "/expenses/stats", None),
+    (1, "/bulk-orders", None),
+    (1, "/offers", None),
+    (1, "/staff", None),
+    (1, "/analytics/dashboard-stats", None),
+]
+
+
+def order_body(product: dict, quantity: int) -> dict:
+    return {
+        "customer": {"fullName": "Budget Check", "phoneNumber": "0500000002"},
+        "items": [{"id": product["id"], "quantity": quantity, "price": product["price"]}],
+        "paymentMethod": "cash",
+        "totalAmount": product["price"] * quantity,
+        "notes": "query budget check",
+    }
+
+
+async def in_stock_product(client) -> dict:
+    products = [p for p in (await client.get("/products")).json() if p["stock"] >= 10]
+    if not products:
+        pytest.skip("no product with stock in TEST_DATABASE_URL; fill it with benchmarks/datagen.py")
+    return products[0]
+
+
+@pytest.mark.parametrize("budget, url, params", READS, ids=[f"{url} {params or ''}" for _, url, params in READS])
+async def test_read_budget(db_client, query_budget, budget, url, params):
+    with query_budget(budget):
+        response = await db_client.get(url, params=params)
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("url", ["/products", "/inventory"])
+async def test_not_modified_budget(db_client, query_budget, url):
+    etag = (await db_client.get(url)).headers["etag"]
+    with query_budget(1):
+        response = await db_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+async def test_catalog_write_budgets(db_client, query_budget):
+    with query_budget(4):
+        response = await db_client.post("/products", data={
+            "name": f"Budget check {time.time()}", "price": "10", "category": "Budget Check", "stock": "5",
+        })
+    assert response.status_code == 200
+    product_id = response.json()["id"]
+    with query_budget(1):
+        assert (await db_client.get(f"/products/{product_id}")).status_code == 200
+    with query_budget(3):
+        assert (await db_client.put(f"/products/{product_id}", data={"price": "12"})).status_code == 200
+    with query_budget(3):
+        assert (await db_client.delete(f"/products/{product_id}")).status_code == 200
+
+
+async def test_order_write_budgets(db_client, query_budget):
+    product = await in_stock_product(db_client)
+    cursor = (await db_client.get("/sync/catalog")).json()["cursor"]
+    with query_budget(1):
+        response = await db_client.post("/orders/create", json=order_body(product, 1))
+    assert response.status_code == 200
+    order_id = response.json()["orderId"]
+
+    with query_budget(2):
+        assert (await db_client.get("/sync/catalog", params={"since": cursor})).status_code == 200
+    with query_budget(2):
+        assert (await db_client.get(f"/orders/{order_id}")).status_code == 200
+    with query_budget(11):
+        assert (await db_client.put(f"/orders/{order_id}", json=order_body(product, 2))).status_code == 200
+    with query_budget(10):
+        assert (await db_client.post(f"/orders/{order_id}/void")).status_code == 200
@@ -0,0 +1,233 @@
+"""
+Each router's hot query must use an index, checked with EXPLAIN on
+TEST_DATABASE_URL under the default planner settings. Plans depend on table
+sizes, so the module first seeds realistic volumes (a year of orders with their
+lines, customers, expenses, bulk orders and stocked products) and ANALYZEs them,
+all in one transaction that is rolled back at the end. Indexes:
+supabase/migrations/004, 005, 007 and 015.
+"""
+import json
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import func, select, text
+
+from app import exports
+from app.models import ORDER_COMPLETED, BulkOrder, Customer, Expense, Inventory, Order, OrderItem, Product
+
+pytestmark = pytest.mark.anyio
+
+SEED_NOTE = "query plan test seed"
+SEED = [
+    """
+        INSERT INTO customers (id, full_name, phone_number, total_orders, total_spent)
+        SELECT gen_random_uuid(), 'Plan customer ' || g, 'plan-' || gen_random_uuid(), 0, 0
+        FROM generate_series(1, 20000) g
+    """,
+    """
+        WITH new_products AS (
+            INSERT INTO products (id, name, description, sku, price, category)
+            SELECT gen_random_uuid(), 'Plan item ' || g, :note, 'PLAN-' || gen_random_uuid(), 100, 'Plan Check'
+            FROM generate_series(1, 5000) g
+            RETURNING id
+        )
+        INSERT INTO inventory (id, product_id, stock_quantity, low_stock_threshold)
+        SELECT gen_random_uuid(), id, CASE WHEN random() < 0.01 THEN 2 ELSE 50 + (random() * 200)::int END, 5
+        FROM new_products
+    """,
+    # ~270 orders a day over the last year, two lines each
+    """
+        WITH customer_ids AS (
+            SELECT array_agg(id) AS ids FROM customers WHERE phone_number LIKE 'plan-%'
+        ), product_ids AS (
+            SELECT array_agg(id) AS ids FROM products WHERE description = :note
+        ), new_orders AS (
+            INSERT INTO orders (id, created_at, customer_id, total_amount, payment_method, status, notes)
+            SELECT gen_random_uuid(), now() - random() * interval '365 days',
+                   c.ids[1 + floor(random() * array_length(c.ids, 1))::int],
+                   200, 'cash', CASE WHEN random() < 0.97 THEN 'completed' ELSE 'voided' END, :note
+            FROM generate_series(1, 100000), customer_ids c
+            RETURNING id
+        )
+        INSERT INTO order_items (id, order_id, product_id, quantity, unit_price, total_price)
+        SELECT gen_random_uuid(), o.id, p.ids[1 + floor(random() * array_length(p.ids, 1))::int], 1, 100, 100
+        FROM new_orders o, product_ids p, generate_series(1, 2)
+    """,
+    """
+        INSERT INTO expenses (id, date, category, amount, description)
+        SELECT gen_random_uuid(), current_date - (random() * 1095)::int,
+               (ARRAY['Ingredients', 'Packaging', 'Utilities', 'Rent', 'Salaries', 'Equipment', 'Marketing', 'Other'])
+                   [1 + floor(random() * 8)::int],
+               round((random() * 5000)::numeric, 2), :note
+        FROM generate_series(1, 100000)
+    """,
+    """
+        INSERT INTO bulk_orders (id, delivery_date, title, description, status, quote_amount)
+        SELECT gen_random_uuid(), now() + (random() * 1460 - 1400) * interval '1 day',
+               'Event order ' || g, :note,
+               CASE WHEN random() < 0.9 THEN 'delivered' WHEN random() < 0.5 THEN 'pending' ELSE 'confirmed' END,
+               round((random() * 20000)::numeric, 2)
+        FROM generate_series(1, 20000) g
+    """,
+]
+
+
+@pytest.fixture(scope="module")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="module")
+async def seeded():
+    """A connection inside a transaction holding the seed rows and their statistics"""
+    from conftest import TEST_DATABASE_URL
+
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL not set")
+    from app.database import engine
+
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        try:
+            for sql in SEED:
+                await conn.execute(text(sql), {"note": SEED_NOTE})
+            # ANALYZE inside the transaction: the statistics are rolled back with the rows
+            for table in ("customers", "products", "inventory", "orders", "order_items", "expenses", "bulk_orders"):
+                await conn.execute(text(f"ANALYZE {table}"))
+            yield conn
+        finally:
+            await transaction.rollback()
+
+
+async def explain(conn, stmt) -> dict:
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    params = tuple(compiled.params[name] for name in compiled.positiontup or ())
+    plan = (await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params)).scalar()
+    return (json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]
+
+
+def _index_names(node: dict):
+    if "Index Name" in node:
+        yield node["Index Name"]
+    for child in node.get("Plans", []):
+        yield from _index_names(child)
+
+
+def scans(node: dict):
+    """(node type, relation, index) for every scan in a plan tree"""
+    if "Relation Name" in node:
+        # A Bitmap Heap Scan names its indexes on the Bitmap Index Scan nodes below it
+        indexes = list(_index_names(node)) if node["Node Type"] == "Bitmap Heap Scan" else [node.get("Index Name")]
+        yield node["Node Type"], node["Relation Name"], " + ".join(filter(None, indexes)) or None
+    for child in node.get("Plans", []):
+        if node["Node Type"] != "Bitmap Heap Scan":
+            yield from scans(child)
+
+
+# name -> (tables that must not be seq-scanned, async builder taking the connection)
+HOT_QUERIES = {}
+
+
+def hot_query(name, *tables):
+    def register(build):
+        HOT_QUERIES[name] = (tables, build)
+        return build
+    return register
+
+
+async def _busiest_day(conn):
+    day = func.date(Order.created_at)
+    return (await conn.execute(select(day).group_by(day).order_by(func.count().desc()).limit(1))).scalar()
+
+
+@hot_query("GET /orders page", "orders")
+async def _orders_page(conn):
+    return select(Order).order_by(Order.created_at.desc(), Order.id.desc()).limit(51)
+
+
+@hot_query("GET /orders?status= page", "orders")
+async def _orders_by_status(conn):
+    return (select(Order).where(Order.status == ORDER_COMPLETED)
+        .order_by(Order.created_at.desc(), Order.id.desc()).limit(51))
+
+
+@hot_query("order lines for a page (selectinload)", "order_items")
+async def _page_lines(conn):
+    ids = (await conn.execute(
+        select(Order.id).order_by(Order.created_at.desc(), Order.id.desc()).limit(50)
+    )).scalars().all()
+    return select(OrderItem).where(OrderItem.order_id.in_(ids))
+
+
+@hot_query("order lines for a product", "order_items")
+async def _product_lines(conn):
+    product_id = (await conn.execute(
+        select(OrderItem.product_id).where(OrderItem.product_id.isnot(None)).limit(1)
+    )).scalar()
+    return select(OrderItem.order_id).where(OrderItem.product_id == product_id)
+
+
+@hot_query("GET /analytics/export busiest day with items", "orders", "order_items")
+async def _export_day(conn):
+    day = await _busiest_day(conn)
+    return exports._items_query(*exports.day_range(day, day), include_voided=False)
+
+
+@hot_query("GET /analytics/export a week with items", "orders", "order_items")
+async def _export_week(conn):
+    day = await _busiest_day(conn)
+    return exports._items_query(*exports.day_range(day - timedelta(days=6), day), include_voided=False)
+
+
+@hot_query("GET /customers page", "customers")
+async def _customers_page(conn):
+    return select(Customer).order_by(Customer.created_at.desc(), Customer.id.desc()).limit(51)
+
+
+@hot_query("GET /expenses this month", "expenses")
+async def _expenses_month(conn):
+    return (select(Expense).where(Expense.date >= date.today().replace(day=1))
+        .order_by(Expense.date.desc(), Expense.created_at.desc()))
+
+
+@hot_query("GET /expenses?category= last 90 days", "expenses")
+async def _expenses_by_category(conn):
+    return (select(Expense)
+        .where(Expense.category == "Utilities", Expense.date >= date.today() - timedelta(days=90))
+        .order_by(Expense.date.desc(), Expense.created_at.desc()))
+
+
+@hot_query("GET /expenses/stats", "expenses")
+async def _expenses_stats(conn):
+    return select(func.sum(Expense.amount), func.count(Expense.id)).where(Expense.date >= date.today().replace(day=1))
+
+
+@hot_query("GET /bulk-orders?status=pending", "bulk_orders")
+async def _pending_bulk_orders(conn):
+    return select(BulkOrder).where(BulkOrder.status == "pending").order_by(BulkOrder.delivery_date.desc())
+
+
+@hot_query("GET /inventory/low-stock", "inventory")
+async def _low_stock(conn):
+    return (select(Inventory).join(Product, Inventory.product_id == Product.id)
+        .where(Inventory.stock_quantity <= Inventory.low_stock_threshold).order_by(Inventory.stock_quantity))
+
+
+@hot_query("low-stock count (stats)", "inventory")
+async def _low_stock_count(conn):
+    return select(func.count(Inventory.id)).where(Inventory.stock_quantity <= Inventory.low_stock_threshold)
+
+
+async def test_default_planner_settings(seeded):
+    # The plans below must hold without tuning (007 used to set random_page_cost for the role)
+    assert (await seeded.execute(text("SHOW random_page_cost"))).scalar() == "4"
+
+
+@pytest.mark.parametrize("name", HOT_QUERIES)
+async def test_hot_query_uses_an_index(seeded, name):
+    tables, build = HOT_QUERIES[name]
+    plan = await explain(seeded, await build(seeded))
+    used = [(node, relation, index) for node, relation, index in scans(plan) if relation in tables]
+    assert {relation for _, relation, _ in used} == set(tables), f"{name}: {used}"
+    sequential = [relation for node, relation, _ in used if node == "Seq Scan"]
+    assert not sequential, f"{name} scans {', '.join(sequential)} sequentially: {used}"
@@ -0,0 +1,96 @@
+import asyncio
+import hashlib
+import io
+import threading
+
+import pytest
+from PIL import Image
+
+from app import thumbnails
+from app.images import save_image
+from app.thumbnails import VARIANT_FORMATS, VARIANT_WIDTHS, ensure_variant, render_variant, variant_name
+
+PIL_FORMATS = {"webp": "WEBP", "jpg": "JPEG"}
+
+
+def make_image(size=(1200, 900), mode="RGB", fmt="PNG") -> bytes:
+    output = io.BytesIO()
+    Image.new(mode, size, (200, 120, 160, 128)[:len(mode)]).save(output, format=fmt)
+    return output.getvalue()
+
+
+@pytest.mark.parametrize("fmt", VARIANT_FORMATS)
+@pytest.mark.parametrize("width", VARIANT_WIDTHS)
+def test_render_variant_size_and_format(width, fmt):
+    rendered = Image.open(io.BytesIO(render_variant(make_image(), width, fmt)))
+    assert rendered.format == PIL_FORMATS[fmt]
+    assert rendered.size == (width, round(900 * width / 1200))
+
+
+@pytest.mark.parametrize("fmt", VARIANT_FORMATS)
+def test_render_variant_never_upscales(fmt):
+    rendered = Image.open(io.BytesIO(render_variant(make_image((150, 100)), 800, fmt)))
+    assert rendered.size == (150, 100)
+
+
+def test_render_variant_jpeg_flattens_transparency():
+    rendered = Image.open(io.BytesIO(render_variant(make_image(mode="RGBA"), 200, "jpg")))
+    assert rendered.mode == "RGB"
+
+
+@pytest.mark.anyio
+async def test_ensure_variant_is_idempotent(image_store, monkeypatch):
+    renders = []
+
+    def counting_render(contents, width, fmt):
+        renders.append((width, fmt))
+        return render_variant(contents, width, fmt)
+
+    monkeypatch.setattr(thumbnails, "render_variant", counting_render)
+    original = (await save_image(make_image(), "image/png")).rsplit("/", 1)[1]
+    name = variant_name(original.split(".")[0], 400, "webp")
+
+    assert await ensure_variant(name)
+    first = hashlib.sha256(image_store.read(name)).hexdigest()
+    assert await ensure_variant(name)
+    second = hashlib.sha256(image_store.read(name)).hexdigest()
+
+    assert first == second
+    assert renders == [(400, "webp")]
+
+
+@pytest.mark.anyio
+async def test_request_during_upload_shares_the_variant(image_store, monkeypatch):
+    renders = []
+    release = threading.Event()
+
+    def blocking_render(contents, width, fmt):
+        renders.append((width, fmt))
+        release.wait(5)
+        return render_variant(contents, width, fmt)
+
+    monkeypatch.setattr(thumbnails, "render_variant", blocking_render)
+    contents = make_image()
+    original = (await save_image(contents, "image/png")).rsplit("/", 1)[1]
+    content_hash = original.split(".")[0]
+    names = [variant_name(content_hash, width, fmt) for width in VARIANT_WIDTHS for fmt in VARIANT_FORMATS]
+
+    # The upload builds every variant; a GET for the first one arrives while it is still rendering
+    upload = asyncio.ensure_future(thumbnails._run(original, contents, names))
+    request = asyncio.ensure_future(ensure_variant(names[0]))
+    await asyncio.sleep(0.2)
+    release.set()
+    await upload
+    assert await request
+
+    assert sorted(renders) == sorted((w, f) for w in VARIANT_WIDTHS for f in VARIANT_FORMATS)
+    assert all(image_store.exists(name) for name in names)
+    assert thumbnails._pending == {}
+
+
+@pytest.mark.anyio
+async def test_ensure_variant_unknown(image_store):
+    missing = variant_name("0" * 64, 400, "webp")
+    assert not await ensure_variant(missing)
+    assert not await ensure_variant(variant_name("0" * 64, 300, "webp"))  # not one of VARIANT_WIDTHS
+    assert not image_store.exists(missing)
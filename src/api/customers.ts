@@ -10,16 +10,27 @@ export interface Customer {
     total_spent: number;
 }
 
+// Largest page GET /customers serves
+const CUSTOMERS_PAGE_SIZE = 200;
+
 export const customersApi = {
     /**
      * Fetches all customers.
-     * This uses the standard Supabase client. 
-     * Ensure RLS policies in Supabase allow read access for authenticated staff.
+     * The endpoint is paged: each response carries the next page's cursor in the
+     * X-Next-Cursor header, so follow it until there is none.
      */
     getCustomers: async () => {
-        const response = await fetch(`${API_BASE_URL}/customers`);
-        if (!response.ok) throw new Error('Failed to fetch customers');
-        return await response.json();
+        const customers: unknown[] = [];
+        let cursor: string | null = null;
+        do {
+            const params = new URLSearchParams({ limit: String(CUSTOMERS_PAGE_SIZE) });
+            if (cursor) params.set('cursor', cursor);
+            const response = await fetch(`${API_BASE_URL}/customers?${params}`);
+            if (!response.ok) throw new Error('Failed to fetch customers');
+            customers.push(...await response.json());
+            cursor = response.headers.get('X-Next-Cursor');
+        } while (cursor);
+        return customers;
     },
 
     /**
@@ -75,7 +75,7 @@ export const ordersApi = {
     },
 
     /**
-     * Deletes an order and restores inventory.
+     * Voids an order (kept in history as voided) and restores inventory.
      */
     deleteOrder: async (orderId: string) => {
         const response = await fetch(`${API_BASE_URL}/orders/${orderId}`, { method: 'DELETE' });
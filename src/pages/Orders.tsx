@@ -120,7 +120,7 @@ export default function Orders() {
     try {
       setDeleting(true);
       await ordersApi.deleteOrder(orderToDelete.orderId);
-      toast({ title: "Order deleted", description: "Order has been removed." });
+      toast({ title: "Order voided", description: "Order has been voided and its stock restored." });
       setSelectedOrder(null);
       setOrderToDelete(null);
       setDeleteDialogOpen(false);
@@ -379,7 +379,7 @@ export default function Orders() {
           <AlertDialogHeader>
             <AlertDialogTitle>Delete order?</AlertDialogTitle>
             <AlertDialogDescription>
-              This will remove the order and restore inventory. This action cannot be undone.
+              This will void the order and restore inventory. It stays in the order history as voided.
             </AlertDialogDescription>
           </AlertDialogHeader>
           <AlertDialogFooter>